@@ -1,9 +1,27 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Literal, Mapping, Optional, Union
 from src.crawler import Crawler
+from src.http_cache import HttpCache
 from src.extractor import Extractor
+from src.dispatcher import BATCH, INTERACTIVE, dispatchers
+from src.batch import BatchExtractor, extract_modules as run_engine
+from src.cache import SQLiteCache
+from src.jobs import CANCELLED, Job, JobCancelled, JobManager, QueueFullError
+from src.frontier import canonicalize_url
+from src.singleflight import SingleFlight
+from src.checkpoint import CrawlCheckpoint
+from src.metrics import render_metrics
+from src.page_store import DiskPageStore
+from src.parsing import create_parse_executor
+import asyncio
+import hashlib
+import json
+import os
+import threading
 import uvicorn
+from concurrent.futures import ProcessPoolExecutor
 
 app = FastAPI(
     title="Pulse Module Extractor API",
@@ -11,39 +29,411 @@ app = FastAPI(
     version="1.0.0"
 )
 
-class ExtractionRequest(BaseModel):
-    urls: List[str]
+# Crawls and LLM calls run on this pool, never on the event loop
+jobs = JobManager(
+    max_workers=int(os.getenv("PULSE_JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("PULSE_JOB_QUEUE_LIMIT", "32"))
+)
+
+# Parse worker processes shared by every request with parse_workers > 0,
+# started on first use
+PARSE_WORKERS = int(os.getenv("PULSE_PARSE_WORKERS", str(os.cpu_count() or 4)))
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_parse_executor_lock = threading.Lock()
+
+def parse_executor() -> ProcessPoolExecutor:
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = create_parse_executor(PARSE_WORKERS)
+        return _parse_executor
+
+class ExtractionSettings(BaseModel):
     max_depth: int = 1
     max_pages: int = 15
     model: str = "gpt-4o"
+    parallelism: int = 4
+    # Above 0, pages are parsed in the server's shared worker processes (PULSE_PARSE_WORKERS)
+    parse_workers: int = 0
+    use_sitemaps: bool = False
+    # Tokens of page content sent to the model, packed to the most informative
+    # sections; None sends everything, "auto" uses the model's budget
+    token_budget: Optional[Union[int, Literal["auto"]]] = None
+    # "structure" builds the hierarchy from headings, breadcrumbs and URL paths without the LLM
+    engine: Literal["llm", "structure"] = "llm"
+    # With the structure engine, have the LLM rewrite descriptions and confidence scores
+    describe: bool = False
+
+class ExtractionRequest(ExtractionSettings):
+    urls: List[str]
+    # Checkpoint the crawl under the job id so it can be resumed if the job dies
+    checkpoint: bool = False
+    # Continue the crawl of an earlier checkpointed job (its job_id); implies checkpoint
+    resume: Optional[str] = None
+
+class BatchRequest(ExtractionSettings):
+    # One entry per site: a start URL or a list of start URLs of the same site
+    sites: List[Union[str, List[str]]]
+    # Sites crawled at once; all of them share one connection pool
+    site_concurrency: int = 8
 
 class ExtractionResponse(BaseModel):
     modules: List[Dict[str, Any]]
     pages_crawled: int
+    # Per-stage timing of this run: count, total_ms, mean_ms and max_ms per stage
+    timings: Dict[str, Dict[str, Any]] = {}
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    progress: Dict[str, Any]
+    result: Optional[ExtractionResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+
+class NoContentError(Exception):
+    pass
+
+# A finished crawl shared by coalesced requests: its page stores are closed
+# once the last request using them releases the crawl
+class _SharedCrawl:
+    def __init__(self, crawler: Crawler, content_map: Mapping[str, str]):
+        self.crawler = crawler
+        self.content_map = content_map
+        self._users = 1
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        # False once the stores are closed; the caller has to crawl again
+        with self._lock:
+            if self._users == 0:
+                return False
+            self._users += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+        self.crawler.close()
+
+# Request fields that shape a crawl's frontier; a resumed crawl keeps the saved ones
+CRAWL_SETTINGS = ("urls", "max_depth", "max_pages", "use_sitemaps")
+
+# Concurrent identical crawls and extractions run once and share the result.
+# A follower whose leader was cancelled runs the work itself.
+crawls = SingleFlight(retry_on=(JobCancelled,))
+extractions = SingleFlight(retry_on=(JobCancelled,))
+
+def _crawl_key(request: ExtractionRequest) -> str:
+    # Everything that changes what a crawl returns; locales are kept apart
+    # here since different start locales crawl different pages
+    return json.dumps([sorted({canonicalize_url(url, collapse_locales=False) for url in request.urls}), request.max_depth,
+                       request.max_pages, request.use_sitemaps, request.checkpoint, request.resume])
+
+def _extraction_key(request: ExtractionRequest, content_map: Mapping[str, str]) -> str:
+    content_hash = hashlib.sha256()
+    for url in sorted(content_map):
+        content_hash.update(url.encode() + b"\0" + content_map[url].encode() + b"\0")
+    return json.dumps([content_hash.hexdigest(), request.model, request.engine, request.describe,
+                       request.token_budget])
+
+async def _run_cancellable(work: Awaitable, job: Job, on_poll: Optional[Callable[[], None]] = None):
+    # Poll the work so progress is reported and cancellation stops it promptly
+    task = asyncio.ensure_future(work)
+    while not task.done():
+        await asyncio.wait({task}, timeout=0.5)
+        if on_poll:
+            on_poll()
+        if job.cancelled:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            job.check_cancelled()
+    return task.result()
+
+def run_extraction(job: Job, emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   priority: int = INTERACTIVE) -> Dict[str, Any]:
+    # `emit` receives progress events (pages, chunks) for streaming clients;
+    # `priority` orders this job's LLM calls against other jobs'
+    request = ExtractionRequest(**job.params)
+
+    # Crawls and extractions publish their events through the coalescing
+    # groups, so a request that joins one in flight gets the same page and
+    # chunk events and progress as the request that runs it
+    def on_event(event: Dict[str, Any]):
+        if event["event"] == "progress":
+            job.update(**{name: value for name, value in event.items() if name != "event"})
+            return
+        if event["event"] == "chunk":
+            job.update(chunks_done=job.progress.get("chunks_done", 0) + 1, chunks=event["total"])
+        if emit:
+            emit(event)
+
+    # Crawl; identical crawls already in flight are joined instead of repeated
+    job.update(stage="crawling")
+
+    # Checkpointed crawls are saved under their job id, which is what `resume` refers to
+    checkpointed = request.checkpoint or request.resume is not None
+    run_id = request.resume or job.id
+    params = request.dict()
+    if request.resume:
+        saved = CrawlCheckpoint(run_id).load_params()
+        if saved is not None:
+            # The frontier was built with the original settings, so keep them
+            request = ExtractionRequest(**{**job.params, **{name: saved[name] for name in CRAWL_SETTINGS if name in saved}})
+            params = saved
+    if checkpointed:
+        job.update(run_id=run_id)
+
+    crawl_key = _crawl_key(request)
+
+    def crawl():
+        def on_page(url: str, text: str):
+            crawls.publish(crawl_key, {"event": "page", "url": url, "chars": len(text)})
+
+        http_cache = HttpCache()
+        crawler = Crawler(request.urls, max_depth=request.max_depth, max_pages=request.max_pages,
+                          http_cache=http_cache, on_page=on_page,
+                          parse_workers=request.parse_workers, use_sitemaps=request.use_sitemaps,
+                          checkpoint=CrawlCheckpoint(run_id, params) if checkpointed else None,
+                          page_store=DiskPageStore(),
+                          parse_executor=parse_executor() if request.parse_workers > 0 else None)
+        try:
+            asyncio.run(_run_cancellable(crawler.crawl_async(), job, lambda: crawls.publish(crawl_key, {
+                "event": "progress", "pages_crawled": len(crawler.content), "pages_visited": len(crawler.visited)
+            }, replay=False)))
+            return _SharedCrawl(crawler, crawler.get_content())
+        except BaseException:
+            crawler.close()
+            raise
+        finally:
+            http_cache.close()
+
+    while True:
+        crawl_result, shared = crawls.do(crawl_key, crawl, job.check_cancelled, on_event=on_event)
+        if not shared or crawl_result.acquire():
+            break
+    try:
+        return _extract_crawl(job, request, crawl_result, shared, emit, on_event, priority)
+    finally:
+        crawl_result.release()
+
+def _extract_crawl(job: Job, request: ExtractionRequest, crawl_result: _SharedCrawl, shared: bool,
+                   emit: Optional[Callable[[Dict[str, Any]], None]], on_event: Callable[[Dict[str, Any]], None],
+                   priority: int) -> Dict[str, Any]:
+    crawler, content_map = crawl_result.crawler, crawl_result.content_map
+    job.update(pages_crawled=len(content_map), crawl_shared=shared)
+    if crawler.checkpoint is not None:
+        # A shared crawl is checkpointed under the job that ran it
+        job.update(run_id=crawler.checkpoint.run_id)
+    if crawler.dedup:
+        job.update(duplicates=crawler.dedup.stats())
+    if crawler.boilerplate:
+        job.update(boilerplate={**crawler.boilerplate.stats(), **crawler.boilerplate_removed})
+    job.check_cancelled()
+
+    if not content_map:
+        raise NoContentError("No content found to extract.")
+
+    if emit:
+        emit({"event": "crawl_complete", "pages_crawled": len(content_map),
+              "chars": sum(len(text) for text in content_map.values()),
+              "duplicates": crawler.dedup.stats() if crawler.dedup else None, "shared": shared})
+
+    # Extract; likewise shared by requests for the same content and settings
+    job.update(stage="extracting")
+
+    extraction_key = _extraction_key(request, content_map)
+
+    def extract():
+        def on_chunk(index: int, total: int, modules: List[Dict[str, Any]], cached: bool):
+            extractions.publish(extraction_key, {"event": "chunk", "index": index, "total": total,
+                                                 "cached": cached, "modules": modules})
+
+        extractor = Extractor(model=request.model, priority=priority)
+        modules = run_engine(extractor, crawler, content_map, request.engine, request.describe,
+                             request.token_budget, request.parallelism, on_chunk)
+        stats = {**extractor.last_run, "prompt_tokens": extractor.usage["prompt"],
+                 "completion_tokens": extractor.usage["completion"]}
+        return modules, extractor.timings.summary(), stats
+
+    (modules, extraction_timings, extraction_stats), shared = extractions.do(
+        extraction_key, extract, job.check_cancelled, on_event=on_event)
+    # Shared extractions report the run statistics of the request that did the work
+    job.update(**extraction_stats, extraction_shared=shared)
+
+    return {
+        "modules": modules,
+        "pages_crawled": len(content_map),
+        # Shared crawls and extractions report the timings of the run that did the work
+        "timings": {**crawler.timings.summary(), **extraction_timings}
+    }
+
+def run_batch(job: Job, emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+              priority: int = INTERACTIVE) -> Dict[str, Any]:
+    # Extracts every site separately; `emit` receives each site's result as it finishes
+    request = BatchRequest(**job.params)
+    sites = [[site] if isinstance(site, str) else site for site in request.sites]
+    runner = BatchExtractor(model=request.model, max_depth=request.max_depth, max_pages=request.max_pages,
+                            engine=request.engine, describe=request.describe,
+                            token_budget=request.token_budget, parallelism=request.parallelism,
+                            use_sitemaps=request.use_sitemaps, site_concurrency=request.site_concurrency,
+                            parse_workers=request.parse_workers, priority=priority,
+                            parse_executor=parse_executor() if request.parse_workers > 0 else None)
+    results = []
+
+    async def collect():
+        async for result in runner.run(sites):
+            results.append(result.to_dict())
+            job.update(sites_done=len(results))
+            if emit:
+                emit({"event": "site", **result.to_dict()})
+
+    job.update(stage="running", sites=len(sites), sites_done=0)
+    asyncio.run(_run_cancellable(collect(), job))
+    return {"sites": results}
+
+def _submit(request: ExtractionSettings, emit: Optional[Callable[[Dict[str, Any]], None]] = None,
+            priority: int = INTERACTIVE, work: Callable = run_extraction) -> Job:
+    resume = getattr(request, "resume", None)
+    if resume and not CrawlCheckpoint(resume).exists():
+        raise HTTPException(status_code=404, detail=f"No checkpoint for run {resume}.")
+    try:
+        return jobs.submit(lambda job: work(job, emit, priority), request.dict())
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+async def _wait_for_job(job: Job) -> Any:
+    # The wait is shielded so that a cancelled request (client gone, timeout,
+    # shutdown) cancels the job through the manager, which frees its queue
+    # slot, instead of cancelling the executor future underneath it
+    try:
+        result = await asyncio.shield(asyncio.wrap_future(job.future))
+    except asyncio.CancelledError:
+        if not job.future.cancelled():
+            jobs.cancel(job.id)
+            raise
+        result = None
+    if job.status == CANCELLED:
+        raise HTTPException(status_code=409, detail="Job was cancelled.")
+    return result
 
 @app.post("/extract", response_model=ExtractionResponse)
 async def extract_modules(request: ExtractionRequest):
+    job = _submit(request)
     try:
-        # Crawl
-        crawler = Crawler(request.urls, max_depth=request.max_depth, max_pages=request.max_pages)
-        crawler.crawl()
-        content_map = crawler.get_content()
-        
-        if not content_map:
-            raise HTTPException(status_code=400, detail="No content found to extract.")
-
-        # Extract
-        full_text = "\n\n".join(content_map.values())
-        extractor = Extractor(model=request.model)
-        modules = extractor.extract(full_text)
-        
-        return {
-            "modules": modules,
-            "pages_crawled": len(content_map)
-        }
-        
+        return await _wait_for_job(job)
+    except HTTPException:
+        raise
+    except NoContentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _format_event(event: Dict[str, Any], format: str) -> str:
+    if format == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+def _stream_job(submit: Callable[[Callable[[Dict[str, Any]], None]], Job], format: str) -> StreamingResponse:
+    # Streams the job's events, then its result (or error), as NDJSON or SSE.
+    # Closing the connection cancels the job.
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'.")
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: Dict[str, Any]):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    job = submit(emit)
+    # Runs after the last emit from the worker thread, so it always arrives last
+    job.future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, None))
+
+    async def generate() -> AsyncIterator[str]:
+        try:
+            yield _format_event({"event": "job", "job_id": job.id}, format)
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield _format_event(event, format)
+
+            if job.future.cancelled() or job.status == CANCELLED:
+                final = {"event": "error", "detail": "Job was cancelled."}
+            elif job.future.exception() is not None:
+                final = {"event": "error", "detail": str(job.future.exception())}
+            else:
+                final = {"event": "result", **job.future.result()}
+            yield _format_event(final, format)
+        finally:
+            if not job.future.done():
+                jobs.cancel(job.id)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
+@app.post("/extract/stream")
+async def extract_modules_stream(request: ExtractionRequest, format: str = "ndjson"):
+    # Events: page, crawl_complete, chunk, then result (or error)
+    return _stream_job(lambda emit: _submit(request, emit), format)
+
+@app.post("/extract/batch")
+async def extract_batch(request: BatchRequest, format: str = "ndjson"):
+    # Events: one "site" event per site as soon as it is finished (with its
+    # modules or its error), then a result with every site
+    return _stream_job(lambda emit: _submit(request, emit, BATCH, run_batch), format)
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(request: ExtractionRequest):
+    # Background jobs yield LLM capacity to requests a client is waiting on
+    return _submit(request, priority=BATCH).to_dict()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    _get_job(job_id)
+    return jobs.cancel(job_id).to_dict()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return SQLiteCache().stats()
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    # "shared" counts requests that were served by another request's crawl or extraction
+    return {"crawls": crawls.stats(), "extractions": extractions.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus exposition of the pipeline's stage timings, page, HTTP, cache and token counters
+    rendered = render_metrics()
+    if rendered is None:
+        raise HTTPException(status_code=501, detail="prometheus_client is not installed.")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return {model: dispatcher.stats() for model, dispatcher in dispatchers().items()}
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    jobs.shutdown()
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,11 +1,15 @@
 import streamlit as st
 import json
 from src.crawler import Crawler
+from src.http_cache import HttpCache
 from src.extractor import Extractor
-from src.visualizer import create_graph
+from src.structure import build_hierarchy
+from openai import RateLimitError
+from src.visualizer import MODULES_PER_PAGE, collapsed_modules, graph_source, page_count, render_svg
 import os
 from dotenv import load_dotenv
 import time
+import asyncio
 
 # Load environment variables
 load_dotenv()
@@ -60,7 +64,13 @@ with st.sidebar:
         st.warning("Running in Mock Mode. Add OPENAI_API_KEY to .env for live extraction.")
 
     model_name = st.selectbox("AI Model", ["gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo"], index=0)
+    engine = st.radio("Extraction Engine", ["AI", "Page structure"], index=0, help="Page structure builds the hierarchy from headings, breadcrumbs and URLs in seconds, without sending the pages to the model.")
+    describe = st.checkbox("Write descriptions with AI", value=False, disabled=engine != "Page structure", help="Let the model rewrite the descriptions of the structure-based hierarchy.")
     max_depth = st.slider("Crawl Depth", min_value=1, max_value=3, value=1, help="How deep to crawl links.")
+    max_pages = st.number_input("Max Pages", min_value=1, max_value=2000, value=50, help="Page budget for the crawl; the most documentation-like pages are fetched first.")
+    use_sitemaps = st.checkbox("Use sitemaps", value=False, help="Plan the crawl from robots.txt / sitemap.xml instead of only following links.")
+    budget = st.number_input("Token Budget", min_value=0, max_value=500000, value=0, step=1000, help="Pack page content into this many tokens, keeping the most informative sections. 0 sends everything.")
+    parallelism = st.slider("LLM Parallelism", min_value=1, max_value=8, value=4, help="How many content chunks are analysed at once.")
     
     st.markdown("---")
     st.markdown("### About")
@@ -90,7 +100,110 @@ with col2:
     st.markdown("<br>", unsafe_allow_html=True) # Spacer
     process_btn = st.button("🚀 Start Extraction", type="primary")
 
+def show_graph(modules):
+    # Large hierarchies are paged and their biggest modules collapsed, and
+    # rendered graphs are cached by content, so reruns (e.g. expanding a
+    # module) only lay out a graph that has not been drawn before
+    options = {}
+    pages = page_count(modules)
+    if pages > 1:
+        options["page"] = st.number_input(f"Page (of {pages}, {MODULES_PER_PAGE} modules each)",
+                                          min_value=1, max_value=pages, value=1, key="graph_page") - 1
+    page = options.get("page", 0)
+    collapsed = collapsed_modules(modules[page * MODULES_PER_PAGE:(page + 1) * MODULES_PER_PAGE])
+    if collapsed:
+        options["expanded"] = st.multiselect("Show all submodules of", collapsed, key=f"graph_expanded_{page}")
+    svg = render_svg(modules, **options)
+    if svg is not None:
+        st.image(svg, use_container_width=True)
+    else:
+        # No graphviz executables on the server; the browser lays the graph out
+        st.graphviz_chart(graph_source(modules, **options), use_container_width=True)
+
+def show_results(modules):
+    # Metrics
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric("Modules Found", len(modules))
+    with m2:
+        total_subs = sum(len(m.get('Submodules', {})) for m in modules)
+        st.metric("Submodules Found", total_subs)
+    with m3:
+        avg_conf = sum(m.get('confidence_score', 0) for m in modules) / len(modules) if modules else 0
+        st.metric("Avg Confidence", f"{avg_conf:.2%}")
+
+    # Charts
+    st.markdown("### 📈 Analytics")
+    chart_data = {
+        "Module": [m.get('module', 'Unknown') for m in modules],
+        "Submodules Count": [len(m.get('Submodules', {})) for m in modules]
+    }
+    st.bar_chart(chart_data, x="Module", y="Submodules Count", color="#4F8BF9")
+
+    # Tabs for different views
+    tab1, tab2, tab3 = st.tabs(["📊 Visualization", "📑 Structured View", "💾 Export"])
+    
+    with tab1:
+        st.markdown("### Module Hierarchy Graph")
+        try:
+            show_graph(modules)
+        except Exception as e:
+            st.warning(f"Could not generate graph: {e}")
+
+    with tab2:
+        for mod in modules:
+            with st.expander(f"📦 {mod.get('module', 'Unknown')}"):
+                st.markdown(f"**Description:** {mod.get('Description', '')}")
+                st.markdown(f"**Confidence:** {mod.get('confidence_score', 'N/A')}")
+                st.divider()
+                st.markdown("**Submodules:**")
+                for sub, desc in mod.get('Submodules', {}).items():
+                    st.markdown(f"- **{sub}**: {desc}")
+    
+    with tab3:
+        st.markdown("### 👁️ Output Preview")
+        st.code(json.dumps(modules, indent=2), language='json')
+
+        st.markdown("### Download Reports")
+        
+        # JSON Download
+        json_data = json.dumps(modules, indent=2)
+        st.download_button(
+            label="📥 Download JSON Data",
+            data=json_data,
+            file_name="pulse_modules.json",
+            mime="application/json"
+        )
+        
+        # Markdown Report Generation
+        def generate_markdown_report(modules):
+            report = f"# Pulse Module Extraction Report\n\n"
+            report += f"**Date:** {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            report += f"## Summary\n"
+            report += f"- **Total Modules:** {len(modules)}\n"
+            report += f"- **Total Submodules:** {sum(len(m.get('Submodules', {})) for m in modules)}\n\n"
+            report += "## Detailed Breakdown\n\n"
+            
+            for mod in modules:
+                report += f"### 📦 {mod.get('module', 'Unknown')}\n"
+                report += f"**Description:** {mod.get('Description', 'N/A')}\n\n"
+                report += f"**Confidence Score:** {mod.get('confidence_score', 'N/A')}\n\n"
+                report += "**Submodules:**\n"
+                for sub, desc in mod.get('Submodules', {}).items():
+                    report += f"- **{sub}**: {desc}\n"
+                report += "\n---\n\n"
+            return report
+
+        md_report = generate_markdown_report(modules)
+        st.download_button(
+            label="📄 Download Full Report (Markdown)",
+            data=md_report,
+            file_name="pulse_report.md",
+            mime="text/markdown"
+        )
+
 if process_btn:
+    st.session_state.pop("modules", None)
     if not url_input:
         st.error("Please enter at least one URL.")
     else:
@@ -102,8 +215,9 @@ if process_btn:
         try:
             # Step 1: Crawling
             status_container.write("🕷️ Crawling documentation pages...")
-            crawler = Crawler(urls, max_depth=max_depth)
-            crawler.crawl()
+            crawler = Crawler(urls, max_depth=max_depth, max_pages=int(max_pages), use_sitemaps=use_sitemaps,
+                              http_cache=HttpCache())
+            asyncio.run(crawler.crawl_async())
             content_map = crawler.get_content()
             
             if not content_map:
@@ -112,103 +226,37 @@ if process_btn:
                 st.stop()
                 
             status_container.write(f"✅ Crawled {len(content_map)} pages successfully.")
+            if crawler.dedup and crawler.dedup.pages_dropped:
+                dedup = crawler.dedup.stats()
+                status_container.write(f"🧹 Dropped {dedup['pages_dropped']} near-duplicate pages (~{dedup['tokens_removed']} tokens saved).")
+            if crawler.boilerplate_removed["lines_removed"]:
+                status_container.write(f"✂️ Stripped {crawler.boilerplate_removed['lines_removed']} repeated boilerplate lines.")
             
             # Step 2: Extraction
             status_container.write("🧠 Analyzing content with AI...")
             
-            # Combine content (smart truncation could be added here)
-            full_text = "\n\n".join(content_map.values())
-            st.info(f"Total content length to analyze: {len(full_text)} characters")
-            
             extractor = Extractor(model=model_name)
-            modules = extractor.extract(full_text)
+            if engine == "Page structure":
+                modules = build_hierarchy(content_map, crawler.outlines, crawler.path_prefixes)
+                status_container.write(f"🏗️ Built {len(modules)} modules from headings, breadcrumbs and URLs.")
+                if describe:
+                    modules = extractor.describe_modules(modules, parallelism=parallelism)
+            else:
+                total_tokens = sum(extractor.count_tokens(text) for text in content_map.values())
+                st.info(f"Total content to analyze: {total_tokens} tokens")
+                
+                modules = extractor.extract_chunked(content_map, parallelism=parallelism, token_budget=int(budget) or None)
+                run = extractor.last_run
+                if run.get('tokens_dropped'):
+                    status_container.write(f"🎯 Sent the {run['tokens_used']} most informative tokens; dropped {run['tokens_dropped']} tokens to fit the budget.")
+                status_container.write(f"♻️ Re-analysed {run['chunks_extracted']} of {run['chunks']} content chunks ({run['chunks_reused']} unchanged since the last run).")
             
             status_container.update(label="Extraction Complete!", state="complete", expanded=False)
             
+            # Kept for reruns, so the results stay up while the graph is paged or expanded
+            st.session_state["modules"] = modules
             if modules:
                 st.success("🎉 Extraction successful!")
-                
-                # Metrics
-                m1, m2, m3 = st.columns(3)
-                with m1:
-                    st.metric("Modules Found", len(modules))
-                with m2:
-                    total_subs = sum(len(m.get('Submodules', {})) for m in modules)
-                    st.metric("Submodules Found", total_subs)
-                with m3:
-                    avg_conf = sum(m.get('confidence_score', 0) for m in modules) / len(modules) if modules else 0
-                    st.metric("Avg Confidence", f"{avg_conf:.2%}")
-
-                # Charts
-                st.markdown("### 📈 Analytics")
-                chart_data = {
-                    "Module": [m.get('module', 'Unknown') for m in modules],
-                    "Submodules Count": [len(m.get('Submodules', {})) for m in modules]
-                }
-                st.bar_chart(chart_data, x="Module", y="Submodules Count", color="#4F8BF9")
-
-                # Tabs for different views
-                tab1, tab2, tab3 = st.tabs(["📊 Visualization", "📑 Structured View", "💾 Export"])
-                
-                with tab1:
-                    st.markdown("### Module Hierarchy Graph")
-                    try:
-                        graph = create_graph(modules)
-                        st.graphviz_chart(graph, use_container_width=True)
-                    except Exception as e:
-                        st.warning(f"Could not generate graph: {e}")
-
-                with tab2:
-                    for mod in modules:
-                        with st.expander(f"📦 {mod.get('module', 'Unknown')}"):
-                            st.markdown(f"**Description:** {mod.get('Description', '')}")
-                            st.markdown(f"**Confidence:** {mod.get('confidence_score', 'N/A')}")
-                            st.divider()
-                            st.markdown("**Submodules:**")
-                            for sub, desc in mod.get('Submodules', {}).items():
-                                st.markdown(f"- **{sub}**: {desc}")
-                
-                with tab3:
-                    st.markdown("### 👁️ Output Preview")
-                    st.code(json.dumps(modules, indent=2), language='json')
-
-                    st.markdown("### Download Reports")
-                    
-                    # JSON Download
-                    json_data = json.dumps(modules, indent=2)
-                    st.download_button(
-                        label="📥 Download JSON Data",
-                        data=json_data,
-                        file_name="pulse_modules.json",
-                        mime="application/json"
-                    )
-                    
-                    # Markdown Report Generation
-                    def generate_markdown_report(modules):
-                        report = f"# Pulse Module Extraction Report\n\n"
-                        report += f"**Date:** {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                        report += f"## Summary\n"
-                        report += f"- **Total Modules:** {len(modules)}\n"
-                        report += f"- **Total Submodules:** {sum(len(m.get('Submodules', {})) for m in modules)}\n\n"
-                        report += "## Detailed Breakdown\n\n"
-                        
-                        for mod in modules:
-                            report += f"### 📦 {mod.get('module', 'Unknown')}\n"
-                            report += f"**Description:** {mod.get('Description', 'N/A')}\n\n"
-                            report += f"**Confidence Score:** {mod.get('confidence_score', 'N/A')}\n\n"
-                            report += "**Submodules:**\n"
-                            for sub, desc in mod.get('Submodules', {}).items():
-                                report += f"- **{sub}**: {desc}\n"
-                            report += "\n---\n\n"
-                        return report
-
-                    md_report = generate_markdown_report(modules)
-                    st.download_button(
-                        label="📄 Download Full Report (Markdown)",
-                        data=md_report,
-                        file_name="pulse_report.md",
-                        mime="text/markdown"
-                    )
             else:
                 st.error("Failed to extract modules. The AI model might have returned an empty result.")
                 
@@ -217,8 +265,12 @@ if process_btn:
             st.error(f"An unexpected error occurred: {str(e)}")
             if "401" in str(e):
                 st.error("Authentication Error: Please check your OpenAI API Key in .env")
-            elif "429" in str(e):
-                st.error("Rate Limit Error: You have exceeded your OpenAI quota.")
+            elif isinstance(e, RateLimitError):
+                # Reached only once the dispatcher's retries are used up, or when the quota is exhausted
+                st.error("Rate Limit Error: OpenAI kept throttling requests or your quota is exhausted.")
             elif "404" in str(e):
                 st.error(f"Model Error: The model '{model_name}' does not exist or you do not have access to it.")
 
+# Results of the last extraction stay on screen across reruns
+if st.session_state.get("modules"):
+    show_results(st.session_state["modules"])
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import generate_site, serve_site
+from src.crawler import Crawler
+
+def run(mode: str, base_url: str, depth: int, concurrency: int, parse_workers: int) -> float:
+    # Modes: sync, async (parsing on the event loop), async-pool (parsing in worker processes)
+    workers = parse_workers if mode == "async-pool" else 0
+    crawler = Crawler([base_url], max_depth=depth, max_concurrency=concurrency, parse_workers=workers)
+    start = time.perf_counter()
+    if mode == "sync":
+        crawler.crawl()
+    else:
+        asyncio.run(crawler.crawl_async())
+    elapsed = time.perf_counter() - start
+    pages = len(crawler.visited)
+    print(f"{mode:>10}: {pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/sec)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawler throughput benchmark")
+    parser.add_argument('--pages', type=int, default=500, help="Pages in the fixture site")
+    parser.add_argument('--depth', type=int, default=3, help="Crawl depth")
+    parser.add_argument('--concurrency', type=int, default=32, help="Async concurrency cap")
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 4, help="Processes for async-pool mode")
+    parser.add_argument('--paragraphs', type=int, default=6, help="Paragraphs per page (raise for a parse-heavy crawl)")
+    parser.add_argument('--latency', type=float, default=20.0, help="Simulated server latency in ms")
+    parser.add_argument('--modes', nargs='+', default=["sync", "async", "async-pool"])
+    args = parser.parse_args()
+
+    logging.getLogger("src.crawler").setLevel(logging.WARNING)
+    server, base_url = serve_site(generate_site(args.pages, paragraphs=args.paragraphs), latency=args.latency / 1000)
+    try:
+        for mode in args.modes:
+            run(mode, base_url, args.depth, args.concurrency, args.parse_workers)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
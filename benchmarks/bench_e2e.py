@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+from benchmarks.fake_openai import FakeOpenAIStats, serve_fake_openai
+from benchmarks.fixture_site import generate_site, serve_site
+from src.crawler import Crawler
+
+# End-to-end benchmark that runs fully offline: a generated documentation site
+# and a fake OpenAI server on localhost, and three scenarios timed against
+# them (the crawler alone, the CLI, and POST /extract on a running API).
+# Results are written as JSON so runs can be compared with --compare.
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ["crawler", "cli", "api"]
+# Metrics where a lower value is better; the rest are throughput
+LOWER_IS_BETTER = {"p50_seconds", "p90_seconds", "p99_seconds", "mean_seconds",
+                   "parse_ms_per_page", "peak_rss_mb", "prompt_tokens"}
+
+def percentile(samples: List[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples),
+        "p50_seconds": percentile(samples, 0.5),
+        "p90_seconds": percentile(samples, 0.9),
+        "p99_seconds": percentile(samples, 0.99),
+        "mean_seconds": sum(samples) / len(samples),
+    }
+
+def max_rss_mb(max_rss: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def child_env(llm_url: str) -> Dict[str, str]:
+    env = dict(os.environ, OPENAI_BASE_URL=llm_url, OPENAI_API_KEY="benchmark")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def wait_for_exit(process: subprocess.Popen) -> Tuple[int, float]:
+    # Exit status and peak RSS (MB) of a child, from its own resource usage
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, max_rss_mb(usage.ru_maxrss)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def crawler_scenario(args, site_url: str, llm_stats: FakeOpenAIStats) -> Dict[str, Any]:
+    latencies, parse_ms, pages_parsed, pages = [], 0.0, 0, 0
+    for _ in range(args.runs):
+        crawler = Crawler([site_url], max_depth=args.depth, max_concurrency=args.concurrency)
+        start = time.perf_counter()
+        asyncio.run(crawler.crawl_async())
+        latencies.append(time.perf_counter() - start)
+        parse = crawler.timings.summary().get("parse", {"count": 0, "total_ms": 0.0})
+        parse_ms += parse["total_ms"]
+        pages_parsed += parse["count"]
+        pages = len(crawler.visited)
+    result = latency_stats(latencies)
+    result.update({
+        "pages": pages,
+        "pages_stored": len(crawler.content),
+        "pages_per_sec": pages / result["p50_seconds"],
+        "parse_ms_per_page": parse_ms / max(1, pages_parsed),
+        # In-process, so this is the benchmark process's own peak
+        "peak_rss_mb": max_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+    })
+    return result
+
+def cli_scenario(args, site_url: str, llm_stats: FakeOpenAIStats) -> Dict[str, Any]:
+    # Every run starts in an empty directory, so caches are cold
+    latencies, peaks, pages = [], [], 0
+    before = llm_stats.snapshot()
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            command = [sys.executable, os.path.join(ROOT, "module_extractor.py"), "--urls", site_url,
+                       "--depth", str(args.depth), "--engine", args.engine,
+                       "--output", os.path.join(workdir, "output.json")]
+            log_path = os.path.join(workdir, "stdout.log")
+            with open(log_path, "w") as log:
+                start = time.perf_counter()
+                process = subprocess.Popen(command, cwd=workdir, env=child_env(args.llm_url),
+                                           stdout=log, stderr=subprocess.DEVNULL)
+                status, peak = wait_for_exit(process)
+                latencies.append(time.perf_counter() - start)
+            if status != 0:
+                raise RuntimeError(f"module_extractor.py exited with {status}; see its output in {log_path}")
+            with open(log_path) as log:
+                found = re.search(r"Crawled (\d+) pages", log.read())
+            pages = int(found.group(1)) if found else 0
+            peaks.append(peak)
+    return _with_llm_stats(latency_stats(latencies), llm_stats, before, args.runs, pages, peaks)
+
+def api_scenario(args, site_url: str, llm_stats: FakeOpenAIStats) -> Dict[str, Any]:
+    # One server for all runs, as in production: runs after the first reuse
+    # its HTTP and extraction caches, and the first run is reported separately
+    port = free_port()
+    api_url = f"http://127.0.0.1:{port}"
+    body = {"urls": [site_url], "max_depth": args.depth, "max_pages": args.pages, "engine": args.engine}
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+                                  cwd=workdir, env=child_env(args.llm_url),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    requests.get(f"{api_url}/cache/stats", timeout=1)
+                    break
+                except requests.ConnectionError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("API server did not start")
+                    time.sleep(0.2)
+
+            latencies, pages, timings = [], 0, {}
+            before = llm_stats.snapshot()
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                response = requests.post(f"{api_url}/extract", json=body, timeout=600)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                pages = response.json()["pages_crawled"]
+                timings = response.json().get("timings", {})
+        finally:
+            server.terminate()
+            _, peak = wait_for_exit(server)
+    result = _with_llm_stats(latency_stats(latencies), llm_stats, before, args.runs, pages, [peak])
+    result["first_run_seconds"] = latencies[0]
+    # Stage breakdown of the last request, as reported in the response
+    result["stages"] = timings
+    return result
+
+def _with_llm_stats(result: Dict[str, Any], llm_stats: FakeOpenAIStats, before: Dict[str, int],
+                    runs: int, pages: int, peaks: List[float]) -> Dict[str, Any]:
+    after = llm_stats.snapshot()
+    result.update({
+        "pages": pages,
+        "pages_per_sec": pages / result["p50_seconds"],
+        "peak_rss_mb": max(peaks),
+        "prompt_tokens": (after["prompt_tokens"] - before["prompt_tokens"]) / runs,
+        "llm_requests": (after["requests"] - before["requests"]) / runs,
+        "llm_rate_limited": (after["rate_limited"] - before["rate_limited"]) / runs,
+    })
+    return result
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results: Dict[str, Any], baseline_path: str):
+    # Prints every shared metric's change against an earlier results file
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for name, metrics in results["scenarios"].items():
+        old_metrics = baseline.get("scenarios", {}).get(name)
+        if not old_metrics:
+            continue
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if metric == "runs" or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            worse = change > 0 if metric in LOWER_IS_BETTER else change < 0
+            flag = "  <-- regression" if worse and abs(change) >= 10 else ""
+            print(f"{name:>8} {metric:>18}: {old:12.3f} -> {value:12.3f} ({change:+.1f}%){flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark (fixture site + fake OpenAI server)")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--pages', type=int, default=200, help="Pages in the fixture site")
+    parser.add_argument('--depth', type=int, default=3, help="Depth of the fixture site, and of the crawl")
+    parser.add_argument('--paragraphs', type=int, default=6, help="Paragraphs per page (page size)")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help="Fraction of pages that are near-duplicates")
+    parser.add_argument('--site-latency', type=float, default=5.0, help="Simulated site latency in ms")
+    parser.add_argument('--llm-latency', type=float, default=200.0, help="Simulated completion latency in ms")
+    parser.add_argument('--llm-rate-limit', type=int, default=None, help="Completions allowed per second before 429s")
+    parser.add_argument('--engine', choices=["llm", "structure"], default="llm")
+    parser.add_argument('--concurrency', type=int, default=32, help="Async crawl concurrency (crawler scenario)")
+    parser.add_argument('--runs', type=int, default=5, help="Runs per scenario, for latency percentiles")
+    parser.add_argument('--output', type=str, default=None, help="Results file (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument('--compare', type=str, default=None, metavar="RESULTS", help="Earlier results file to compare with")
+    args = parser.parse_args()
+
+    logging.getLogger("src.crawler").setLevel(logging.WARNING)
+    site = generate_site(args.pages, depth=args.depth, paragraphs=args.paragraphs,
+                         duplicate_ratio=args.duplicate_ratio)
+    site_server, site_url = serve_site(site, latency=args.site_latency / 1000)
+    llm_server, args.llm_url, llm_stats = serve_fake_openai(latency=args.llm_latency / 1000,
+                                                            rate_limit=args.llm_rate_limit)
+    scenarios = {"crawler": crawler_scenario, "cli": cli_scenario, "api": api_scenario}
+    results: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "llm_url")},
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios:
+            print(f"Running {name} ({args.runs} runs)...")
+            metrics = scenarios[name](args, site_url, llm_stats)
+            results["scenarios"][name] = metrics
+            print("  " + ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                                   for key, value in metrics.items()))
+    finally:
+        site_server.shutdown()
+        llm_server.shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
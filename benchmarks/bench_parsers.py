@@ -0,0 +1,67 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import generate_site
+from src.crawler import HEADERS
+from src.parsing import available_parsers, get_parser
+
+# Per-page parse time for each HTML backend. Pass --pages-dir with captured
+# documentation pages (see --capture) for realistic markup; otherwise the
+# generated fixture pages are used.
+
+def capture(urls, directory):
+    os.makedirs(directory, exist_ok=True)
+    for i, url in enumerate(urls):
+        request = urllib.request.Request(url, headers=HEADERS)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            html = response.read().decode('utf-8', errors='replace')
+        path = os.path.join(directory, f"page-{i:04d}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"Saved {url} -> {path}")
+
+def load_pages(directory):
+    if directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+        return pages
+    return list(generate_site(num_pages=200, paragraphs=40).values())
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML parser backend micro-benchmark")
+    parser.add_argument('--pages-dir', type=str, help="Directory of captured .html pages")
+    parser.add_argument('--capture', nargs='+', help="Fetch these URLs into --pages-dir first")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes over the page set per backend")
+    parser.add_argument('--backends', nargs='+', default=available_parsers())
+    args = parser.parse_args()
+
+    if args.capture:
+        if not args.pages_dir:
+            parser.error("--capture requires --pages-dir")
+        capture(args.capture, args.pages_dir)
+
+    pages = load_pages(args.pages_dir)
+    total_kb = sum(len(page) for page in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KiB of HTML")
+
+    for name in args.backends:
+        backend = get_parser(name)
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for page in pages:
+                backend.parse("https://example.com/docs/", page)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>12}: {best * 1000 / len(pages):.3f} ms/page")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graphviz
+from src import visualizer
+
+# Times hierarchy rendering as the number of modules grows: the full graph
+# (every module and submodule, orthogonal edges) against the default paged,
+# collapsed view, cold and from the render cache. Layout needs the graphviz
+# executables; without them only graph building is timed.
+
+def make_modules(count: int, submodules: int) -> List[Dict[str, Any]]:
+    return [{
+        "module": f"Module {i}",
+        "Description": f"Everything about area {i} of the product.",
+        "Submodules": {f"Feature {i}.{j}": f"How to configure feature {i}.{j} and its settings."
+                       for j in range(submodules)},
+        "confidence_score": 0.9,
+    } for i in range(count)]
+
+def layout_available() -> bool:
+    try:
+        graphviz.Source("digraph { a }").pipe(format='svg')
+        return True
+    except graphviz.ExecutableNotFound:
+        return False
+
+def timed(work) -> float:
+    start = time.perf_counter()
+    work()
+    return time.perf_counter() - start
+
+def run(count: int, submodules: int, layout: bool, full_layout_limit: int) -> Dict[str, Optional[float]]:
+    modules = make_modules(count, submodules)
+    full = dict(page_size=None, max_submodules=None, fast=False)
+    result: Dict[str, Optional[float]] = {"modules": count}
+    result["full_build"] = timed(lambda: visualizer.create_graph(modules, **full).source)
+    result["full_layout"] = None
+    if layout and count <= full_layout_limit:
+        source = visualizer.create_graph(modules, **full).source
+        result["full_layout"] = timed(lambda: graphviz.Source(source).pipe(format='svg'))
+
+    # Default view: a page of modules with collapsed submodules, through the cache
+    result["paged_cold"] = timed(lambda: visualizer.render_svg(modules) if layout else visualizer.graph_source(modules))
+    result["paged_warm"] = timed(lambda: visualizer.render_svg(modules) if layout else visualizer.graph_source(modules))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Hierarchy rendering benchmark")
+    parser.add_argument('--modules', type=int, nargs='+', default=[10, 50, 100, 250, 500, 1000, 2000])
+    parser.add_argument('--submodules', type=int, default=12, help="Submodules per module")
+    parser.add_argument('--full-layout-limit', type=int, default=250,
+                        help="Largest module count laid out in full (full layouts take minutes beyond this)")
+    parser.add_argument('--output', type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    layout = layout_available()
+    if not layout:
+        print("graphviz executables not found: timing graph building only")
+    results = []
+    print(f"{'modules':>8} {'full build':>11} {'full layout':>12} {'paged cold':>11} {'paged warm':>11}  (seconds)")
+    for count in args.modules:
+        row = run(count, args.submodules, layout, args.full_layout_limit)
+        results.append(row)
+        full_layout = f"{row['full_layout']:12.3f}" if row['full_layout'] is not None else f"{'-':>12}"
+        print(f"{count:>8} {row['full_build']:11.3f} {full_layout} {row['paged_cold']:11.3f} {row['paged_warm']:11.4f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"layout": layout, "submodules": args.submodules, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional, Tuple
+from src.tokens import estimate_tokens
+
+# A local stand-in for the OpenAI chat completions API, so extraction can be
+# benchmarked offline and without cost. Point the client at it with
+# OPENAI_BASE_URL=<base_url> and any OPENAI_API_KEY.
+
+CONTENT_MARKER = "Content to analyze"
+
+def _modules_for(prompt: str) -> List[Dict[str, Any]]:
+    # One module per "Topic N" title found in the chunk, so answers vary with
+    # the content like a real model's would
+    topics = list(dict.fromkeys(re.findall(r'\bTopic \d+\b', prompt.split(CONTENT_MARKER, 1)[-1])))
+    return [{
+        "module": topic,
+        "Description": f"Configuration and settings covered under {topic}.",
+        "Submodules": {f"{topic} settings": f"How to configure the features of {topic}."},
+        "confidence_score": 0.8,
+    } for topic in topics[:20]]
+
+class FakeOpenAIStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited,
+                    "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+def serve_fake_openai(latency: float = 0.0, rate_limit: Optional[int] = None,
+                      retry_after: Optional[float] = None) -> Tuple[ThreadingHTTPServer, str, FakeOpenAIStats]:
+    # `latency` (seconds) is added to every completion. With `rate_limit`,
+    # requests beyond that many per one-second window get a 429 whose
+    # retry-after-ms points at the end of the window (or `retry_after`
+    # seconds when given), like the real API's rate limiter.
+    stats = FakeOpenAIStats()
+    window = {"start": time.monotonic(), "count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _throttled(self) -> Optional[float]:
+            # Seconds until the caller may retry, or None if the request is allowed
+            if rate_limit is None:
+                return None
+            with stats.lock:
+                now = time.monotonic()
+                if now - window["start"] >= 1.0:
+                    window["start"], window["count"] = now, 0
+                if window["count"] < rate_limit:
+                    window["count"] += 1
+                    return None
+                stats.rate_limited += 1
+                return retry_after if retry_after is not None else 1.0 - (now - window["start"])
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            wait = self._throttled()
+            if wait is not None:
+                self._send_json(429, {"error": {"message": "Rate limit reached for requests",
+                                                "type": "requests", "code": "rate_limit_exceeded"}},
+                                {"retry-after-ms": str(int(wait * 1000))})
+                return
+            if latency:
+                time.sleep(latency)
+            prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+            content = json.dumps({"modules": _modules_for(prompt)})
+            prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+            with stats.lock:
+                stats.requests += 1
+                stats.prompt_tokens += prompt_tokens
+                stats.completion_tokens += completion_tokens
+            self._send_json(200, {
+                "id": f"chatcmpl-{stats.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", stats
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional, Tuple
+
+# Generates a synthetic documentation site and serves it over localhost so
+# crawler changes can be measured without touching the network.
+
+PAGE_TEMPLATE = """<html>
+<head><title>{title}</title><style>body {{ font-family: sans-serif; }}</style></head>
+<body>
+<header><a href="/">Home</a></header>
+<nav>{nav}</nav>
+<main>
+<h1>{title}</h1>
+{body}
+<ul>{links}</ul>
+</main>
+<footer>Copyright Example Docs</footer>
+</body>
+</html>"""
+
+def fanout_for_depth(num_pages: int, depth: int) -> int:
+    # Smallest fanout whose tree reaches num_pages within `depth` levels below the home page
+    fanout = 1
+    while sum(fanout ** level for level in range(depth + 1)) < num_pages:
+        fanout += 1
+    return fanout
+
+def generate_site(num_pages: int = 500, fanout: int = 8, paragraphs: int = 6,
+                  sitemap: bool = False, depth: Optional[int] = None,
+                  duplicate_ratio: float = 0.0) -> Dict[str, str]:
+    # Page i links to its children fanout*i+1 .. fanout*i+fanout, giving a
+    # tree that a depth-limited crawl can cover completely; `depth` picks the
+    # fanout that fits every page within that many levels. `paragraphs` sets
+    # the page size. About `duplicate_ratio` of the pages repeat the body of
+    # the page before them under their own title, as near-duplicates for the
+    # crawler's dedupe filter. With `sitemap` the site also serves robots.txt
+    # and a sitemap index listing every page.
+    # __BASE__ is replaced with the server's base URL when served.
+    if depth is not None:
+        fanout = fanout_for_depth(num_pages, depth)
+    pages = {}
+    body = ""
+    for i in range(num_pages):
+        path = "/" if i == 0 else f"/docs/page-{i}"
+        title = "Documentation Home" if i == 0 else f"Topic {i}"
+        children = [c for c in range(fanout * i + 1, fanout * i + fanout + 1) if c < num_pages]
+        links = "".join(f'<li><a href="/docs/page-{c}">Topic {c}</a></li>' for c in children)
+        duplicate = i > 0 and int(i * duplicate_ratio) != int((i - 1) * duplicate_ratio)
+        if not duplicate:
+            body = "\n".join(
+                f"<p>Section {p} of topic {i} explains how to configure feature {i}-{p} "
+                f"and what each of its settings does in day to day use.</p>"
+                for p in range(paragraphs)
+            )
+        pages[path] = PAGE_TEMPLATE.format(title=title, nav='<a href="/">Home</a>', body=body, links=links)
+
+    if sitemap:
+        urls = "".join(f"<url><loc>__BASE__{path.lstrip('/')}</loc><lastmod>2024-01-01</lastmod></url>"
+                       for path in list(pages))
+        pages["/robots.txt"] = "User-agent: *\nSitemap: __BASE__sitemap_index.xml\n"
+        pages["/sitemap_index.xml"] = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            '<sitemap><loc>__BASE__sitemap-pages.xml</loc></sitemap></sitemapindex>'
+        )
+        pages["/sitemap-pages.xml"] = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        )
+    return pages
+
+def serve_site(pages: Dict[str, str], latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    # `latency` (seconds) is added to every response to mimic a remote server
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            html = pages.get(self.path.split('?')[0])
+            if html is None:
+                self.send_error(404)
+                return
+            host, port = self.server.server_address[:2]
+            data = html.replace('__BASE__', f"http://{host}:{port}/").encode('utf-8')
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            content_type = {'.xml': 'application/xml', '.txt': 'text/plain'}.get(os.path.splitext(self.path)[1], 'text/html')
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
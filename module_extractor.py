@@ -2,55 +2,188 @@ import argparse
 import asyncio
 import json
 import sys
+from contextlib import redirect_stdout
 from src.crawler import Crawler
+from src.http_cache import HttpCache
 from src.extractor import Extractor
+from src.batch import BatchExtractor
+from src.checkpoint import CrawlCheckpoint, new_run_id
+from src.page_store import DiskPageStore
+from src.metrics import Timings, format_timings, span
+from src.packing import AUTO_BUDGET, resolve_token_budget
+from src.structure import build_hierarchy
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
-def main():
-    parser = argparse.ArgumentParser(description="Pulse Module Extractor CLI")
-    parser.add_argument('--urls', nargs='+', required=True, help="One or more URLs to crawl")
-    parser.add_argument('--depth', type=int, default=1, help="Crawling depth (default: 1)")
-    parser.add_argument('--model', type=str, default="gpt-4o", help="OpenAI model to use")
-    parser.add_argument('--output', type=str, default="output.json", help="Output JSON file path")
-
-    args = parser.parse_args()
+CRAWL_SETTINGS = ("urls", "depth", "max_pages", "sitemaps")
 
+def run_pipeline(args, emit=None):
+    # `emit` receives NDJSON events in --stream mode
+    run_id = args.resume or new_run_id()
+    checkpoint = CrawlCheckpoint(run_id, {name: getattr(args, name) for name in CRAWL_SETTINGS})
+    if args.resume:
+        saved = checkpoint.load_params()
+        if saved is None:
+            print(f"❌ No saved crawl with run id {run_id}.")
+            sys.exit(1)
+        # The frontier was built with the original settings, so keep them
+        for name in CRAWL_SETTINGS:
+            setattr(args, name, saved[name])
+        checkpoint.params = saved
     print(f"🚀 Starting extraction for: {args.urls}")
+    print(f"🔖 Run id: {run_id} (continue an interrupted crawl with --resume {run_id})")
     
     # 1. Crawl
     print("🕷️  Crawling...")
-    crawler = Crawler(args.urls, max_depth=args.depth)
-    crawler.crawl()
-    content_map = crawler.get_content()
+    on_page = (lambda url, text: emit({"event": "page", "url": url, "chars": len(text)})) if emit else None
+    timings = Timings()
+    crawler = Crawler(args.urls, max_depth=args.depth, http_cache=HttpCache(), on_page=on_page,
+                      parse_workers=args.parse_workers, max_pages=args.max_pages,
+                      use_sitemaps=args.sitemaps, checkpoint=checkpoint, page_store=DiskPageStore(),
+                      timings=timings)
+    try:
+        asyncio.run(crawler.crawl_async())
+        content_map = crawler.get_content()
     
-    if not content_map:
-        print("❌ No content extracted. Exiting.")
-        sys.exit(1)
+        if not content_map:
+            print("❌ No content extracted. Exiting.")
+            if emit:
+                emit({"event": "error", "detail": "No content extracted."})
+            sys.exit(1)
         
-    print(f"✅ Crawled {len(content_map)} pages.")
-    
-    # 2. Extract
-    print("🧠 Analyzing with AI...")
-    full_text = "\n\n".join(content_map.values())
+        print(f"✅ Crawled {len(content_map)} pages.")
+        if crawler.dedup and crawler.dedup.pages_dropped:
+            dedup = crawler.dedup.stats()
+            print(f"🧹 Dropped {dedup['pages_dropped']} near-duplicate pages "
+                  f"({dedup['bytes_removed']} bytes, ~{dedup['tokens_removed']} tokens)")
+        if crawler.boilerplate_removed['lines_removed']:
+            boilerplate = crawler.boilerplate_removed
+            print(f"✂️  Stripped {boilerplate['lines_removed']} boilerplate lines ({boilerplate['bytes_removed']} bytes)")
+        if emit:
+            emit({"event": "crawl_complete", "pages_crawled": len(content_map),
+                  "chars": sum(len(text) for text in content_map.values()),
+                  "duplicates": crawler.dedup.stats() if crawler.dedup else None})
     
-    extractor = Extractor(model=args.model)
-    try:
-        modules = extractor.extract(full_text)
+        # 2. Extract
+        print("🧠 Analyzing with AI...")
+        on_chunk = None
+        if emit:
+            on_chunk = lambda index, total, modules, cached: emit(
+                {"event": "chunk", "index": index, "total": total, "cached": cached, "modules": modules})
+        extractor = Extractor(model=args.model, timings=timings)
+        budget = resolve_token_budget(args.token_budget, args.model)
+        try:
+            if args.engine == "structure":
+                with span("extract", timings):
+                    modules = build_hierarchy(content_map, crawler.outlines, crawler.path_prefixes)
+                    print(f"🏗️  Built {len(modules)} modules from page structure")
+                    if args.describe:
+                        modules = extractor.describe_modules(modules, parallelism=args.parallelism)
+            else:
+                with span("extract", timings):
+                    modules = extractor.extract_chunked(content_map, parallelism=args.parallelism, on_chunk=on_chunk,
+                                                        token_budget=budget)
+                run = extractor.last_run
+                if 'tokens_used' in run:
+                    print(f"🎯 Sent {run['tokens_used']} tokens, dropped {run['tokens_dropped']} tokens "
+                          f"({run['sections_dropped']} low-value sections) to fit the budget of {budget}")
+                print(f"♻️  Re-analysed {run['chunks_extracted']} of {run['chunks']} chunks ({run['chunks_reused']} unchanged)")
         
-        # 3. Output
-        print(json.dumps(modules, indent=2))
+            # 3. Output
+            print(json.dumps(modules, indent=2))
+            if emit:
+                emit({"event": "result", "modules": modules, "pages_crawled": len(content_map),
+                      "timings": timings.summary()})
         
-        with open(args.output, 'w') as f:
-            json.dump(modules, f, indent=2)
-        print(f"\n💾 Results saved to {args.output}")
+            with open(args.output, 'w') as f:
+                json.dump(modules, f, indent=2)
+            print(f"\n💾 Results saved to {args.output}")
+            stats = extractor.cache.stats()
+            print(f"🗄️  Extraction cache: {stats['hits']} hits, {stats['misses']} misses")
+            llm = extractor.dispatcher.stats()
+            if llm['retries']:
+                print(f"⏳ LLM calls: {llm['calls']} ({llm['retries']} retried, {llm['throttled']} rate limited)")
+            if extractor.usage['prompt']:
+                print(f"🔢 Tokens: {extractor.usage['prompt']} prompt, {extractor.usage['completion']} completion")
+            print(f"⏱️  Timings:\n{format_timings(timings.summary())}")
         
-    except Exception as e:
-        print(f"❌ Error during extraction: {e}")
+        except Exception as e:
+            print(f"❌ Error during extraction: {e}")
+            if emit:
+                emit({"event": "error", "detail": str(e)})
+            sys.exit(1)
+    finally:
+        # Removes the page segments, also when exiting early
+        crawler.close()
+
+def run_batch(args, emit=None):
+    # --batch: every URL in --urls is a separate site with its own modules
+    sites = [[url] for url in args.urls]
+    print(f"🚀 Starting batch extraction for {len(sites)} sites")
+    runner = BatchExtractor(model=args.model, max_depth=args.depth, max_pages=args.max_pages,
+                            engine=args.engine, describe=args.describe, token_budget=args.token_budget,
+                            parallelism=args.parallelism, use_sitemaps=args.sitemaps,
+                            site_concurrency=args.site_concurrency, parse_workers=args.parse_workers)
+
+    def on_result(result):
+        if result.error:
+            print(f"❌ {result.site}: {result.error}")
+        else:
+            print(f"✅ {result.site}: {len(result.modules)} modules from {result.pages_crawled} pages in {result.seconds:.1f}s")
+        if emit:
+            emit({"event": "site", **result.to_dict()})
+
+    results = runner.run_sync(sites, on_result)
+    output = {result.site: result.modules for result in results if not result.error}
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\n💾 Results for {len(output)} of {len(results)} sites saved to {args.output}")
+    if not output:
         sys.exit(1)
 
+def parse_token_budget(value: str):
+    return value if value == AUTO_BUDGET else int(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pulse Module Extractor CLI")
+    parser.add_argument('--urls', nargs='+', help="One or more URLs to crawl")
+    parser.add_argument('--resume', type=str, default=None, metavar="RUN_ID", help="Continue an interrupted crawl from its checkpoint (uses the run's saved URLs and crawl settings)")
+    parser.add_argument('--depth', type=int, default=1, help="Crawling depth (default: 1)")
+    parser.add_argument('--max-pages', type=int, default=None, help="Stop after fetching this many pages (default: no limit)")
+    parser.add_argument('--sitemaps', action='store_true', help="Discover pages from robots.txt / sitemap.xml")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Processes used to parse pages (default: 0, parse inline)")
+    parser.add_argument('--model', type=str, default="gpt-4o", help="OpenAI model to use")
+    parser.add_argument('--engine', choices=["llm", "structure"], default="llm", help="'structure' builds the hierarchy from headings, breadcrumbs and URL paths without the LLM (default: llm)")
+    parser.add_argument('--describe', action='store_true', help="With --engine structure, have the LLM rewrite descriptions and confidence scores")
+    parser.add_argument('--token-budget', type=parse_token_budget, default=None, help="Pack page content into this many tokens, keeping the most informative sections; 'auto' uses the model's budget (default: send everything)")
+    parser.add_argument('--parallelism', type=int, default=4, help="Concurrent LLM calls for chunked extraction (default: 4)")
+    parser.add_argument('--batch', action='store_true', help="Treat every URL as a separate site, extracted concurrently with its own modules")
+    parser.add_argument('--site-concurrency', type=int, default=8, help="Sites crawled at once in --batch mode (default: 8)")
+    parser.add_argument('--output', type=str, default="output.json", help="Output JSON file path")
+    parser.add_argument('--stream', action='store_true', help="Write progress and results to stdout as NDJSON events")
+
+    args = parser.parse_args()
+    if not args.urls and not args.resume:
+        parser.error("--urls is required unless --resume is given")
+    if args.batch and args.resume:
+        parser.error("--resume cannot be combined with --batch")
+    run = run_batch if args.batch else run_pipeline
+
+    if not args.stream:
+        run(args)
+        return
+
+    # Keep stdout clean for the event stream; human-readable output goes to stderr
+    out = sys.stdout
+    def emit(event):
+        out.write(json.dumps(event) + "\n")
+        out.flush()
+
+    with redirect_stdout(sys.stderr):
+        run(args, emit)
+
 if __name__ == "__main__":
     main()
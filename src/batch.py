@@ -0,0 +1,144 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Union
+from src.cache import CacheBackend
+from src.crawler import Crawler, create_async_session
+from src.dispatcher import BATCH
+from src.extractor import Extractor
+from src.http_cache import HttpCache
+from src.metrics import Timings, span
+from src.packing import resolve_token_budget
+from src.page_store import DEFAULT_PAGES_DIR, DiskPageStore
+from src.parsing import ParsePool, resolve_parser_name
+from src.structure import build_hierarchy
+
+def extract_modules(extractor: Extractor, crawler: Crawler, content_map: Mapping[str, str],
+                    engine: str = "llm", describe: bool = False, token_budget: Union[int, str, None] = None,
+                    parallelism: int = 4,
+                    on_chunk: Optional[Callable[[int, int, List[Dict[str, Any]], bool], None]] = None
+                    ) -> List[Dict[str, Any]]:
+    # Runs the selected extraction engine over a finished crawl. Content is
+    # only packed with a token budget: an int, or "auto" for the model's.
+    with span("extract", extractor.timings):
+        if engine == "structure":
+            modules = build_hierarchy(content_map, crawler.outlines, crawler.path_prefixes)
+            if describe:
+                modules = extractor.describe_modules(modules, parallelism=parallelism)
+            return modules
+        return extractor.extract_chunked(content_map, parallelism=parallelism, on_chunk=on_chunk,
+                                         token_budget=resolve_token_budget(token_budget, extractor.model))
+
+@dataclass
+class SiteResult:
+    site: str
+    urls: List[str]
+    modules: List[Dict[str, Any]] = field(default_factory=list)
+    pages_crawled: int = 0
+    error: Optional[str] = None
+    seconds: float = 0.0
+    # Time per pipeline stage, as in Timings.summary()
+    timings: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+# Extracts many documentation sites in one run, keeping every site's modules
+# separate. All crawls share one connection pool (with its per-host limit)
+# and one parse pool, and run up to `site_concurrency` at once. A site's
+# extraction starts as soon as its own crawl is done and shares the model's
+# dispatcher with every other site, so the batch takes about as long as its
+# slowest site rather than the sum of all of them.
+class BatchExtractor:
+    def __init__(self, model: str = "gpt-4o", max_depth: int = 1, max_pages: Optional[int] = 15,
+                 engine: str = "llm", describe: bool = False, token_budget: Union[int, str, None] = None,
+                 parallelism: int = 4, use_sitemaps: bool = False, site_concurrency: int = 8,
+                 max_connections: int = 64, per_host_limit: int = 8, parse_workers: int = 0,
+                 priority: int = BATCH, http_cache: Optional[HttpCache] = None,
+                 cache: Optional[CacheBackend] = None, pages_dir: str = DEFAULT_PAGES_DIR,
+                 parse_executor: Optional[ProcessPoolExecutor] = None):
+        self.model = model
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.engine = engine
+        self.describe = describe
+        self.token_budget = token_budget
+        self.parallelism = parallelism
+        self.use_sitemaps = use_sitemaps
+        self.site_concurrency = site_concurrency
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.parse_workers = parse_workers
+        self.priority = priority
+        # Shared by every site; defaults to the on-disk caches under .pulse_cache
+        self.http_cache = http_cache if http_cache is not None else HttpCache()
+        self.cache = cache
+        self.pages_dir = pages_dir
+        # Worker processes shared with other runs; without one, parse_workers > 0 starts its own
+        self.parse_executor = parse_executor
+
+    async def run(self, sites: List[List[str]]) -> AsyncIterator[SiteResult]:
+        # Yields each site's result as soon as that site is finished
+        loop = asyncio.get_running_loop()
+        crawl_slots = asyncio.Semaphore(self.site_concurrency)
+        extraction_threads = ThreadPoolExecutor(max_workers=self.site_concurrency, thread_name_prefix="pulse-batch")
+        parse_pool = None
+        if self.parse_workers > 0:
+            parse_pool = ParsePool(resolve_parser_name(), workers=self.parse_workers, executor=self.parse_executor)
+
+        async def process(urls: List[str]) -> SiteResult:
+            result = SiteResult(site=urls[0], urls=urls)
+            started = time.perf_counter()
+            timings = Timings()
+            crawler = Crawler(urls, max_depth=self.max_depth, max_pages=self.max_pages,
+                              http_cache=self.http_cache, use_sitemaps=self.use_sitemaps,
+                              per_host_limit=self.per_host_limit, page_store=DiskPageStore(directory=self.pages_dir),
+                              timings=timings)
+            try:
+                async with crawl_slots:
+                    await crawler.crawl_async(session, parse_pool)
+                content_map = crawler.get_content()
+                result.pages_crawled = len(content_map)
+                if not content_map:
+                    result.error = "No content found to extract."
+                else:
+                    result.modules = await loop.run_in_executor(extraction_threads, self._extract, crawler, content_map)
+            except Exception as e:
+                result.error = str(e)
+            finally:
+                crawler.close()
+            result.seconds = time.perf_counter() - started
+            result.timings = timings.summary()
+            return result
+
+        try:
+            async with create_async_session(self.max_connections, self.per_host_limit) as session:
+                tasks = [asyncio.ensure_future(process(urls)) for urls in sites]
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        yield await next_done
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            extraction_threads.shutdown(wait=False, cancel_futures=True)
+            if parse_pool is not None:
+                await parse_pool.close()
+
+    def _extract(self, crawler: Crawler, content_map: Mapping[str, str]) -> List[Dict[str, Any]]:
+        extractor = Extractor(model=self.model, cache=self.cache, priority=self.priority, timings=crawler.timings)
+        return extract_modules(extractor, crawler, content_map, self.engine, self.describe,
+                               self.token_budget, self.parallelism)
+
+    def run_sync(self, sites: List[List[str]],
+                 on_result: Optional[Callable[[SiteResult], None]] = None) -> List[SiteResult]:
+        async def collect() -> List[SiteResult]:
+            results = []
+            async for result in self.run(sites):
+                results.append(result)
+                if on_result:
+                    on_result(result)
+            return results
+        return asyncio.run(collect())
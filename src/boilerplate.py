@@ -0,0 +1,51 @@
+import hashlib
+import re
+from typing import Dict, Tuple
+
+SPACES = re.compile(r'\s+')
+
+def line_hash(line: str) -> int:
+    # Lines are compared case- and whitespace-insensitively, as 64-bit digests
+    normalized = SPACES.sub(' ', line.strip().lower())
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), 'big')
+
+# Finds site chrome that survives the main-content selectors (cookie banners,
+# breadcrumbs, "Was this helpful?" blocks) by counting on how many pages each
+# line occurs. Counts are updated as each page arrives, so no extra pass over
+# the crawl is needed; lines found on more than `max_fraction` of the pages
+# are stripped when the text is handed to extraction.
+class BoilerplateFilter:
+    def __init__(self, max_fraction: float = 0.5, min_pages: int = 5):
+        self.max_fraction = max_fraction
+        self.min_pages = min_pages
+        self.pages = 0
+        self._counts: Dict[int, int] = {}
+
+    def add(self, text: str):
+        self.pages += 1
+        for digest in {line_hash(line) for line in text.splitlines() if line.strip()}:
+            self._counts[digest] = self._counts.get(digest, 0) + 1
+
+    def is_boilerplate(self, line: str) -> bool:
+        if self.pages < self.min_pages:
+            return False
+        return self._counts.get(line_hash(line), 0) > self.max_fraction * self.pages
+
+    def clean(self, text: str) -> str:
+        return self.strip(text)[0]
+
+    def strip(self, text: str) -> Tuple[str, int, int]:
+        # Returns the cleaned text with the number of lines and bytes removed.
+        # Nothing is counted here, so cleaning the same pages again is harmless.
+        kept = []
+        lines_removed = bytes_removed = 0
+        for line in text.splitlines():
+            if self.is_boilerplate(line):
+                lines_removed += 1
+                bytes_removed += len(line.encode('utf-8')) + 1
+            else:
+                kept.append(line)
+        return '\n'.join(kept), lines_removed, bytes_removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"pages": self.pages, "distinct_lines": len(self._counts)}
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from src.parsing import Outline
+
+if TYPE_CHECKING:
+    from src.crawler import Crawler
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(".pulse_cache", "crawl_checkpoints.sqlite")
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+# Bumped when the tables change; checkpoints in an older layout are dropped
+SCHEMA_VERSION = 2
+
+# What a checkpoint save writes: everything that changed since the previous
+# save. Collected on the crawl's thread (or event loop) and written elsewhere.
+@dataclass
+class CheckpointChanges:
+    state: Dict[str, Any]
+    # URLs added to the frontier, as (url, depth, sitemap lastmod)
+    queued: List[Tuple[str, int, Optional[float]]]
+    # URLs whose page is done, which leave the saved frontier
+    done: List[str]
+    # Visited-set digests added, packed as array('Q') bytes
+    visited: bytes
+    # Pages stored, as (url, text, outline json)
+    pages: List[Tuple[str, str, str]]
+    # Saved pages since replaced by a near-duplicate with a smaller URL
+    dropped: List[str]
+
+# Durable state of one crawl run, so a crawl that dies part-way can be
+# resumed instead of restarted. A checkpoint holds the frontier (queued and
+# in-flight URLs), the visited set and the pages stored so far. Saves are
+# incremental: each one only writes the URLs queued and finished, digests
+# visited and pages stored since the last, so their cost does not grow with
+# the crawl. Runs that have not been touched for `max_age` seconds are removed.
+class CrawlCheckpoint:
+    def __init__(self, run_id: str, params: Optional[Dict[str, Any]] = None,
+                 path: str = DEFAULT_CHECKPOINT_PATH, max_age: Optional[float] = 7 * 24 * 3600):
+        self.run_id = run_id
+        self.params = params or {}
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                for table in ("runs", "frontier", "visited", "pages"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS frontier (
+                    run_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    lastmod REAL,
+                    PRIMARY KEY (run_id, url)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS visited (
+                    run_id TEXT NOT NULL,
+                    digests BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS visited_run ON visited (run_id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    run_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    outline TEXT NOT NULL,
+                    PRIMARY KEY (run_id, url)
+                )
+            """)
+            if max_age is not None:
+                stale = [row[0] for row in conn.execute("SELECT run_id FROM runs WHERE updated_at < ?",
+                                                        (time.time() - max_age,))]
+                for stale_id in stale:
+                    for table in ("pages", "visited", "frontier", "runs"):
+                        conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (stale_id,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (self.run_id,)).fetchone() is not None
+
+    def load_params(self) -> Optional[Dict[str, Any]]:
+        # Parameters of the run as saved, e.g. to resume a CLI run from just its id
+        with self._connect() as conn:
+            row = conn.execute("SELECT params FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def changes(self, crawler: "Crawler") -> CheckpointChanges:
+        # Takes what changed since the last call; cheap, as only new pages are read back
+        added = crawler.frontier.take_journal()
+        stored, done, dropped = crawler.take_progress()
+        state = {
+            "frontier": crawler.frontier.state(len(crawler.in_flight)),
+            "sitemap_urls": crawler.sitemap_urls,
+            "duplicates": crawler.dedup.stats() if crawler.dedup else None,
+        }
+        return CheckpointChanges(
+            state=state,
+            queued=[(url, depth, crawler.lastmod.get(url)) for url, depth, _ in added],
+            done=done,
+            visited=array('Q', [digest for _, _, digest in added]).tobytes(),
+            pages=[(url, crawler.content[url], json.dumps(asdict(crawler.outlines[url])))
+                   for url in stored if url in crawler.content],
+            dropped=dropped,
+        )
+
+    def write(self, changes: CheckpointChanges):
+        # Blocking; safe to run in another thread as long as writes stay in order
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO frontier (run_id, url, depth, lastmod) VALUES (?, ?, ?, ?)",
+                             [(self.run_id, *queued) for queued in changes.queued])
+            conn.executemany("DELETE FROM frontier WHERE run_id = ? AND url = ?",
+                             [(self.run_id, url) for url in changes.done])
+            if changes.visited:
+                conn.execute("INSERT INTO visited (run_id, digests) VALUES (?, ?)", (self.run_id, changes.visited))
+            conn.executemany("INSERT OR REPLACE INTO pages (run_id, url, text, outline) VALUES (?, ?, ?, ?)",
+                             [(self.run_id, *page) for page in changes.pages])
+            conn.executemany("DELETE FROM pages WHERE run_id = ? AND url = ?",
+                             [(self.run_id, url) for url in changes.dropped])
+            conn.execute("INSERT OR REPLACE INTO runs (run_id, params, state, updated_at) VALUES (?, ?, ?, ?)",
+                         (self.run_id, json.dumps(self.params), json.dumps(changes.state), time.time()))
+
+    def save(self, crawler: "Crawler"):
+        self.write(self.changes(crawler))
+
+    def restore(self, crawler: "Crawler") -> bool:
+        # Loads the saved run into a fresh crawler; False if there is nothing to resume
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+            if row is None:
+                return False
+            state = json.loads(row[0])
+            visited = array('Q')
+            for (digests,) in conn.execute("SELECT digests FROM visited WHERE run_id = ? ORDER BY rowid", (self.run_id,)):
+                visited.frombytes(digests)
+            queued = []
+            for url, depth, lastmod in conn.execute("SELECT url, depth, lastmod FROM frontier WHERE run_id = ?",
+                                                    (self.run_id,)):
+                queued.append((url, depth))
+                if lastmod is not None:
+                    crawler.lastmod[url] = lastmod
+            crawler.frontier.restore(state["frontier"], visited, queued)
+            crawler.sitemap_urls = state["sitemap_urls"]
+
+            # Pages are read a row at a time, so they go straight into the crawler's page store
+            pages = conn.execute("SELECT url, text, outline FROM pages WHERE run_id = ? ORDER BY rowid", (self.run_id,))
+            for url, text, outline in pages:
+                outline = json.loads(outline)
+                crawler.content[url] = text
+                crawler.outlines[url] = Outline(outline["breadcrumbs"], [tuple(heading) for heading in outline["headings"]])
+                # Rebuild the filters' indexes from the pages they had accepted
+                if crawler.dedup:
+                    crawler.dedup.check(url, text)
+                if crawler.boilerplate:
+                    crawler.boilerplate.add(text)
+        if crawler.dedup and state["duplicates"]:
+            for key, value in state["duplicates"].items():
+                setattr(crawler.dedup, key, value)
+        return True
@@ -1,99 +1,522 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
+import aiohttp
+from requests.adapters import HTTPAdapter
+from collections import defaultdict
 from urllib.parse import urljoin, urlparse
-from typing import Set, List, Dict
+from typing import Callable, Iterable, List, Dict, MutableMapping, Optional, Tuple
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from src.http_cache import HttpCache
+from src.parsing import Outline, ParsePool, ParsedPage, get_parser
+from src.frontier import Frontier, VisitedSet
+from src.dedup import NearDuplicateFilter
+from src.boilerplate import BoilerplateFilter
+from src.sitemap import SitemapEntry, SitemapParser, parse_robots_sitemaps
+from src.checkpoint import CrawlCheckpoint
+from src.page_store import DiskPageStore, close_stores
+from src.metrics import Timings, record_page, record_response, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on sitemap files read per crawl (indexes can nest deeply)
+MAX_SITEMAPS = 50
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def create_async_session(max_concurrency: int = 32, per_host_limit: int = 8) -> aiohttp.ClientSession:
+    # The connector's limits hold across every crawl sharing the session
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host_limit)
+    timeout = aiohttp.ClientTimeout(total=10)
+    return aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout)
+
 class Crawler:
-    def __init__(self, start_urls: List[str], max_depth: int = 2):
+    def __init__(self, start_urls: List[str], max_depth: int = 2,
+                 max_concurrency: int = 32, per_host_limit: int = 8,
+                 http_cache: Optional[HttpCache] = None,
+                 on_page: Optional[Callable[[str, str], None]] = None,
+                 parser: str = "auto", parse_workers: int = 0,
+                 max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+                 use_sitemaps: bool = False, path_prefixes: Optional[List[str]] = None,
+                 max_sitemap_urls: int = 50000, dedupe_threshold: Optional[float] = 0.85,
+                 boilerplate_fraction: Optional[float] = 0.5,
+                 checkpoint: Optional[CrawlCheckpoint] = None, checkpoint_pages: int = 25,
+                 page_store: Optional[DiskPageStore] = None, timings: Optional[Timings] = None,
+                 parse_executor: Optional[ProcessPoolExecutor] = None):
         self.start_urls = start_urls
         self.max_depth = max_depth
-        self.visited: Set[str] = set()
-        self.content: Dict[str, str] = {}
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.http_cache = http_cache
+        # Called with (url, text) for every page stored, e.g. to stream progress
+        self.on_page = on_page
+        self.parser = get_parser(parser)
+        # With parse_workers > 0 the async crawl parses pages in a process pool
+        self.parse_workers = parse_workers
+        # Worker processes shared with other crawls (see create_parse_executor); without
+        # one, the crawl starts and stops its own
+        self.parse_executor = parse_executor
+        self._parse_pool: Optional[ParsePool] = None
+        self._session: Optional[requests.Session] = None
+        # Canonical-URL dedupe, priority order and the page/byte budget
+        self.frontier = Frontier(max_pages=max_pages, max_bytes=max_bytes)
+        self.visited: VisitedSet = self.frontier.visited
+        # Page text by URL; a DiskPageStore keeps it compressed on disk instead of in memory
+        self.content: MutableMapping[str, str] = page_store if page_store is not None else {}
+        self._cleaned_stores: List[DiskPageStore] = []
+        # Breadcrumbs and headings of every stored page, for structural extraction
+        self.outlines: Dict[str, Outline] = {}
         self.base_domains = {urlparse(url).netloc for url in start_urls}
+        # Sitemap discovery: pages listed in robots.txt sitemaps under these path
+        # prefixes (by default the start URLs' directories) go straight into the frontier
+        self.use_sitemaps = use_sitemaps
+        self.path_prefixes = path_prefixes or sorted({
+            urlparse(url).path.rsplit('/', 1)[0] + '/' for url in self.start_urls
+        })
+        self.max_sitemap_urls = max_sitemap_urls
+        self.sitemap_urls = 0
+        self.lastmod: Dict[str, float] = {}
+        # Pages at least this similar (estimated Jaccard) to a stored page are dropped; None keeps all
+        self.dedup = NearDuplicateFilter(dedupe_threshold) if dedupe_threshold else None
+        # Lines repeated on more than this fraction of pages are stripped by get_content(); None keeps them
+        self.boilerplate = BoilerplateFilter(boilerplate_fraction) if boilerplate_fraction else None
+        # Boilerplate stripped by the last get_content() call
+        self.boilerplate_removed: Dict[str, int] = {"lines_removed": 0, "bytes_removed": 0}
+        # Saved every `checkpoint_pages` pages and when the crawl stops; a crawl
+        # given a checkpoint that already holds a run continues from it
+        self.checkpoint = checkpoint
+        self.checkpoint_pages = checkpoint_pages
+        self._pages_since_checkpoint = 0
+        # Pages stored and finished since the last save, for incremental checkpoints
+        self._stored_since_checkpoint: List[str] = []
+        self._done_since_checkpoint: List[str] = []
+        self._dropped_since_checkpoint: List[str] = []
+        # The async crawl's latest checkpoint write; each write waits for the one before
+        self._checkpoint_write: Optional[asyncio.Future] = None
+        if checkpoint is not None:
+            self.frontier.start_journal()
+        # Popped from the frontier but not finished yet, url -> depth
+        self.in_flight: Dict[str, int] = {}
+        # Time spent per stage (crawl, fetch, parse, clean, links) in this crawl
+        self.timings = timings if timings is not None else Timings()
 
     def is_valid_url(self, url: str) -> bool:
         parsed = urlparse(url)
         return bool(parsed.netloc) and parsed.netloc in self.base_domains
 
-    def crawl(self):
+    @property
+    def session(self) -> requests.Session:
+        # One pooled session per crawler so connections are kept alive across pages
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.per_host_limit)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def _seed_frontier(self) -> bool:
+        # Returns False when resuming, which also skips sitemap discovery
+        if self.checkpoint is not None and self.checkpoint.restore(self):
+            logger.info(f"Resuming run {self.checkpoint.run_id}: {len(self.content)} pages stored, "
+                        f"{len(self.frontier)} queued")
+            return False
         for url in self.start_urls:
-            self._crawl_recursive(url, 0)
+            self.frontier.add(url, 0)
+        return True
 
-    def _crawl_recursive(self, url: str, depth: int):
-        if depth > self.max_depth or url in self.visited:
+    def _page_done(self, url: str):
+        del self.in_flight[url]
+        if self.checkpoint is None:
             return
+        self._done_since_checkpoint.append(url)
+        self._pages_since_checkpoint += 1
+        if self._pages_since_checkpoint >= self.checkpoint_pages:
+            if self._checkpoint_write is not None:
+                self._queue_checkpoint()
+            else:
+                self.save_checkpoint()
+
+    def take_progress(self) -> Tuple[List[str], List[str], List[str]]:
+        # Pages stored, pages finished and stored pages dropped as near-duplicates
+        # since the last call, for the checkpoint
+        stored, done, dropped = (self._stored_since_checkpoint, self._done_since_checkpoint,
+                                 self._dropped_since_checkpoint)
+        self._stored_since_checkpoint, self._done_since_checkpoint, self._dropped_since_checkpoint = [], [], []
+        return stored, done, dropped
+
+    def save_checkpoint(self):
+        # Blocking save, for the sync crawl
+        if self.checkpoint is not None:
+            self.checkpoint.save(self)
+            self._pages_since_checkpoint = 0
+
+    def _queue_checkpoint(self) -> asyncio.Future:
+        # Async crawl: changes are collected on the event loop, which is cheap,
+        # and written to SQLite in a thread, after any earlier write
+        changes = self.checkpoint.changes(self)
+        self._pages_since_checkpoint = 0
+        previous = self._checkpoint_write
+
+        async def write():
+            if previous is not None:
+                await previous
+            await asyncio.to_thread(self.checkpoint.write, changes)
+        self._checkpoint_write = asyncio.ensure_future(write())
+        return self._checkpoint_write
+
+    def _robots_urls(self) -> List[str]:
+        roots = []
+        for url in self.start_urls:
+            parsed = urlparse(url)
+            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+            if robots_url not in roots:
+                roots.append(robots_url)
+        return roots
+
+    def _default_sitemap(self, robots_url: str) -> str:
+        return robots_url[:-len('robots.txt')] + 'sitemap.xml'
 
-        self.visited.add(url)
+    def _add_sitemap_entries(self, entries: Iterable[SitemapEntry], sitemap_queue: List[str]):
+        for kind, loc, lastmod in entries:
+            if kind == 'sitemap':
+                sitemap_queue.append(loc)
+                continue
+            if self.sitemap_urls >= self.max_sitemap_urls:
+                continue
+            if not self.is_valid_url(loc) or not any(urlparse(loc).path.startswith(prefix) for prefix in self.path_prefixes):
+                continue
+            # Sitemap pages are leaves: the sitemap already lists the site, so
+            # their links are not followed
+            if lastmod is not None:
+                self.lastmod[loc] = lastmod
+            if self.frontier.add(loc, self.max_depth):
+                self.sitemap_urls += 1
+
+    def discover_sitemaps(self):
+        sitemap_queue: List[str] = []
+        for robots_url in self._robots_urls():
+            try:
+                response = self.session.get(robots_url, timeout=10)
+                found = parse_robots_sitemaps(response.text) if response.status_code == 200 else []
+                found = [urljoin(robots_url, sitemap) for sitemap in found]
+            except Exception as e:
+                logger.warning(f"Could not read {robots_url}: {e}")
+                found = []
+            sitemap_queue.extend(found or [self._default_sitemap(robots_url)])
+
+        seen = set()
+        while sitemap_queue and len(seen) < MAX_SITEMAPS:
+            sitemap_url = sitemap_queue.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            parser = SitemapParser()
+            try:
+                with self.session.get(sitemap_url, timeout=30, stream=True) as response:
+                    if response.status_code != 200:
+                        continue
+                    for chunk in response.iter_content(chunk_size=65536):
+                        self._add_sitemap_entries(parser.feed(chunk), sitemap_queue)
+                self._add_sitemap_entries(parser.close(), sitemap_queue)
+            except Exception as e:
+                logger.warning(f"Could not read sitemap {sitemap_url}: {e}")
+        logger.info(f"Sitemaps: queued {self.sitemap_urls} pages from {len(seen)} sitemaps")
+
+    async def discover_sitemaps_async(self, session: aiohttp.ClientSession):
+        sitemap_queue: List[str] = []
+        for robots_url in self._robots_urls():
+            try:
+                async with session.get(robots_url) as response:
+                    found = parse_robots_sitemaps(await response.text(errors='replace')) if response.status == 200 else []
+                found = [urljoin(robots_url, sitemap) for sitemap in found]
+            except Exception as e:
+                logger.warning(f"Could not read {robots_url}: {e}")
+                found = []
+            sitemap_queue.extend(found or [self._default_sitemap(robots_url)])
+
+        seen = set()
+        while sitemap_queue and len(seen) < MAX_SITEMAPS:
+            sitemap_url = sitemap_queue.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            parser = SitemapParser()
+            try:
+                async with session.get(sitemap_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                    if response.status != 200:
+                        continue
+                    async for chunk in response.content.iter_chunked(65536):
+                        self._add_sitemap_entries(parser.feed(chunk), sitemap_queue)
+                self._add_sitemap_entries(parser.close(), sitemap_queue)
+            except Exception as e:
+                logger.warning(f"Could not read sitemap {sitemap_url}: {e}")
+        logger.info(f"Sitemaps: queued {self.sitemap_urls} pages from {len(seen)} sitemaps")
+
+    def crawl(self):
+        with span("crawl", self.timings):
+            if self._seed_frontier() and self.use_sitemaps:
+                self.discover_sitemaps()
+            try:
+                while True:
+                    item = self.frontier.pop()
+                    if item is None:
+                        break
+                    url, depth = item
+                    self.in_flight[url] = depth
+                    self._enqueue_links(self._crawl_page(url, depth), depth)
+                    self._page_done(url)
+            finally:
+                self.save_checkpoint()
+
+    def _enqueue_links(self, links: List[str], depth: int):
+        with span("links", self.timings):
+            for link in links:
+                if self.is_valid_url(link):
+                    self.frontier.add(link, depth + 1)
+
+    def _crawl_page(self, url: str, depth: int) -> List[str]:
         logger.info(f"Crawling: {url} (Depth: {depth})")
-        
+
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code != 200:
-                logger.warning(f"Failed to fetch {url}: Status {response.status_code}")
-                return
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-
-            # Extract text content
-            # Try multiple selectors to find the main content
-            selectors = [
-                ('main', {}),
-                ('article', {}),
-                ('div', {'role': 'main'}),
-                ('div', {'class': 'content'}),
-                ('div', {'class': 'main-content'}),
-                ('div', {'id': 'content'}),
-                ('div', {'id': 'main'}),
-                ('body', {}) # Fallback
-            ]
-            
-            main_content = None
-            for tag, attrs in selectors:
-                main_content = soup.find(tag, attrs)
-                if main_content:
-                    break
-            
-            if main_content:
-                # Remove navigation and footer elements within the main content
-                for tag in main_content.find_all(['nav', 'footer', 'header', 'aside']):
-                    tag.decompose()
-                    
-                text = main_content.get_text(separator='\n', strip=True)
-                # Basic cleaning
-                lines = [line.strip() for line in text.splitlines() if line.strip()]
-                cleaned_text = '\n'.join(lines)
-                
-                if len(cleaned_text) > 100: # Only save if we got meaningful content
-                    self.content[url] = cleaned_text
-                    logger.info(f"Extracted {len(cleaned_text)} chars from {url}")
-                else:
-                    logger.warning(f"Content too short for {url}")
-
-            # Find links
-            if depth < self.max_depth:
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    full_url = urljoin(url, href)
-                    # Remove fragments
-                    full_url = full_url.split('#')[0]
-                    
-                    if self.is_valid_url(full_url):
-                        self._crawl_recursive(full_url, depth + 1)
-                    
+            cached = self.http_cache.get(url) if self.http_cache else None
+            unchanged = self._unchanged_since_lastmod(url, cached)
+            if unchanged is not None:
+                return self._process_page(url, unchanged, depth)
+            with span("fetch", self.timings):
+                response = self.session.get(url, headers=self._conditional_headers(cached), timeout=10)
+                body = response.text if response.status_code == 200 else None
+                html = self._resolve_body(url, response.status_code, response.headers, body, cached)
+            if html is None:
+                return []
+            return self._process_page(url, html, depth)
+
         except Exception as e:
             logger.error(f"Error crawling {url}: {e}")
+            record_page("failed")
+            return []
+
+    async def crawl_async(self, session: Optional[aiohttp.ClientSession] = None,
+                          parse_pool: Optional[ParsePool] = None):
+        # Crawl with many fetches in flight at once, taking URLs from the
+        # frontier in priority order. Fills the same visited/content
+        # structures as crawl(). Pass a session (and a parse pool) to share
+        # connections (and parse workers) with other crawls.
+        with span("crawl", self.timings):
+            if session is None:
+                async with self.create_async_session() as own_session:
+                    await self._crawl_async(own_session, parse_pool)
+            else:
+                await self._crawl_async(session, parse_pool)
+
+    def create_async_session(self) -> aiohttp.ClientSession:
+        return create_async_session(self.max_concurrency, self.per_host_limit)
+
+    async def _crawl_async(self, session: aiohttp.ClientSession, parse_pool: Optional[ParsePool] = None):
+        if self._seed_frontier() and self.use_sitemaps:
+            await self.discover_sitemaps_async(session)
+        host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host_limit)
+        )
+        # Workers sleep on this until the frontier has work or the crawl is over
+        changed = asyncio.Condition()
+        in_flight = 0
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                async with changed:
+                    while True:
+                        item = self.frontier.pop()
+                        if item is not None or in_flight == 0:
+                            break
+                        await changed.wait()
+                    if item is None:
+                        # Frontier drained (or budget spent) and nothing left in flight
+                        changed.notify_all()
+                        return
+                    in_flight += 1
+
+                url, depth = item
+                self.in_flight[url] = depth
+                try:
+                    async with host_limits[urlparse(url).netloc]:
+                        html = await self._fetch_async(session, url, depth)
+                    links = await self._process_page_async(url, html, depth) if html is not None else []
+                    self._enqueue_links(links, depth)
+                    # A cancelled page stays in flight, so a checkpoint queues it again
+                    self._page_done(url)
+                finally:
+                    async with changed:
+                        in_flight -= 1
+                        changed.notify_all()
+
+        own_pool = parse_pool is None and self.parse_workers > 0
+        if own_pool:
+            self._parse_pool = ParsePool(self.parser.name, workers=self.parse_workers, executor=self.parse_executor)
+        else:
+            self._parse_pool = parse_pool
+        if self.checkpoint is not None:
+            # Marks the crawl as async, so saves are queued instead of blocking the loop
+            self._checkpoint_write = asyncio.get_running_loop().create_future()
+            self._checkpoint_write.set_result(None)
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if own_pool:
+                await self._parse_pool.close()
+            self._parse_pool = None
+            if self.checkpoint is not None:
+                # Last save, once no worker can change the crawl any more
+                try:
+                    await self._queue_checkpoint()
+                finally:
+                    self._checkpoint_write = None
+
+    async def _fetch_async(self, session: aiohttp.ClientSession, url: str, depth: int) -> Optional[str]:
+        logger.info(f"Crawling: {url} (Depth: {depth})")
+        try:
+            # Cache lookups and stores are SQLite calls, so they run off the event loop
+            cached = await asyncio.to_thread(self.http_cache.get, url) if self.http_cache else None
+            unchanged = self._unchanged_since_lastmod(url, cached)
+            if unchanged is not None:
+                return unchanged
+            with span("fetch", self.timings):
+                async with session.get(url, headers=self._conditional_headers(cached)) as response:
+                    body = await response.text(errors='replace') if response.status == 200 else None
+                    status, headers = response.status, response.headers
+                if self.http_cache is None:
+                    return self._resolve_body(url, status, headers, body, cached)
+                html = await asyncio.to_thread(self.http_cache.resolve, url, status, headers, body, cached)
+                return self._record_fetch(url, status, body, html)
+        except Exception as e:
+            logger.error(f"Error crawling {url}: {e}")
+            record_page("failed")
+            return None
+
+    async def _process_page_async(self, url: str, html: str, depth: int) -> List[str]:
+        if self._parse_pool is None:
+            return self._process_page(url, html, depth)
+        try:
+            # Includes the wait for a free parse worker
+            with span("parse", self.timings):
+                parsed = await self._parse_pool.parse(url, html, collect_links=depth < self.max_depth)
+        except Exception as e:
+            logger.error(f"Error parsing {url}: {e}")
+            return []
+        return self._store_page(url, parsed)
+
+    def _unchanged_since_lastmod(self, url: str, cached) -> Optional[str]:
+        # A sitemap lastmod older than our cached copy means no request is needed at all
+        lastmod = self.lastmod.get(url)
+        if cached is None or lastmod is None or lastmod > cached.fetched_at:
+            return None
+        logger.info(f"Unchanged since {url} was cached (sitemap lastmod), skipping fetch")
+        self.http_cache.record(True)
+        return cached.body
+
+    def _conditional_headers(self, cached) -> Dict[str, str]:
+        if not self.http_cache:
+            return {}
+        return self.http_cache.conditional_headers(cached)
+
+    def _resolve_body(self, url: str, status: int, headers, body: Optional[str], cached) -> Optional[str]:
+        if self.http_cache:
+            html = self.http_cache.resolve(url, status, headers, body, cached)
+        else:
+            html = body if status == 200 else None
+        return self._record_fetch(url, status, body, html)
+
+    def _record_fetch(self, url: str, status: int, body: Optional[str], html: Optional[str]) -> Optional[str]:
+        if status == 304 and html is not None:
+            logger.info(f"Not modified, reusing cached copy of {url}")
+        record_response(status, len(body) if body is not None else None)
+        if body is not None:
+            self.frontier.record_bytes(len(body))
+        if html is None:
+            logger.warning(f"Failed to fetch {url}: Status {status}")
+            record_page("failed")
+        return html
+
+    def _process_page(self, url: str, html: str, depth: int) -> List[str]:
+        return self._store_page(url, self._parse_html(url, html, collect_links=depth < self.max_depth))
+
+    def _store_page(self, url: str, parsed: ParsedPage) -> List[str]:
+        # Store the page text and return the links found on it
+        cleaned_text, links, outline = parsed
+        if cleaned_text is not None:
+            duplicate = None
+            with span("clean", self.timings):
+                if len(cleaned_text) > 100 and self.dedup:
+                    duplicate = self.dedup.check(url, cleaned_text)
+                if not duplicate and len(cleaned_text) > 100 and self.boilerplate:
+                    self.boilerplate.add(cleaned_text)
+            if duplicate and duplicate[1] != url:
+                # This page sorts first, so it replaces the copy stored before it
+                self._drop_page(duplicate[1], url)
+                duplicate = None
+            if duplicate:
+                logger.info(f"Skipping {url}: near-duplicate of {duplicate[0]}")
+                record_page("duplicate")
+            elif len(cleaned_text) > 100: # Only save if we got meaningful content
+                self.content[url] = cleaned_text
+                self.outlines[url] = outline
+                if self.checkpoint is not None:
+                    self._stored_since_checkpoint.append(url)
+                logger.info(f"Extracted {len(cleaned_text)} chars from {url}")
+                record_page("stored")
+                if self.on_page:
+                    self.on_page(url, cleaned_text)
+            else:
+                logger.warning(f"Content too short for {url}")
+                record_page("short")
+
+        return links
+
+    def _drop_page(self, url: str, duplicate_of: str):
+        logger.info(f"Dropping {url}: near-duplicate of {duplicate_of}")
+        record_page("duplicate")
+        del self.content[url]
+        del self.outlines[url]
+        if self.checkpoint is not None:
+            self._dropped_since_checkpoint.append(url)
+
+    def _parse_html(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        with span("parse", self.timings):
+            return self.parser.parse(url, html, collect_links)
+
+    def get_content(self) -> MutableMapping[str, str]:
+        # Page text with cross-page boilerplate removed, ready for extraction.
+        # Cleaned pages go into a store of the same kind as the crawl's, one
+        # page at a time.
+        if not self.boilerplate:
+            return self.content
+        if isinstance(self.content, DiskPageStore):
+            cleaned = self.content.empty_like()
+            self._cleaned_stores.append(cleaned)
+        else:
+            cleaned = {}
+        lines_removed = bytes_removed = 0
+        with span("clean", self.timings):
+            for url in self.content:
+                text, lines, size = self.boilerplate.strip(self.content[url])
+                lines_removed += lines
+                bytes_removed += size
+                if text:
+                    cleaned[url] = text
+        self.boilerplate_removed = {"lines_removed": lines_removed, "bytes_removed": bytes_removed}
+        return cleaned
 
-    def get_content(self) -> Dict[str, str]:
-        return self.content
+    def close(self):
+        # Closes the page store, and the stores get_content() filled from it,
+        # deleting their segments; call once the content has been used
+        close_stores(self.content, *self._cleaned_stores)
+        self._cleaned_stores.clear()
@@ -0,0 +1,107 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from src.frontier import canonicalize_url
+from src.tokens import estimate_tokens
+
+WORD = re.compile(r'\w+')
+EMPTY_BIN = 0xFFFFFFFF
+
+def shingles(text: str, size: int = 3) -> List[bytes]:
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return [' '.join(words).encode()] if words else []
+    return [' '.join(words[i:i + size]).encode() for i in range(len(words) - size + 1)]
+
+def minhash(text: str, num_bins: int = 64) -> Tuple[int, ...]:
+    # One-permutation MinHash: each shingle is hashed once and only the
+    # minimum per bin is kept, so the signature costs O(shingles) instead of
+    # O(shingles * num_hashes).
+    signature = [EMPTY_BIN] * num_bins
+    for shingle in shingles(text):
+        h = zlib.crc32(shingle)
+        index = h % num_bins
+        value = h // num_bins
+        if value < signature[index]:
+            signature[index] = value
+    return tuple(signature)
+
+def estimate_similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    # Estimated Jaccard similarity of the underlying shingle sets
+    used = [(x, y) for x, y in zip(a, b) if x != EMPTY_BIN or y != EMPTY_BIN]
+    if not used:
+        return 1.0
+    return sum(1 for x, y in used if x == y) / len(used)
+
+# Detects near-duplicate pages (localised copies, print views, category pages
+# repeating their children) as they are crawled. Signatures are split into
+# bands for locality-sensitive hashing, so each new page is only compared
+# with pages that share at least one band instead of with every page.
+# Of a group of near-duplicates the page with the smallest canonical URL is
+# kept, whatever order the crawl reaches them in.
+class NearDuplicateFilter:
+    def __init__(self, threshold: float = 0.85, num_bins: int = 64, bands: int = 8):
+        if num_bins % bands:
+            raise ValueError("num_bins must be divisible by bands")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        # Bytes and estimated tokens of every kept page, counted as removed if it is replaced
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self.pages_dropped = 0
+        self.bytes_removed = 0
+        self.tokens_removed = 0
+
+    def check(self, url: str, text: str) -> Optional[Tuple[str, str]]:
+        # Returns None if the page is new, else (kept URL, dropped URL) for
+        # it and the near-duplicate seen before. The dropped page is either
+        # `url` or, if `url` sorts first, the earlier page it replaces.
+        signature = minhash(text, self.num_bins)
+        candidates = set()
+        for band in range(self.bands):
+            key = signature[band * self.rows:(band + 1) * self.rows]
+            candidates.update(self._buckets[band].get(key, ()))
+
+        size = (len(text.encode('utf-8')), estimate_tokens(text))
+        for candidate in sorted(candidates, key=self._order):
+            if estimate_similarity(signature, self._signatures[candidate]) >= self.threshold:
+                self.pages_dropped += 1
+                if self._order(candidate) <= self._order(url):
+                    self._count_removed(size)
+                    return candidate, url
+                self._count_removed(self._sizes[candidate])
+                self._remove(candidate)
+                self._add(url, signature, size)
+                return url, candidate
+
+        self._add(url, signature, size)
+        return None
+
+    @staticmethod
+    def _order(url: str) -> Tuple[str, str]:
+        # The raw URL breaks ties between URLs with the same canonical form
+        return canonicalize_url(url), url
+
+    def _count_removed(self, size: Tuple[int, int]):
+        self.bytes_removed += size[0]
+        self.tokens_removed += size[1]
+
+    def _add(self, url: str, signature: Tuple[int, ...], size: Tuple[int, int]):
+        self._signatures[url] = signature
+        self._sizes[url] = size
+        for band in range(self.bands):
+            self._buckets[band][signature[band * self.rows:(band + 1) * self.rows]].append(url)
+
+    def _remove(self, url: str):
+        signature = self._signatures.pop(url)
+        del self._sizes[url]
+        for band in range(self.bands):
+            self._buckets[band][signature[band * self.rows:(band + 1) * self.rows]].remove(url)
+
+    def stats(self) -> Dict[str, int]:
+        return {"pages_dropped": self.pages_dropped, "bytes_removed": self.bytes_removed,
+                "tokens_removed": self.tokens_removed}
@@ -0,0 +1,191 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from openai import APIConnectionError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lower value is served first
+INTERACTIVE = 0
+BATCH = 1
+
+# Default (requests, tokens) per minute, overridable with PULSE_LLM_RPM / PULSE_LLM_TPM
+MODEL_RATE_LIMITS = {
+    "gpt-4o": (500, 30000),
+    "gpt-4-turbo": (500, 30000),
+    "gpt-3.5-turbo": (3500, 200000),
+}
+DEFAULT_RATE_LIMITS = (500, 30000)
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        # Seconds until `amount` is available; larger amounts than the capacity only wait for a full bucket
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float):
+        # May go negative, e.g. when a response used more tokens than reserved
+        self.available -= amount
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    # An exhausted quota is reported as a 429 too, but waiting will not fix it
+    if getattr(error, 'code', None) == 'insufficient_quota':
+        return False
+    return isinstance(error, APIConnectionError) or getattr(error, 'status_code', None) in RETRY_STATUSES
+
+def _usage_tokens(response: Any) -> Optional[int]:
+    tokens = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+    return tokens if isinstance(tokens, int) else None
+
+# Shared gate in front of the OpenAI API: a call waits for a concurrency slot
+# and for room in the requests-per-minute and tokens-per-minute buckets, with
+# interactive calls served before batch ones. Rate limit and transient errors
+# are retried with exponential backoff, or after the server's Retry-After,
+# and a 429 pauses every caller rather than just the one that hit it.
+class Dispatcher:
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 30000,
+                 max_concurrency: int = 8, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def call(self, request: Callable[[], T], tokens: int, priority: int = INTERACTIVE) -> T:
+        # `tokens` is the estimated prompt plus completion size; it is corrected
+        # from the response's reported usage once the call returns
+        attempt = 0
+        while True:
+            self._acquire(tokens, priority)
+            used = None
+            try:
+                response = request()
+                used = _usage_tokens(response)
+                return response
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(e, attempt)
+                logger.warning(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            finally:
+                self._release(tokens, used)
+            attempt += 1
+            time.sleep(delay)
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._condition:
+            self.retries += 1
+            if getattr(error, 'status_code', None) == 429:
+                self.throttled += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _acquire(self, tokens: int, priority: int):
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                delay = self._wait_time(ticket, tokens)
+                if delay is not None and delay <= 0:
+                    break
+                self._condition.wait(timeout=delay)
+            heapq.heappop(self._waiting)
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self._active += 1
+            self.calls += 1
+            # The next caller in line may be able to go too
+            self._condition.notify_all()
+
+    def _wait_time(self, ticket: Tuple[int, int], tokens: int) -> Optional[float]:
+        # None: wait to be notified (not first in line, or no free slot)
+        if self._waiting[0] != ticket or self._active >= self.max_concurrency:
+            return None
+        now = time.monotonic()
+        return max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def _release(self, tokens: int, used: Optional[int]):
+        with self._condition:
+            self._active -= 1
+            if used is not None:
+                self.tokens.consume(used - tokens)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {"calls": self.calls, "retries": self.retries, "throttled": self.throttled,
+                    "active": self._active, "waiting": len(self._waiting)}
+
+_dispatchers: Dict[str, Dispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+def get_dispatcher(model: str) -> Dispatcher:
+    # One dispatcher per model and process, since rate limits apply per model to the whole API key
+    with _dispatchers_lock:
+        if model not in _dispatchers:
+            requests_per_minute, tokens_per_minute = MODEL_RATE_LIMITS.get(model, DEFAULT_RATE_LIMITS)
+            _dispatchers[model] = Dispatcher(
+                requests_per_minute=float(os.getenv("PULSE_LLM_RPM", requests_per_minute)),
+                tokens_per_minute=float(os.getenv("PULSE_LLM_TPM", tokens_per_minute)),
+                max_concurrency=int(os.getenv("PULSE_LLM_CONCURRENCY", "8"))
+            )
+        return _dispatchers[model]
+
+def dispatchers() -> Dict[str, Dispatcher]:
+    with _dispatchers_lock:
+        return dict(_dispatchers)
@@ -1,32 +1,167 @@
-from typing import List, Dict, Any, Optional
+from typing import Callable, Iterator, List, Dict, Any, Mapping, Optional
 import json
 from pydantic import BaseModel, Field
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
 import hashlib
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from src.cache import CacheBackend, SQLiteCache
+from src.dispatcher import INTERACTIVE, Dispatcher, get_dispatcher
+from src.metrics import Timings, record_usage, span
+from src.packing import pack_content, token_counter
+from src.tokens import estimate_tokens
 
 # Load environment variables
 load_dotenv()
 
+# Bump whenever the prompt changes so results cached for the old prompt are not reused
+PROMPT_VERSION = "2"
+
+# Content beyond this many characters is cut from a single extract() prompt.
+# Chunks from extract_chunked() are already sized in tokens and sent whole.
+MAX_PROMPT_CHARS = 25000
+# Completion tokens reserved per call when pacing against the tokens-per-minute limit
+COMPLETION_TOKEN_RESERVE = 1500
+SYSTEM_PROMPT = "You are a helpful assistant that extracts structured information from documentation. You strictly follow JSON output formats."
+
+def _split_page(text: str, max_chunk_tokens: int,
+                count_tokens: Callable[[str], int] = estimate_tokens) -> List[str]:
+    if count_tokens(text) <= max_chunk_tokens:
+        return [text]
+    pieces, piece, piece_tokens = [], [], 0
+    for line in text.splitlines():
+        line_tokens = count_tokens(line)
+        if piece and piece_tokens + line_tokens > max_chunk_tokens:
+            pieces.append("\n".join(piece))
+            piece, piece_tokens = [], 0
+        piece.append(line)
+        piece_tokens += line_tokens
+    if piece:
+        pieces.append("\n".join(piece))
+    return pieces
+
+def _is_chunk_boundary(url: str, group_size: int) -> bool:
+    digest = hashlib.sha256(url.encode()).digest()
+    return int.from_bytes(digest[:4], 'big') % group_size == 0
+
+def iter_chunks(content_map: Mapping[str, str], max_chunk_tokens: int = 6000,
+                group_size: int = 8, count_tokens: Callable[[str], int] = estimate_tokens) -> Iterator[str]:
+    # Pack pages into chunks without splitting a page unless the page alone
+    # exceeds the budget, in which case it is split on line boundaries.
+    #
+    # Pages are taken in URL order and, besides budget overflow, a chunk ends
+    # after roughly one page in `group_size` chosen by a hash of its URL. Chunk
+    # boundaries therefore depend on URLs rather than on page text, so an
+    # edited page only changes its own chunk and every other chunk keeps its
+    # cached extraction on the next run.
+    #
+    # Pages are read one at a time, so with a disk-backed page store only the
+    # chunk being built is held in memory.
+    current: List[str] = []
+    current_tokens = 0
+    for url in sorted(content_map):
+        for piece in _split_page(content_map[url], max_chunk_tokens, count_tokens):
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_chunk_tokens:
+                yield "\n\n".join(current)
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+        if _is_chunk_boundary(url, group_size) and current:
+            yield "\n\n".join(current)
+            current, current_tokens = [], 0
+    if current:
+        yield "\n\n".join(current)
+
+def chunk_content(content_map: Mapping[str, str], max_chunk_tokens: int = 6000,
+                  group_size: int = 8, count_tokens: Callable[[str], int] = estimate_tokens) -> List[str]:
+    return list(iter_chunks(content_map, max_chunk_tokens, group_size, count_tokens))
+
+def normalize_name(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', name.casefold()).strip()
+
+def merge_modules(results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Reduce step for chunked extraction: modules with the same (normalised)
+    # name are merged, keeping the longest description, the highest
+    # confidence and the union of their submodules.
+    merged: Dict[str, Dict[str, Any]] = {}
+    sub_keys: Dict[str, Dict[str, str]] = {}
+    for modules in results:
+        for module in modules:
+            name = str(module.get("module", "")).strip()
+            key = normalize_name(name)
+            if not key:
+                continue
+            if key not in merged:
+                merged[key] = {
+                    "module": name,
+                    "Description": module.get("Description", ""),
+                    "Submodules": {},
+                    "confidence_score": module.get("confidence_score", 0.0)
+                }
+                sub_keys[key] = {}
+            target = merged[key]
+            description = module.get("Description", "") or ""
+            if len(description) > len(target["Description"] or ""):
+                target["Description"] = description
+            target["confidence_score"] = max(target["confidence_score"] or 0.0,
+                                             module.get("confidence_score", 0.0) or 0.0)
+
+            submodules = module.get("Submodules", {})
+            if not isinstance(submodules, dict):
+                continue
+            for sub_name, sub_desc in submodules.items():
+                sub_key = normalize_name(sub_name)
+                if not sub_key:
+                    continue
+                existing = sub_keys[key].get(sub_key)
+                if existing is None:
+                    sub_keys[key][sub_key] = sub_name
+                    target["Submodules"][sub_name] = sub_desc
+                elif len(sub_desc or "") > len(target["Submodules"][existing] or ""):
+                    target["Submodules"][existing] = sub_desc
+    return list(merged.values())
+
 class Extractor:
-    def __init__(self, model: str = "gpt-4o"):
+    def __init__(self, model: str = "gpt-4o", cache: Optional[CacheBackend] = None,
+                 dispatcher: Optional[Dispatcher] = None, priority: int = INTERACTIVE,
+                 timings: Optional[Timings] = None):
         api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key) if api_key else None
+        # Retries are left to the dispatcher, which shares rate-limit pauses across calls
+        self.client = OpenAI(api_key=api_key, max_retries=0) if api_key else None
         self.model = model
-        self.cache = {}  # Simple in-memory cache
+        # Shared on-disk cache by default so results survive across requests and workers
+        self.cache = cache if cache is not None else SQLiteCache()
+        self.count_tokens = token_counter(model)
+        # Rate limiting and retries are shared by all extractors using the same model
+        self.dispatcher = dispatcher if dispatcher is not None else get_dispatcher(model)
+        self.priority = priority
+        self.last_run: Dict[str, int] = {}
+        # Time spent per stage (pack, prompt, llm, normalize) and tokens used by this extractor
+        self.timings = timings if timings is not None else Timings()
+        self.usage = {"prompt": 0, "completion": 0}
+        self._usage_lock = threading.Lock()
 
     def _get_cache_key(self, text: str) -> str:
-        return hashlib.md5(text.encode()).hexdigest()
+        content_hash = hashlib.sha256(text.encode()).hexdigest()
+        return f"{self.model}:{PROMPT_VERSION}:{content_hash}"
 
     def extract(self, text_content: str) -> List[Dict[str, Any]]:
         cache_key = self._get_cache_key(text_content)
-        if cache_key in self.cache:
+        cached = self.cache.get(cache_key)
+        if cached is not None:
             print("Returning cached result")
-            return self.cache[cache_key]
+            return cached
+        return self._extract_uncached(text_content, cache_key)
 
+    def _extract_uncached(self, text_content: str, cache_key: str,
+                          max_chars: Optional[int] = MAX_PROMPT_CHARS) -> List[Dict[str, Any]]:
         if not self.client:
             return self._mock_extract(text_content)
+        shown = text_content if max_chars is None else text_content[:max_chars]
 
         prompt = f"""
         You are an expert technical writer and information architect.
@@ -59,49 +194,195 @@ class Extractor:
         }}
 
         Content to analyze (Length: {len(text_content)} chars):
-        {text_content[:25000]}  # Truncate to avoid token limits
+        {shown}
         """
 
         try:
             print(f"Sending request to OpenAI. Content length: {len(text_content)}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that extracts structured information from documentation. You strictly follow JSON output formats."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            content = response.choices[0].message.content
+            content = self._complete(prompt)
             print(f"OpenAI Response: {content[:500]}...") # Log first 500 chars
-            data = json.loads(content)
-            
-            # Normalize output
-            result = []
-            if isinstance(data, dict):
-                # Look for "modules" key first
-                if "modules" in data and isinstance(data["modules"], list):
-                    result = data["modules"]
-                else:
-                    # Fallback: look for any list in the dict
-                    for key in data:
-                        if isinstance(data[key], list):
-                            result = data[key]
-                            break
-            elif isinstance(data, list):
-                result = data
+            with span("normalize", self.timings):
+                data = json.loads(content)
+
+                # Normalize output
+                result = []
+                if isinstance(data, dict):
+                    # Look for "modules" key first
+                    if "modules" in data and isinstance(data["modules"], list):
+                        result = data["modules"]
+                    else:
+                        # Fallback: look for any list in the dict
+                        for key in data:
+                            if isinstance(data[key], list):
+                                result = data[key]
+                                break
+                elif isinstance(data, list):
+                    result = data
             
             if not result:
                 print("Warning: Extracted result is empty.")
 
             # Cache the result
-            self.cache[cache_key] = result
+            self.cache.set(cache_key, result)
             return result
 
         except Exception as e:
             # Re-raise the exception so the UI can display the actual error
             raise e
 
+    def _complete(self, prompt: str) -> str:
+        # One JSON-mode chat completion, paced and retried by the dispatcher
+        with span("prompt", self.timings):
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            tokens = self.count_tokens(SYSTEM_PROMPT) + self.count_tokens(prompt) + COMPLETION_TOKEN_RESERVE
+        # Includes any wait for rate limits and retries
+        with span("llm", self.timings):
+            response = self.dispatcher.call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"}
+                ),
+                tokens=tokens,
+                priority=self.priority
+            )
+        usage = record_usage(self.model, getattr(response, "usage", None))
+        with self._usage_lock:
+            for kind, count in usage.items():
+                self.usage[kind] += count
+        return response.choices[0].message.content
+
+    def extract_chunked(self, content_map: Mapping[str, str], max_chunk_tokens: int = 6000,
+                        parallelism: int = 4,
+                        on_chunk: Optional[Callable[[int, int, List[Dict[str, Any]], bool], None]] = None,
+                        token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Map-reduce over the whole crawl instead of truncating it: every chunk
+        # is extracted (up to `parallelism` at once) and the results merged.
+        # Chunks whose content is unchanged since an earlier run come straight
+        # from the cache, so a recrawl only pays for the pages that changed.
+        # `on_chunk(index, total, modules, cached)` is called as each chunk's
+        # result becomes available.
+        #
+        # With a `token_budget`, the crawl is first packed down to its most
+        # informative sections so no run sends more than that many tokens.
+        #
+        # Chunks are streamed from `content_map` twice, first to look them up
+        # in the cache and then to extract the misses, rather than being held
+        # in a list, so memory stays bounded on crawls kept in a page store.
+        packing = None
+        if token_budget is not None:
+            with span("pack", self.timings):
+                packing = pack_content(content_map, token_budget, self.count_tokens)
+            print(f"Packed {packing.tokens_used} tokens into the budget of {token_budget} "
+                  f"({packing.tokens_dropped} tokens in {packing.sections_dropped} sections dropped)")
+            content_map = packing.content_map
+
+        def chunks() -> Iterator[str]:
+            return iter_chunks(content_map, max_chunk_tokens, count_tokens=self.count_tokens)
+
+        results: List[Optional[List[Dict[str, Any]]]] = []
+        pending: Dict[int, str] = {}
+        for index, chunk in enumerate(chunks()):
+            cache_key = self._get_cache_key(chunk)
+            cached = self.cache.get(cache_key)
+            results.append(cached)
+            if cached is None:
+                pending[index] = cache_key
+        total = len(results)
+        if on_chunk:
+            for index, cached in enumerate(results):
+                if cached is not None:
+                    on_chunk(index, total, cached, True)
+
+        self.last_run = {"pages": len(content_map), "chunks": total,
+                         "chunks_extracted": len(pending), "chunks_reused": total - len(pending)}
+        if packing is not None:
+            self.last_run.update(packing.stats())
+        print(f"Extracting {len(pending)} of {total} chunks "
+              f"({total - len(pending)} unchanged) with parallelism {parallelism}")
+
+        if pending:
+            workers = max(1, parallelism)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures: Dict[Any, int] = {}
+
+                def collect(done):
+                    for future in done:
+                        index = futures.pop(future)
+                        results[index] = future.result()
+                        if on_chunk:
+                            on_chunk(index, total, results[index], False)
+
+                for index, chunk in enumerate(chunks()):
+                    if index not in pending:
+                        continue
+                    # Keep at most two chunks per worker in memory
+                    if len(futures) >= 2 * workers:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    futures[pool.submit(self._extract_uncached, chunk, pending[index], None)] = index
+                collect(as_completed(list(futures)))
+
+        if len(results) == 1:
+            return results[0]
+        return merge_modules(results)
+
+    def describe_modules(self, modules: List[Dict[str, Any]], batch_size: int = 20,
+                         parallelism: int = 4) -> List[Dict[str, Any]]:
+        # Second stage for a hierarchy built from page structure: the model only
+        # rewrites descriptions and confidence scores, `batch_size` modules per
+        # call, while module and submodule names are kept as they are.
+        batches = [modules[i:i + batch_size] for i in range(0, len(modules), batch_size)]
+        if not self.client or not batches:
+            return modules
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+            described = [module for batch in pool.map(self._describe_batch, batches) for module in batch]
+
+        by_name = {normalize_name(str(module.get("module", ""))): module
+                   for module in described if isinstance(module, dict)}
+        result = []
+        for module in modules:
+            update = by_name.get(normalize_name(module["module"]), {})
+            sub_updates = update.get("Submodules", {})
+            if not isinstance(sub_updates, dict):
+                sub_updates = {}
+            sub_updates = {normalize_name(name): desc for name, desc in sub_updates.items()}
+            result.append({
+                "module": module["module"],
+                "Description": update.get("Description") or module["Description"],
+                "Submodules": {name: sub_updates.get(normalize_name(name)) or desc
+                               for name, desc in module["Submodules"].items()},
+                "confidence_score": update.get("confidence_score", module["confidence_score"])
+            })
+        return result
+
+    def _describe_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        skeleton = json.dumps({"modules": batch}, indent=2)
+        cache_key = self._get_cache_key("describe\n" + skeleton)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        prompt = f"""
+        The following modules and submodules were extracted from the headings of a documentation site.
+        Each description is the first sentence found under that heading and may be empty.
+
+        Rewrite every "Description" and every submodule description as one or two clear sentences,
+        and set "confidence_score" (0.0 to 1.0) to how well the descriptions are supported by the text.
+        Do not rename, add or remove modules or submodules. Do not use outside knowledge.
+        Return a JSON object with a single key "modules" in exactly the same structure.
+
+        {skeleton}
+        """
+        print(f"Sending description request to OpenAI for {len(batch)} modules")
+        data = json.loads(self._complete(prompt))
+        result = data.get("modules", []) if isinstance(data, dict) else []
+        self.cache.set(cache_key, result)
+        return result
+
     def _mock_extract(self, text_content: str) -> List[Dict[str, Any]]:
         # Mock response for demonstration without API key
         return [
@@ -0,0 +1,186 @@
+import hashlib
+import heapq
+import itertools
+import posixpath
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "_ga", "_gl",
+                   "hl", "lang", "locale", "session", "sessionid", "sid"}
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Locale path segments such as /en/, /en-us/, /pt_BR/, /zh-hans/, /es-419/:
+# an ISO 639-1 language code, optionally with a region or script. Other
+# two-letter segments (/js/, /go/, /ai/) are real sections and are kept.
+LANGUAGE_CODES = frozenset("""
+    aa ab ae af ak am an ar as av ay az ba be bg bh bi bm bn bo br bs ca ce ch co cr cs cu cv cy
+    da de dv dz ee el en eo es et eu fa ff fi fj fo fr fy ga gd gl gn gu gv ha he hi ho hr ht hu
+    hy hz ia id ie ig ii ik io is it iu ja jv ka kg ki kj kk kl km kn ko kr ks ku kv kw ky la lb
+    lg li ln lo lt lu lv mg mh mi mk ml mn mr ms mt my na nb nd ne ng nl nn no nr nv ny oc oj om
+    or os pa pi pl ps pt qu rm rn ro ru rw sa sc sd se sg si sk sl sm sn so sq sr ss st su sv sw
+    ta te tg th ti tk tl tn to tr ts tt tw ty ug uk ur uz ve vi vo wa wo xh yi yo za zh zu
+""".split())
+LOCALE_SEGMENT = re.compile(r'^([a-z]{2})(?:[-_](?:[a-z]{2}|\d{3}|hans|hant|latn|cyrl))?$', re.IGNORECASE)
+
+def is_locale_segment(segment: str) -> bool:
+    match = LOCALE_SEGMENT.match(segment)
+    return match is not None and match.group(1).lower() in LANGUAGE_CODES
+# Resources that are never documentation pages
+NON_HTML_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".json",
+                       ".xml", ".pdf", ".zip", ".gz", ".tar", ".mp4", ".mp3", ".woff", ".woff2", ".ttf"}
+
+DOC_HINTS = ("docs", "doc", "help", "guide", "guides", "support", "article", "articles", "kb",
+             "knowledge", "reference", "api", "manual", "tutorial", "tutorials", "faq", "learn", "topics")
+LOW_VALUE_HINTS = ("login", "signin", "sign-in", "signup", "register", "logout", "cart", "checkout",
+                   "search", "tag", "tags", "print", "share", "feed", "rss", "download", "legal",
+                   "privacy", "terms", "cookie", "cookies", "careers", "press")
+
+def canonicalize_url(url: str, collapse_locales: bool = True) -> str:
+    # Canonical form used to decide whether two URLs are the same page. It is
+    # only ever used as a key: the crawler still fetches the URL it found.
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parsed.path or '/')
+    path = posixpath.normpath(path) if path != '/' else path
+    segments = [segment for segment in path.lower().split('/') if segment]
+    if collapse_locales and segments and is_locale_segment(segments[0]):
+        segments = segments[1:]
+    for index_page in ("index.html", "index.htm", "index.php", "default.aspx"):
+        if segments and segments[-1] == index_page:
+            segments = segments[:-1]
+    path = '/' + '/'.join(segments)
+
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)]
+    return urlunparse((scheme, netloc, path, '', urlencode(sorted(query)), ''))
+
+def is_html_candidate(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return False
+    return posixpath.splitext(parsed.path.lower())[1] not in NON_HTML_EXTENSIONS
+
+def doc_score(url: str) -> float:
+    # How much a URL looks like a documentation page; higher is fetched first
+    parsed = urlparse(url)
+    words = [word for word in re.split(r'[/\-_.]+', parsed.path.lower()) if word]
+    score = 0.0
+    score += sum(1.0 for word in words if word in DOC_HINTS)
+    score -= sum(2.0 for word in words if word in LOW_VALUE_HINTS)
+    if parsed.query:
+        score -= 1.0
+    # Slightly prefer shallower paths at the same crawl depth
+    score -= 0.1 * len(words)
+    return score
+
+# Set of canonical URLs stored as 64-bit digests: ~8x smaller than keeping the URL strings
+class VisitedSet:
+    def __init__(self, digests: Iterable[int] = ()):
+        self._digests: Set[int] = set(digests)
+
+    @staticmethod
+    def digest(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    def add(self, key: str) -> bool:
+        # Returns False if the key was already present
+        digest = self.digest(key)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def digests(self) -> List[int]:
+        return list(self._digests)
+
+    def update(self, digests: Iterable[int]):
+        self._digests.update(digests)
+
+    def __contains__(self, key: str) -> bool:
+        return self.digest(key) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, VisitedSet) and self._digests == other._digests
+
+# Priority frontier for a crawl: URLs are deduplicated on their canonical form,
+# popped by depth then documentation-likeness, and popping stops once the
+# page or byte budget is spent.
+class Frontier:
+    def __init__(self, max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+                 collapse_locales: bool = True):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.collapse_locales = collapse_locales
+        self.visited = VisitedSet()
+        self.pages_started = 0
+        self.bytes_fetched = 0
+        self._heap: List[Tuple[int, float, int, str]] = []
+        self._counter = itertools.count()
+        # URLs added since the last take_journal(), as (url, depth, visited digest);
+        # only kept once start_journal() is called, for incremental checkpoints
+        self._journal: Optional[List[Tuple[str, int, int]]] = None
+
+    def add(self, url: str, depth: int) -> bool:
+        if not is_html_candidate(url):
+            return False
+        key = canonicalize_url(url, self.collapse_locales)
+        if not self.visited.add(key):
+            return False
+        heapq.heappush(self._heap, (depth, -doc_score(url), next(self._counter), url))
+        if self._journal is not None:
+            self._journal.append((url, depth, VisitedSet.digest(key)))
+        return True
+
+    def start_journal(self):
+        if self._journal is None:
+            self._journal = []
+
+    def take_journal(self) -> List[Tuple[str, int, int]]:
+        if self._journal is None:
+            return []
+        journal, self._journal = self._journal, []
+        return journal
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        if not self._heap or self.budget_exhausted():
+            return None
+        depth, _, _, url = heapq.heappop(self._heap)
+        self.pages_started += 1
+        return url, depth
+
+    def record_bytes(self, size: int):
+        self.bytes_fetched += size
+
+    def budget_exhausted(self) -> bool:
+        if self.max_pages is not None and self.pages_started >= self.max_pages:
+            return True
+        return self.max_bytes is not None and self.bytes_fetched >= self.max_bytes
+
+    def state(self, in_flight: int = 0) -> Dict[str, Any]:
+        # Counters for checkpoints; the queue itself is saved from the journal.
+        # Pages being fetched are not counted, so a resumed crawl fetches them again.
+        return {"pages_started": self.pages_started - in_flight, "bytes_fetched": self.bytes_fetched}
+
+    def restore(self, state: Dict[str, Any], visited: Iterable[int], queued: Iterable[Tuple[str, int]]):
+        self.visited.update(visited)
+        self.pages_started = state["pages_started"]
+        self.bytes_fetched = state["bytes_fetched"]
+        for url, depth in queued:
+            heapq.heappush(self._heap, (depth, -doc_score(url), next(self._counter), url))
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse, urlunparse
+from src.metrics import record_cache
+
+DEFAULT_HTTP_CACHE_PATH = os.path.join(".pulse_cache", "http_cache.sqlite")
+
+@dataclass
+class CachedPage:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: str
+    fetched_at: float
+
+def cache_key(url: str) -> str:
+    # Scheme and host are case-insensitive and fragments never reach the server
+    parsed = urlparse(url)
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or '/',
+                       parsed.params, parsed.query, ''))
+
+# On-disk store of page bodies and their validators (ETag / Last-Modified),
+# so recrawls can send conditional GETs and reuse the body on 304.
+# Each thread keeps its own connection, so the async crawler can run
+# lookups and stores in worker threads without reconnecting every page.
+class HttpCache:
+    def __init__(self, path: str = DEFAULT_HTTP_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread is off only so close() can close every thread's connection
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        record_cache("http", hit)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM pages WHERE url = ?",
+                (cache_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedPage(url, row[0], row[1], row[2], row[3])
+
+    def conditional_headers(self, page: Optional[CachedPage]) -> Dict[str, str]:
+        headers = {}
+        if page is None:
+            return headers
+        if page.etag:
+            headers['If-None-Match'] = page.etag
+        if page.last_modified:
+            headers['If-Modified-Since'] = page.last_modified
+        return headers
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str):
+        # Without a validator the entry could never be revalidated, so skip it
+        if not etag and not last_modified:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(url), etag, last_modified, body, time.time())
+            )
+
+    def resolve(self, url: str, status: int, headers, body: Optional[str],
+                cached: Optional[CachedPage]) -> Optional[str]:
+        # Returns the page text for a response, reusing the cached body on 304
+        if status == 304 and cached is not None:
+            self.record(True)
+            return cached.body
+        if status != 200 or body is None:
+            return None
+        self.record(False)
+        self.store(url, headers.get('ETag'), headers.get('Last-Modified'), body)
+        return body
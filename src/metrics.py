@@ -0,0 +1,108 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client
+except ImportError:  # metrics are not collected, per-run timings still are
+    prometheus_client = None
+
+# Pipeline stages timed with span(). "crawl" and "extract" cover a whole
+# run's crawl and extraction; the others are summed over every page or call,
+# so with concurrency they can add up to more than the run took.
+STAGES = ["crawl", "fetch", "parse", "clean", "links",
+          "extract", "pack", "prompt", "llm", "normalize"]
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                 1, 2.5, 5, 10, 30, 60, 120, 300)
+PAGE_BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+if prometheus_client is not None:
+    REGISTRY = prometheus_client.CollectorRegistry()
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "pulse_stage_seconds", "Time spent in each pipeline stage", ["stage"],
+        buckets=STAGE_BUCKETS, registry=REGISTRY)
+    PAGES = prometheus_client.Counter(
+        "pulse_pages", "Pages fetched, by what happened to them", ["outcome"], registry=REGISTRY)
+    PAGE_BYTES = prometheus_client.Histogram(
+        "pulse_page_bytes", "Size of fetched page bodies", buckets=PAGE_BYTES_BUCKETS, registry=REGISTRY)
+    HTTP_RESPONSES = prometheus_client.Counter(
+        "pulse_http_responses", "HTTP responses received while crawling", ["status"], registry=REGISTRY)
+    CACHE_REQUESTS = prometheus_client.Counter(
+        "pulse_cache_requests", "Cache lookups", ["cache", "result"], registry=REGISTRY)
+    LLM_TOKENS = prometheus_client.Counter(
+        "pulse_llm_tokens", "Tokens reported in the OpenAI usage field", ["model", "kind"], registry=REGISTRY)
+    LLM_CALL_TOKENS = prometheus_client.Histogram(
+        "pulse_llm_call_tokens", "Tokens per LLM call", ["kind"],
+        buckets=(100, 500, 1000, 2000, 4000, 8000, 16000, 32000), registry=REGISTRY)
+
+# Per-run timing summary: how often each stage ran and how long it took in
+# total, on average and at most. Shared by the threads of one run.
+class Timings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Tuple[int, float, float]] = {}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            count, total, longest = self._stages.get(stage, (0, 0.0, 0.0))
+            self._stages[stage] = (count + 1, total + seconds, max(longest, seconds))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stages = dict(self._stages)
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        return {stage: {"count": count, "total_ms": round(total * 1000, 2),
+                        "mean_ms": round(total * 1000 / count, 3), "max_ms": round(longest * 1000, 2)}
+                for stage, (count, total, longest) in sorted(stages.items(), key=lambda item: order.get(item[0], len(order)))}
+
+def format_timings(summary: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'stage':<10} {'count':>7} {'total ms':>11} {'mean ms':>10} {'max ms':>10}"]
+    for stage, row in summary.items():
+        lines.append(f"{stage:<10} {row['count']:>7} {row['total_ms']:>11.1f} {row['mean_ms']:>10.2f} {row['max_ms']:>10.1f}")
+    return "\n".join(lines)
+
+@contextmanager
+def span(stage: str, timings: Optional[Timings] = None) -> Iterator[None]:
+    # Times the block into the stage histogram and, if given, the run's timings
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if prometheus_client is not None:
+            STAGE_SECONDS.labels(stage).observe(seconds)
+        if timings is not None:
+            timings.add(stage, seconds)
+
+def record_page(outcome: str):
+    # outcome: stored, duplicate, short or failed
+    if prometheus_client is not None:
+        PAGES.labels(outcome).inc()
+
+def record_response(status: int, body_bytes: Optional[int]):
+    if prometheus_client is not None:
+        HTTP_RESPONSES.labels(str(status)).inc()
+        if body_bytes is not None:
+            PAGE_BYTES.observe(body_bytes)
+
+def record_cache(cache: str, hit: bool):
+    if prometheus_client is not None:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def record_usage(model: str, usage) -> Dict[str, int]:
+    # Prompt and completion tokens of one call, from the response's usage field
+    tokens = {kind: getattr(usage, f"{kind}_tokens", None) for kind in ("prompt", "completion")}
+    tokens = {kind: count if isinstance(count, int) else 0 for kind, count in tokens.items()}
+    if prometheus_client is not None:
+        for kind, count in tokens.items():
+            LLM_TOKENS.labels(model, kind).inc(count)
+            LLM_CALL_TOKENS.labels(kind).observe(count)
+    return tokens
+
+def render_metrics() -> Optional[Tuple[bytes, str]]:
+    # Body and content type for a /metrics endpoint; None without prometheus_client
+    if prometheus_client is None:
+        return None
+    return prometheus_client.generate_latest(REGISTRY), prometheus_client.CONTENT_TYPE_LATEST
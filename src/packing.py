@@ -0,0 +1,156 @@
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Union
+from src.tokens import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to the chars-per-token estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Tokens of page content sent per extraction, leaving room for the prompt and the answer
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o": 60000,
+    "gpt-4-turbo": 60000,
+    "gpt-3.5-turbo": 10000,
+}
+DEFAULT_TOKEN_BUDGET = 10000
+# Budget value that selects the model's entry in MODEL_TOKEN_BUDGETS
+AUTO_BUDGET = "auto"
+
+TERM = re.compile(r'[a-z][a-z0-9]+')
+MAX_SECTION_LINES = 40
+
+_encodings: Dict[str, Optional[object]] = {}
+
+def token_counter(model: str) -> Callable[[str], int]:
+    # Exact counts with the model's tiktoken encoding when it can be loaded
+    # (the encoding files are downloaded on first use), estimates otherwise
+    if model not in _encodings:
+        encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"Falling back to estimated token counts for {model}: {e}")
+        _encodings[model] = encoding
+    encoding = _encodings[model]
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+def token_budget(model: str) -> int:
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+def resolve_token_budget(budget: Union[int, str, None], model: str) -> Optional[int]:
+    # Packing is opt-in: None (or 0) sends every page, "auto" uses the model's budget
+    if budget == AUTO_BUDGET:
+        return token_budget(model)
+    return budget or None
+
+# What scoring needs from a section, so the text itself can stay in the page store
+@dataclass
+class Section:
+    url: str
+    index: int
+    tokens: int
+    terms: Counter
+    heading_density: float
+    score: float = 0.0
+
+@dataclass
+class PackResult:
+    content_map: Dict[str, str]
+    tokens_used: int
+    tokens_dropped: int
+    sections_kept: int
+    sections_dropped: int
+
+    def stats(self) -> Dict[str, int]:
+        return {"tokens_used": self.tokens_used, "tokens_dropped": self.tokens_dropped,
+                "sections_kept": self.sections_kept, "sections_dropped": self.sections_dropped}
+
+def _is_heading(line: str) -> bool:
+    words = line.split()
+    return 0 < len(words) <= 8 and line[-1] not in '.,;:!?'
+
+def split_sections(text: str) -> List[str]:
+    # A section starts at a heading-like line (short, no closing punctuation)
+    # that follows body text, and is capped at MAX_SECTION_LINES lines
+    sections: List[List[str]] = []
+    current: List[str] = []
+    previous_heading = False
+    for line in text.splitlines():
+        heading = _is_heading(line)
+        if current and ((heading and not previous_heading) or len(current) >= MAX_SECTION_LINES):
+            sections.append(current)
+            current = []
+        current.append(line)
+        previous_heading = heading
+    if current:
+        sections.append(current)
+    return ['\n'.join(lines) for lines in sections]
+
+def _section(url: str, index: int, text: str, count_tokens: Callable[[str], int]) -> Section:
+    lines = text.splitlines()
+    heading_density = sum(1 for line in lines if _is_heading(line)) / len(lines) if lines else 0.0
+    return Section(url, index, count_tokens(text), Counter(TERM.findall(text.lower())), heading_density)
+
+def _score_sections(sections: List[Section]):
+    # Informativeness = mean TF-IDF weight of a section's terms (rare,
+    # section-specific vocabulary scores high, text repeated across the site
+    # scores low) plus a bonus for heading density
+    document_frequency: Counter = Counter()
+    for section in sections:
+        document_frequency.update(section.terms.keys())
+    total = len(sections)
+    for section in sections:
+        terms = sum(section.terms.values())
+        if not terms:
+            section.score = 0.0
+            continue
+        tfidf = sum(count * math.log((1 + total) / (1 + document_frequency[term]))
+                    for term, count in section.terms.items())
+        section.score = tfidf / terms + 0.5 * section.heading_density
+
+def pack_content(content_map: Mapping[str, str], budget: int,
+                 count_tokens: Callable[[str], int] = estimate_tokens) -> PackResult:
+    # Keep the highest-scoring sections that fit in `budget` tokens, returned
+    # per page and in their original order so the text still reads naturally.
+    # Pages are read twice, once to score and once to copy the kept sections,
+    # so only the packed result is ever held in memory.
+    sections = []
+    for url, text in content_map.items():
+        for index, section_text in enumerate(split_sections(text)):
+            sections.append(_section(url, index, section_text, count_tokens))
+    _score_sections(sections)
+
+    remaining = budget
+    kept = set()
+    for section in sorted(sections, key=lambda s: s.score, reverse=True):
+        if section.tokens <= remaining:
+            kept.add((section.url, section.index))
+            remaining -= section.tokens
+
+    tokens_used = sum(section.tokens for section in sections if (section.url, section.index) in kept)
+    kept_urls = {url for url, _ in kept}
+    packed: Dict[str, str] = {}
+    for url in content_map:
+        if url in kept_urls:
+            packed[url] = '\n'.join(section_text for index, section_text in enumerate(split_sections(content_map[url]))
+                                    if (url, index) in kept)
+    return PackResult(
+        content_map=packed,
+        tokens_used=tokens_used,
+        tokens_dropped=sum(section.tokens for section in sections) - tokens_used,
+        sections_kept=len(kept),
+        sections_dropped=len(sections) - len(kept),
+    )
@@ -0,0 +1,192 @@
+import mmap
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pages are compressed with zlib instead
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): orphaned segments are swept by age instead
+    fcntl = None
+
+DEFAULT_PAGES_DIR = os.path.join(".pulse_cache", "pages")
+# Temporary segments are named pages-*.seg; only those are ever swept
+SEGMENT_PREFIX = "pages-"
+# Without file locks, temporary segments untouched for this long count as orphaned
+ORPHAN_AGE = 24 * 3600
+MAGIC = b"PLSG"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+def sweep_orphaned_segments(directory: str = DEFAULT_PAGES_DIR) -> int:
+    # Removes temporary segments left behind by processes that died without
+    # closing their stores (killed, or out of memory). A live store holds a
+    # lock on its segment, so only unlocked segments are removed.
+    removed = 0
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    for name in names:
+        if not (name.startswith(SEGMENT_PREFIX) and name.endswith(".seg")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if fcntl is not None:
+                with open(path, "rb") as f:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue
+                    os.remove(path)
+            elif time.time() - os.path.getmtime(path) > ORPHAN_AGE:
+                os.remove(path)
+            else:
+                continue
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+_swept: Set[str] = set()
+_swept_lock = threading.Lock()
+
+def _new_segment(directory: str) -> str:
+    # Path of a new temporary segment; the directory is swept of orphans the
+    # first time this process creates a segment in it
+    os.makedirs(directory, exist_ok=True)
+    with _swept_lock:
+        if os.path.abspath(directory) not in _swept:
+            _swept.add(os.path.abspath(directory))
+            sweep_orphaned_segments(directory)
+    fd, path = tempfile.mkstemp(prefix=SEGMENT_PREFIX, suffix=".seg", dir=directory)
+    os.close(fd)
+    return path
+
+def close_stores(*stores: Any):
+    # Closes the page stores among `stores` (plain dicts are skipped)
+    for store in stores:
+        if isinstance(store, DiskPageStore):
+            store.close()
+
+# Page text kept on disk instead of in memory, for crawls too large to hold
+# as Python strings. Pages are compressed one by one and appended to a
+# segment file; only the offset index (url -> offset, length) stays in
+# memory and reads go through an mmap of the segment. Behaves like the
+# dict it replaces (Crawler.content), iterating in insertion order.
+# Overwriting a page appends a new record, so the segment only grows for
+# the store's lifetime; it is deleted on close() (or on leaving a `with`
+# block) unless `keep` is set.
+class DiskPageStore(MutableMapping):
+    def __init__(self, path: Optional[str] = None, level: int = 3, keep: bool = False,
+                 directory: str = DEFAULT_PAGES_DIR):
+        # Without a path, the segment is a new temporary file in `directory`
+        if path is None:
+            path = _new_segment(directory)
+        self.path = path
+        self.keep = keep
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+        self.level = level
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "w+b")
+        if fcntl is not None:
+            # Marks the segment as in use for sweep_orphaned_segments()
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._file.write(MAGIC + bytes([self.codec]))
+        self._file.flush()
+        self._size = self._file.tell()
+        self._map: Optional[mmap.mmap] = None
+        self.raw_bytes = 0
+        # zstd contexts are not thread-safe, so every thread gets its own
+        self._codecs = threading.local()
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            compressor = getattr(self._codecs, "compressor", None)
+            if compressor is None:
+                compressor = self._codecs.compressor = zstandard.ZstdCompressor(level=self.level)
+            return compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            decompressor = getattr(self._codecs, "decompressor", None)
+            if decompressor is None:
+                decompressor = self._codecs.decompressor = zstandard.ZstdDecompressor()
+            return decompressor.decompress(data)
+        return zlib.decompress(data)
+
+    def __setitem__(self, url: str, text: str):
+        raw = text.encode("utf-8")
+        record = self._compress(raw)
+        with self._lock:
+            self._file.seek(self._size)
+            self._file.write(record)
+            self._file.flush()
+            self._index[url] = (self._size, len(record))
+            self._size += len(record)
+            self.raw_bytes += len(raw)
+
+    def __getitem__(self, url: str) -> str:
+        with self._lock:
+            offset, length = self._index[url]
+            # The map covers the segment as it was when mapped; remap once it has grown
+            if self._map is None or len(self._map) < offset + length:
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            record = self._map[offset:offset + length]
+        return self._decompress(record).decode("utf-8")
+
+    def __delitem__(self, url: str):
+        # The record stays in the segment until the store is closed
+        with self._lock:
+            del self._index[url]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, url: object) -> bool:
+        return url in self._index
+
+    def empty_like(self) -> "DiskPageStore":
+        # A new, empty store next to this one with the same settings
+        return DiskPageStore(level=self.level, directory=os.path.dirname(self.path) or ".")
+
+    @property
+    def disk_bytes(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {"pages": len(self._index), "raw_bytes": self.raw_bytes, "disk_bytes": self._size}
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if not self._file.closed:
+                self._file.close()
+            if not self.keep and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __enter__(self) -> "DiskPageStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,409 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser as StdlibHTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, the single-pass parser also runs on html.parser
+    etree = None
+
+# Dropped from the page entirely (text and links)
+SKIP_TAGS = {"script", "style", "nav", "footer", "header"}
+# Dropped from the main content (text and links) but kept elsewhere on the page
+MAIN_EXCLUDED_TAGS = {"aside"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+             "meta", "param", "source", "track", "wbr"}
+
+# Candidates for the main content, in order of preference
+MAIN_SELECTORS = [
+    ('main', {}),
+    ('article', {}),
+    ('div', {'role': 'main'}),
+    ('div', {'class': 'content'}),
+    ('div', {'class': 'main-content'}),
+    ('div', {'id': 'content'}),
+    ('div', {'id': 'main'}),
+    ('body', {}) # Fallback
+]
+
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3}
+
+# Page structure that flattening to text loses: the breadcrumb trail (which
+# usually sits in a nav and is otherwise skipped) and the h1-h3 headings of
+# the main content as (level, title)
+@dataclass
+class Outline:
+    breadcrumbs: List[str] = field(default_factory=list)
+    headings: List[Tuple[int, str]] = field(default_factory=list)
+
+ParsedPage = Tuple[Optional[str], List[str], Outline]
+
+def clean_text(pieces: List[str]) -> str:
+    lines = []
+    for piece in pieces:
+        lines.extend(line.strip() for line in piece.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+def _is_breadcrumb(attrs: Dict[str, str]) -> bool:
+    return ('breadcrumb' in (attrs.get('class') or '').lower()
+            or 'breadcrumb' in (attrs.get('aria-label') or '').lower()
+            or (attrs.get('itemtype') or '').endswith('BreadcrumbList'))
+
+def _is_crumb(text: str) -> bool:
+    # Skips separators such as "/" or ">"
+    return any(char.isalnum() for char in text)
+
+def _matches(tag: str, attrs: Dict[str, str], selector: Tuple[str, Dict[str, str]]) -> bool:
+    name, required = selector
+    if tag != name:
+        return False
+    for key, value in required.items():
+        actual = attrs.get(key)
+        if actual is None:
+            return False
+        if key == 'class':
+            if value not in actual.split():
+                return False
+        elif actual != value:
+            return False
+    return True
+
+# Event target that finds the main content and collects links in a single
+# pass over the document. It receives start/end/data events from either
+# lxml's HTML parser or the stdlib html.parser, and reproduces what the
+# BeautifulSoup backend does with several tree walks.
+class PageCollector:
+    def __init__(self, url: str, collect_links: bool = True):
+        self.url = url
+        self.collect_links = collect_links
+        # (url, candidates it must be dropped for because it sits in an aside inside them)
+        self._links: List[Tuple[str, Tuple[int, ...]]] = []
+        self._stack: List[str] = []
+        self._skip_level: Optional[int] = None
+        self._excluded_level: Optional[int] = None
+        # Per selector: stack level while recording, True once closed
+        self._candidate_state: List[Optional[object]] = [None] * len(MAIN_SELECTORS)
+        self._candidate_text: List[List[str]] = [[] for _ in MAIN_SELECTORS]
+        self._candidate_headings: List[List[Tuple[int, str]]] = [[] for _ in MAIN_SELECTORS]
+        self.breadcrumbs: List[str] = []
+        self._breadcrumb_level: Optional[int] = None
+        self._pending_crumb: List[str] = []
+        # (stack level, heading level) of the heading being read
+        self._heading: Optional[Tuple[int, int]] = None
+        self._heading_text: List[str] = []
+        # Parsers may deliver one text node in several pieces (e.g. around
+        # entities), so text is buffered until the next tag
+        self._pending_text: List[str] = []
+
+    def start(self, tag: str, attrs: Dict[str, str]):
+        self._flush_text()
+        tag = tag.lower()
+        level = len(self._stack)
+        self._stack.append(tag)
+        # Only the first breadcrumb trail counts, even inside skipped tags
+        if self._breadcrumb_level is None and not self.breadcrumbs and _is_breadcrumb(attrs):
+            self._breadcrumb_level = level
+        if self._skip_level is not None:
+            return
+        if tag in SKIP_TAGS:
+            self._skip_level = level
+            return
+        if tag in MAIN_EXCLUDED_TAGS and self._excluded_level is None:
+            self._excluded_level = level
+        if tag in HEADING_TAGS and self._heading is None and self._excluded_level is None:
+            self._heading = (level, HEADING_TAGS[tag])
+
+        for i, selector in enumerate(MAIN_SELECTORS):
+            if self._candidate_state[i] is None and _matches(tag, attrs, selector):
+                self._candidate_state[i] = level
+
+        if tag == 'a' and self.collect_links:
+            href = attrs.get('href')
+            if href is not None:
+                excluded_for: Tuple[int, ...] = ()
+                if self._excluded_level is not None:
+                    excluded_for = tuple(i for i, state in enumerate(self._candidate_state)
+                                         if state is not None and state is not True
+                                         and state < self._excluded_level)
+                # Remove fragments
+                self._links.append((urljoin(self.url, href).split('#')[0], excluded_for))
+
+    def end(self, tag: str):
+        self._flush_text()
+        tag = tag.lower()
+        if tag not in self._stack:
+            return
+        # Pop up to and including the matching start tag (tolerates unclosed children)
+        while self._stack:
+            level = len(self._stack) - 1
+            popped = self._stack.pop()
+            if self._skip_level == level:
+                self._skip_level = None
+            if self._excluded_level == level:
+                self._excluded_level = None
+            if self._breadcrumb_level == level:
+                self._breadcrumb_level = None
+            if self._heading is not None and self._heading[0] == level:
+                self._close_heading()
+            for i, state in enumerate(self._candidate_state):
+                if state == level and state is not True:
+                    self._candidate_state[i] = True
+            if popped == tag:
+                break
+
+    def data(self, text: str):
+        if self._breadcrumb_level is not None:
+            self._pending_crumb.append(text)
+        if self._skip_level is not None or self._excluded_level is not None:
+            return
+        self._pending_text.append(text)
+
+    def _flush_text(self):
+        if self._pending_crumb:
+            crumb = ''.join(self._pending_crumb).strip()
+            self._pending_crumb = []
+            if _is_crumb(crumb):
+                self.breadcrumbs.append(crumb)
+        if not self._pending_text:
+            return
+        text = ''.join(self._pending_text).strip()
+        self._pending_text = []
+        if not text:
+            return
+        if self._heading is not None:
+            self._heading_text.append(text)
+        for i, state in enumerate(self._candidate_state):
+            if state is not None and state is not True:
+                self._candidate_text[i].append(text)
+
+    def _close_heading(self):
+        title = ' '.join(self._heading_text)
+        if title:
+            for i, state in enumerate(self._candidate_state):
+                if state is not None and state is not True:
+                    self._candidate_headings[i].append((self._heading[1], title))
+        self._heading = None
+        self._heading_text = []
+
+    def close(self) -> ParsedPage:
+        self._flush_text()
+        for i, state in enumerate(self._candidate_state):
+            if state is not None:
+                return (clean_text(self._candidate_text[i]), [url for url, excluded in self._links if i not in excluded],
+                        Outline(self.breadcrumbs, self._candidate_headings[i]))
+        return None, [url for url, _ in self._links], Outline(self.breadcrumbs)
+
+class HtmlParser:
+    name = ""
+
+    def parse(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        raise NotImplementedError
+
+class SoupParser(HtmlParser):
+    # The original multi-pass BeautifulSoup implementation
+    name = "soup"
+
+    def parse(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        soup = BeautifulSoup(html, 'html.parser')
+        outline = Outline()
+        trail = soup.find(lambda tag: _is_breadcrumb({key: ' '.join(value) if isinstance(value, list) else value
+                                                      for key, value in tag.attrs.items()}))
+        if trail is not None:
+            outline.breadcrumbs = [crumb for crumb in trail.stripped_strings if _is_crumb(crumb)]
+
+        # Remove script and style elements
+        for script in soup(list(SKIP_TAGS)):
+            script.decompose()
+
+        main_content = None
+        for tag, attrs in MAIN_SELECTORS:
+            main_content = soup.find(tag, attrs)
+            if main_content:
+                break
+
+        cleaned_text = None
+        if main_content:
+            # Remove navigation and footer elements within the main content
+            for tag in main_content.find_all(['nav', 'footer', 'header', 'aside']):
+                tag.decompose()
+            text = main_content.get_text(separator='\n', strip=True)
+            cleaned_text = clean_text([text])
+            for heading in main_content.find_all(list(HEADING_TAGS)):
+                title = heading.get_text(separator=' ', strip=True)
+                if title:
+                    outline.headings.append((HEADING_TAGS[heading.name], title))
+
+        # Find links
+        links = []
+        if collect_links:
+            for link in soup.find_all('a', href=True):
+                full_url = urljoin(url, link['href'])
+                # Remove fragments
+                links.append(full_url.split('#')[0])
+
+        return cleaned_text, links, outline
+
+class _StdlibDriver(StdlibHTMLParser):
+    def __init__(self, collector: PageCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {key: value or '' for key, value in attrs})
+        if tag in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, {key: value or '' for key, value in attrs})
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+class StdlibParser(HtmlParser):
+    # Single pass on the pure-Python html.parser tokenizer, no tree is built
+    name = "html.parser"
+
+    def parse(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        collector = PageCollector(url, collect_links)
+        driver = _StdlibDriver(collector)
+        driver.feed(html)
+        driver.close()
+        return collector.close()
+
+class LxmlParser(HtmlParser):
+    # Single pass with libxml2 doing the tokenizing and tag balancing in C
+    name = "lxml"
+
+    def parse(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        collector = PageCollector(url, collect_links)
+        parser = etree.HTMLParser(target=_LxmlTarget(collector))
+        parser.feed(html)
+        return parser.close()
+
+class _LxmlTarget:
+    def __init__(self, collector: PageCollector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        if isinstance(tag, str):
+            self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        if isinstance(tag, str):
+            self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self) -> ParsedPage:
+        return self.collector.close()
+
+PARSERS = {
+    SoupParser.name: SoupParser,
+    StdlibParser.name: StdlibParser,
+    LxmlParser.name: LxmlParser,
+}
+
+def available_parsers() -> List[str]:
+    return [name for name in PARSERS if name != LxmlParser.name or etree is not None]
+
+def get_parser(name: str = "auto") -> HtmlParser:
+    # "auto" picks lxml when it is installed and the BeautifulSoup parser otherwise
+    if name == "auto":
+        name = LxmlParser.name if etree is not None else SoupParser.name
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser backend '{name}'. Choose from: {', '.join(PARSERS)}")
+    if name == LxmlParser.name and etree is None:
+        raise ValueError("The lxml parser backend requires the 'lxml' package")
+    return PARSERS[name]()
+
+def resolve_parser_name(name: str = "auto") -> str:
+    return get_parser(name).name
+
+_worker_parsers: Dict[str, HtmlParser] = {}
+
+def parse_batch(parser_name: str, items: List[Tuple[str, str, bool]]) -> List[ParsedPage]:
+    # Runs in a pool process; parsers are created once per process
+    parser = _worker_parsers.get(parser_name)
+    if parser is None:
+        parser = _worker_parsers[parser_name] = get_parser(parser_name)
+    return [parser.parse(url, html, collect_links) for url, html, collect_links in items]
+
+def create_parse_executor(workers: int = 4) -> ProcessPoolExecutor:
+    # Workers are started by a fork server (spawned where there is none), never
+    # forked from the caller: forking a multi-threaded process such as the API
+    # server can copy locks held by other threads and deadlock the child
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+# Offloads parsing and text cleaning to worker processes so a crawl is not
+# limited to the one core the event loop runs on. Pages are sent in batches
+# of up to `batch_size` (or whatever arrived within `max_delay` seconds) to
+# keep pickling and IPC overhead per page low.
+#
+# A pool batches for one event loop. To share worker processes between
+# crawls on different loops, give each its own ParsePool over one executor
+# from create_parse_executor(); the executor is then left running on close.
+class ParsePool:
+    def __init__(self, parser_name: str = "auto", workers: int = 4, batch_size: int = 16,
+                 max_delay: float = 0.005, executor: Optional[ProcessPoolExecutor] = None):
+        self.parser_name = resolve_parser_name(parser_name)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else create_parse_executor(workers)
+        self._batch: List[Tuple[Tuple[str, str, bool], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def parse(self, url: str, html: str, collect_links: bool = True) -> ParsedPage:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append(((url, html, collect_links), future))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        result = loop.run_in_executor(self._executor, parse_batch, self.parser_name, [item for item, _ in batch])
+
+        def deliver(done: asyncio.Future):
+            for index, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if done.exception() is not None:
+                    future.set_exception(done.exception())
+                else:
+                    future.set_result(done.result()[index])
+
+        result.add_done_callback(deliver)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._owns_executor:
+            # Waiting for the workers to exit blocks, so it happens off the event loop
+            await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
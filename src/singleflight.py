@@ -0,0 +1,112 @@
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# One in-flight call: its result, and the events published while it runs
+class _Call:
+    def __init__(self):
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+        # Replayed to callers that join late, so they see what they missed
+        self.events: List[Any] = []
+        self.subscribers: List[Callable[[Any], None]] = []
+
+# Collapses concurrent calls with the same key into one: the first caller
+# runs the work and everyone who asks for the same key while it is in flight
+# waits for and shares its result. Nothing is kept once the call finishes,
+# so this only removes duplicate concurrent work; caching is left to the caches.
+#
+# The work can publish() progress events under its key; every caller that
+# passed `on_event` receives them, late joiners after a replay of the events
+# published before they joined.
+class SingleFlight:
+    def __init__(self, retry_on: Tuple[Type[BaseException], ...] = ()):
+        # Failures of these types are the leader's own business (e.g. its job
+        # was cancelled), so waiting callers run the work again instead
+        self.retry_on = retry_on
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, work: Callable[[], T], check: Optional[Callable[[], None]] = None,
+           poll_interval: float = 0.5, on_event: Optional[Callable[[Any], None]] = None) -> Tuple[T, bool]:
+        # Returns (result, shared). `check` is called while waiting on another
+        # caller's work and may raise to stop waiting, e.g. on cancellation.
+        # `on_event` receives the events published for this call.
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.executed += 1
+            if on_event is not None:
+                with call.lock:
+                    for event in call.events:
+                        self._deliver(on_event, event)
+                    call.subscribers.append(on_event)
+            if leader:
+                return self._lead(key, call, work), False
+            try:
+                result = self._wait(call.future, check, poll_interval)
+            except self.retry_on:
+                continue
+            finally:
+                if on_event is not None:
+                    with call.lock:
+                        call.subscribers.remove(on_event)
+            with self._lock:
+                self.shared += 1
+            return result, True
+
+    def publish(self, key: str, event: Any, replay: bool = True):
+        # Sends an event to everyone waiting on the call in flight for `key`.
+        # Events with `replay` off (e.g. periodic progress) only reach current callers.
+        with self._lock:
+            call = self._calls.get(key)
+        if call is None:
+            return
+        with call.lock:
+            if replay:
+                call.events.append(event)
+            for subscriber in call.subscribers:
+                self._deliver(subscriber, event)
+
+    def _deliver(self, subscriber: Callable[[Any], None], event: Any):
+        # A failing subscriber must not break the work or the other callers
+        try:
+            subscriber(event)
+        except Exception:
+            logger.exception("Event subscriber failed")
+
+    def _lead(self, key: str, call: _Call, work: Callable[[], T]) -> T:
+        try:
+            result = work()
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        else:
+            call.future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def _wait(self, future: Future, check: Optional[Callable[[], None]], poll_interval: float):
+        while True:
+            if check:
+                check()
+            try:
+                return future.result(timeout=poll_interval)
+            except TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
@@ -0,0 +1,71 @@
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import XMLPullParser
+
+# (kind, loc, lastmod) where kind is "url" for a page and "sitemap" for a nested sitemap
+SitemapEntry = Tuple[str, str, Optional[float]]
+
+def parse_robots_sitemaps(robots_txt: str) -> List[str]:
+    sitemaps = []
+    for line in robots_txt.splitlines():
+        key, _, value = line.partition(':')
+        if key.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    # W3C datetime as used by sitemaps: a date, or a date-time with offset or Z
+    if not value:
+        return None
+    value = value.strip().replace('Z', '+00:00')
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+# Incremental sitemap reader: feed it the response body chunk by chunk (gzip
+# or plain XML) and it yields entries as soon as they are complete, so large
+# sitemaps never have to be held in memory.
+class SitemapParser:
+    def __init__(self):
+        self._parser = XMLPullParser(events=('end',))
+        self._decompressor = None
+        self._started = False
+        self._loc: Optional[str] = None
+        self._lastmod: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> Iterator[SitemapEntry]:
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b'\x1f\x8b':
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> Iterator[SitemapEntry]:
+        if self._decompressor is not None:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> Iterator[SitemapEntry]:
+        for _, element in self._parser.read_events():
+            name = _local_name(element.tag)
+            if name == 'loc':
+                self._loc = (element.text or '').strip()
+            elif name == 'lastmod':
+                self._lastmod = element.text
+            elif name in ('url', 'sitemap'):
+                if self._loc:
+                    yield ('url' if name == 'url' else 'sitemap', self._loc, parse_lastmod(self._lastmod))
+                self._loc, self._lastmod = None, None
+                element.clear()
@@ -0,0 +1,109 @@
+import posixpath
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+from src.extractor import merge_modules, normalize_name
+from src.parsing import Outline
+
+# Descriptions are cut at the end of a sentence below this many characters
+MAX_DESCRIPTION_CHARS = 300
+# Lines shorter than this are titles or labels rather than descriptions
+MIN_DESCRIPTION_WORDS = 6
+
+# How much each source of structure is trusted
+BREADCRUMB_CONFIDENCE = 0.9
+HEADING_CONFIDENCE = 0.8
+URL_PATH_CONFIDENCE = 0.7
+
+def humanize(slug: str) -> str:
+    slug = posixpath.splitext(slug)[0]
+    return ' '.join(word.capitalize() for word in re.split(r'[-_+]+', slug) if word)
+
+def describe(text: str, after: Optional[str] = None) -> str:
+    # The first sentence-like line of `text`, or of the part after the line `after`
+    lines = text.splitlines()
+    if after is not None:
+        key = normalize_name(after)
+        for i, line in enumerate(lines):
+            if normalize_name(line) == key:
+                lines = lines[i + 1:]
+                break
+        else:
+            return ""
+    for line in lines:
+        if len(line.split()) < MIN_DESCRIPTION_WORDS:
+            continue
+        if len(line) <= MAX_DESCRIPTION_CHARS:
+            return line
+        cut = line.rfind('. ', 0, MAX_DESCRIPTION_CHARS)
+        return line[:cut + 1] if cut > 0 else line[:MAX_DESCRIPTION_CHARS].rstrip() + "..."
+    return ""
+
+def page_title(url: str, outline: Outline) -> str:
+    for level, title in outline.headings:
+        if level == 1:
+            return title
+    if outline.breadcrumbs:
+        return outline.breadcrumbs[-1]
+    segments = [segment for segment in urlparse(url).path.split('/') if segment]
+    return humanize(segments[-1]) if segments else urlparse(url).netloc
+
+def _relative_segments(url: str, path_prefixes: List[str]) -> Tuple[str, ...]:
+    path = urlparse(url).path
+    for prefix in sorted(path_prefixes, key=len, reverse=True):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    return tuple(posixpath.splitext(segment)[0] for segment in path.split('/') if segment)
+
+def _section_headings(outline: Outline) -> List[str]:
+    # A page's own sections: its h2 headings, or its h3 headings if it has none
+    for level in (2, 3):
+        headings = [title for heading_level, title in outline.headings if heading_level == level]
+        if headings:
+            return headings
+    return []
+
+def build_hierarchy(content_map: Mapping[str, str], outlines: Dict[str, Outline],
+                    path_prefixes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    # Module -> submodule hierarchy from page structure alone, in the schema
+    # Extractor.extract returns. A page's module comes from its breadcrumb
+    # trail, or else from the first URL path segment below the crawl's start
+    # directory. Pages below a module become its submodules; a module's own
+    # page contributes its description and its section headings. No model
+    # call is made; Extractor.describe_modules can rewrite the descriptions.
+    if path_prefixes is None:
+        path_prefixes = sorted({urlparse(url).path.rsplit('/', 1)[0] + '/' for url in content_map})
+    segments = {url: _relative_segments(url, path_prefixes) for url in content_map}
+    titles = {url: page_title(url, outlines.get(url, Outline())) for url in content_map}
+    titles_by_path = {segments[url]: titles[url] for url in content_map}
+
+    entries = []
+    for url in sorted(content_map):
+        text = content_map[url]
+        outline = outlines.get(url, Outline())
+        title = titles[url]
+        # Landing pages link to every module and are not one themselves
+        if not segments[url] and len(content_map) > 1:
+            continue
+
+        crumbs = outline.breadcrumbs[1:]
+        if crumbs and normalize_name(crumbs[-1]) == normalize_name(title):
+            crumbs = crumbs[:-1]
+        if crumbs:
+            module, confidence = crumbs[0], BREADCRUMB_CONFIDENCE
+        elif len(segments[url]) > 1:
+            module = titles_by_path.get(segments[url][:1]) or humanize(segments[url][0])
+            confidence = URL_PATH_CONFIDENCE
+        else:
+            module, confidence = title, HEADING_CONFIDENCE
+
+        if normalize_name(module) == normalize_name(title):
+            submodules = {heading: describe(text, after=heading) for heading in _section_headings(outline)}
+            description = describe(text)
+        else:
+            submodules = {title: describe(text)}
+            description = ""
+        entries.append({"module": module, "Description": description,
+                        "Submodules": submodules, "confidence_score": confidence})
+    return merge_modules([entries])
@@ -0,0 +1,5 @@
+# Rough chars-per-token ratio for English documentation text
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
@@ -1,24 +1,132 @@
 import graphviz
-from typing import List, Dict, Any
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Collection, Dict, List, Optional
+
+# Large extractions are drawn a page of modules at a time, with each
+# module's submodules collapsed past MAX_SUBMODULES into a "+N more" node,
+# so the graph handed to graphviz stays about the same size however many
+# modules there are. Modules named in `expanded` show all their submodules.
+MODULES_PER_PAGE = 25
+MAX_SUBMODULES = 8
+# Graphs with more nodes than this skip orthogonal edge routing, which
+# dominates layout time on big graphs, and cap dot's crossing minimisation
+FAST_LAYOUT_NODES = 120
+# Rendered graphs kept in memory, keyed by a hash of the modules and options
+MAX_CACHED_RENDERS = 64
+
+def page_count(modules: List[Dict[str, Any]], page_size: Optional[int] = MODULES_PER_PAGE) -> int:
+    if not page_size:
+        return 1
+    return max(1, -(-len(modules) // page_size))
+
+def collapsed_modules(modules: List[Dict[str, Any]], max_submodules: Optional[int] = MAX_SUBMODULES) -> List[str]:
+    # Names of the modules whose submodules are partly hidden
+    if max_submodules is None:
+        return []
+    return [module.get('module', f'Module {i+1}') for i, module in enumerate(modules)
+            if len(module.get('Submodules') or {}) > max_submodules]
+
+def create_graph(modules: List[Dict[str, Any]], page: int = 0,
+                 page_size: Optional[int] = MODULES_PER_PAGE,
+                 max_submodules: Optional[int] = MAX_SUBMODULES,
+                 expanded: Collection[str] = (), fast: Optional[bool] = None) -> graphviz.Digraph:
+    # `page_size` and `max_submodules` of None draw everything; `fast` of
+    # None picks the fast layout by node count
+    start = page * page_size if page_size else 0
+    shown = modules[start:start + page_size] if page_size else modules
+    expanded = set(expanded)
+
+    nodes = len(shown)
+    for module in shown:
+        submodules = module.get('Submodules') or {}
+        if max_submodules is None or module.get('module') in expanded or len(submodules) <= max_submodules:
+            nodes += len(submodules)
+        else:
+            nodes += max_submodules + 1
+    if fast is None:
+        fast = nodes > FAST_LAYOUT_NODES
 
-def create_graph(modules: List[Dict[str, Any]]) -> graphviz.Digraph:
     dot = graphviz.Digraph(comment='Module Hierarchy')
-    dot.attr(rankdir='LR', splines='ortho')
+    if fast:
+        dot.attr(rankdir='LR', splines='line', nslimit='2', mclimit='0.5', remincross='false')
+    else:
+        dot.attr(rankdir='LR', splines='ortho')
     dot.attr('node', shape='box', style='filled', fontname='Helvetica')
-    
-    for i, module in enumerate(modules):
+
+    for i, module in enumerate(shown, start):
         module_name = module.get('module', f'Module {i+1}')
-        # Main Module Node
-        dot.node(module_name, module_name, fillcolor='#4F8BF9', fontcolor='white', fontsize='12')
-        
-        submodules = module.get('Submodules', {})
-        for sub_name, sub_desc in submodules.items():
+        # Main Module Node; ids are positional so repeated names stay separate nodes
+        module_id = f"m{i}"
+        dot.node(module_id, module_name, fillcolor='#4F8BF9', fontcolor='white', fontsize='12')
+
+        submodules = list((module.get('Submodules') or {}).items())
+        hidden = 0
+        if max_submodules is not None and module_name not in expanded and len(submodules) > max_submodules:
+            hidden = len(submodules) - max_submodules
+            submodules = submodules[:max_submodules]
+        for j, (sub_name, sub_desc) in enumerate(submodules):
             # Submodule Node
-            # Create a unique ID for the node to avoid conflicts if names are same across modules
-            sub_id = f"{module_name}_{sub_name}"
+            sub_desc = sub_desc or ''
             label = f"{sub_name}\n({sub_desc[:30]}...)" if len(sub_desc) > 30 else sub_name
-            
-            dot.node(sub_id, label, shape='note', fillcolor='#e1e4e8', fontcolor='black', fontsize='10')
-            dot.edge(module_name, sub_id, color='#666666')
-            
+            dot.node(f"{module_id}_s{j}", label, shape='note', fillcolor='#e1e4e8', fontcolor='black', fontsize='10')
+            dot.edge(module_id, f"{module_id}_s{j}", color='#666666')
+        if hidden:
+            dot.node(f"{module_id}_more", f"+{hidden} more", shape='note', style='filled,dashed',
+                     fillcolor='#f6f8fa', fontcolor='#666666', fontsize='10')
+            dot.edge(module_id, f"{module_id}_more", color='#999999', style='dashed')
+
+    if page_size and len(modules) > start + page_size:
+        remaining = len(modules) - start - page_size
+        dot.node("more_modules", f"+{remaining} more modules on later pages", shape='plaintext', fontcolor='#666666')
     return dot
+
+def graph_key(modules: List[Dict[str, Any]], **options: Any) -> str:
+    # Stable hash of the module list and drawing options
+    options = {name: sorted(value) if isinstance(value, (set, frozenset, list, tuple)) else value
+               for name, value in options.items()}
+    payload = json.dumps([modules, sorted(options.items())], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+_renders: "OrderedDict[str, Optional[str]]" = OrderedDict()
+_sources: "OrderedDict[str, str]" = OrderedDict()
+_renders_lock = threading.Lock()
+_MISSING = object()
+
+def _recall(cache: "OrderedDict[str, Any]", key: str) -> Any:
+    with _renders_lock:
+        if key not in cache:
+            return _MISSING
+        cache.move_to_end(key)
+        return cache[key]
+
+def _remember(cache: "OrderedDict[str, Any]", key: str, value: Any):
+    with _renders_lock:
+        cache[key] = value
+        while len(cache) > MAX_CACHED_RENDERS:
+            cache.popitem(last=False)
+
+def graph_source(modules: List[Dict[str, Any]], **options: Any) -> str:
+    # DOT source of create_graph(modules, **options), built once per distinct input
+    key = graph_key(modules, **options)
+    source = _recall(_sources, key)
+    if source is _MISSING:
+        source = create_graph(modules, **options).source
+        _remember(_sources, key, source)
+    return source
+
+def render_svg(modules: List[Dict[str, Any]], **options: Any) -> Optional[str]:
+    # SVG of create_graph(modules, **options), laid out once per distinct
+    # input. None when the graphviz executables are not installed, in which
+    # case graph_source() can be rendered client-side instead.
+    key = graph_key(modules, **options)
+    svg = _recall(_renders, key)
+    if svg is _MISSING:
+        try:
+            svg = graphviz.Source(graph_source(modules, **options)).pipe(format='svg').decode('utf-8')
+        except graphviz.ExecutableNotFound:
+            svg = None
+        _remember(_renders, key, svg)
+    return svg
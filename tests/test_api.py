@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+import api
+from api import run_extraction
+from src.checkpoint import CrawlCheckpoint
+from src.jobs import CANCELLED, Job, JobManager
+
+def test_resume_keeps_saved_crawl_settings(tmp_path, monkeypatch):
+    from benchmarks.fixture_site import generate_site, serve_site
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    server, base_url = serve_site(generate_site(num_pages=20, fanout=4))
+    try:
+        first = Job({"urls": [base_url], "max_depth": 2, "max_pages": 50, "engine": "structure", "checkpoint": True})
+        crawled = run_extraction(first)["pages_crawled"]
+        # A resume with different crawl settings continues the saved run as it was
+        resumed = Job({"urls": [base_url + "/docs/page-1"], "max_depth": 0, "max_pages": 1,
+                       "engine": "structure", "resume": first.id})
+        assert run_extraction(resumed)["pages_crawled"] == crawled > 1
+    finally:
+        server.shutdown()
+    saved = CrawlCheckpoint(first.id).load_params()
+    assert (saved["urls"], saved["max_depth"], saved["max_pages"]) == ([base_url], 2, 50)
+
+def test_coalesced_requests_all_get_events_and_progress(tmp_path, monkeypatch):
+    from benchmarks.fixture_site import generate_site, serve_site
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    server, base_url = serve_site(generate_site(num_pages=20, fanout=4), latency=0.05)
+    params = {"urls": [base_url], "max_depth": 2, "max_pages": 20}
+    jobs, events = [Job(params), Job(params)], [[], []]
+    try:
+        leader = threading.Thread(target=run_extraction, args=(jobs[0], events[0].append))
+        leader.start()
+        while not api.crawls.stats()["in_flight"]:
+            time.sleep(0.001)
+        run_extraction(jobs[1], events[1].append)
+        leader.join(timeout=30)
+    finally:
+        server.shutdown()
+
+    assert jobs[1].progress["crawl_shared"]
+    for job, received in zip(jobs, events):
+        kinds = [event["event"] for event in received]
+        assert kinds.count("page") == 20 and "chunk" in kinds
+        assert job.progress["chunks_done"] == job.progress["chunks"] == job.progress["chunks_extracted"]
+        assert "prompt_tokens" in job.progress
+    # The last request using the shared crawl removed its page segments
+    assert list((tmp_path / ".pulse_cache" / "pages").iterdir()) == []
+
+def test_abandoned_wait_cancels_its_job(monkeypatch):
+    manager = JobManager(max_workers=1)
+    monkeypatch.setattr(api, "jobs", manager)
+    release = threading.Event()
+    running = manager.submit(lambda job: release.wait(5), {})
+    queued = [manager.submit(lambda job: "done", {}) for _ in range(2)]
+
+    async def abandon(job):
+        waiter = asyncio.ensure_future(api._wait_for_job(job))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    for job in queued:
+        asyncio.run(abandon(job))
+    assert [job.status for job in queued] == [CANCELLED, CANCELLED]
+    release.set()
+    running.future.result(timeout=5)
+    assert manager.pending_count() == 0
+
+def test_cancelled_job_is_an_http_error(monkeypatch):
+    manager = JobManager(max_workers=1)
+    monkeypatch.setattr(api, "jobs", manager)
+    started, release = threading.Event(), threading.Event()
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+    job = manager.submit(work, {})
+    started.wait(5)
+    manager.cancel(job.id)
+    release.set()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(api._wait_for_job(job))
+    assert error.value.status_code == 409
@@ -0,0 +1,26 @@
+from src.batch import BatchExtractor
+from src.cache import MemoryCache
+from src.http_cache import HttpCache
+
+def test_batch_extracts_sites_separately(tmp_path):
+    from benchmarks.fixture_site import generate_site, serve_site
+    servers = [serve_site(generate_site(num_pages=20, fanout=4), latency=0.01) for _ in range(3)]
+    try:
+        sites = [[base_url] for _, base_url in servers] + [["http://127.0.0.1:9/"]]
+        streamed = []
+        runner = BatchExtractor(engine="structure", max_depth=2, max_pages=20, cache=MemoryCache(),
+                                http_cache=HttpCache(str(tmp_path / "http_cache.sqlite")),
+                                pages_dir=str(tmp_path / "pages"))
+        results = runner.run_sync(sites, streamed.append)
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+    assert streamed == results
+    by_site = {result.site: result for result in results}
+    assert set(by_site) == {urls[0] for urls in sites}
+    for _, base_url in servers:
+        assert by_site[base_url].error is None
+        assert by_site[base_url].pages_crawled == 20
+        assert by_site[base_url].modules
+    assert by_site["http://127.0.0.1:9/"].error == "No content found to extract."
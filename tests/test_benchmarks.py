@@ -0,0 +1,47 @@
+import re
+from benchmarks.bench_e2e import percentile
+from benchmarks.fake_openai import serve_fake_openai
+from benchmarks.fixture_site import generate_site
+from src.cache import MemoryCache
+from src.dispatcher import Dispatcher
+from src.extractor import Extractor
+
+def test_fixture_site_depth_and_duplicates():
+    site = generate_site(num_pages=100, depth=2, duplicate_ratio=0.25)
+    assert len(site) == 100
+    # Every page is linked from the home page or one of its children
+    linked = set(re.findall(r'href="(/docs/page-\d+)"', site["/"]))
+    for path in list(linked):
+        linked.update(re.findall(r'href="(/docs/page-\d+)"', site[path]))
+    assert linked == set(site) - {"/"}
+    bodies = {re.search(r'</h1>(.*?)<ul>', html, re.S).group(1) for html in site.values()}
+    assert len(bodies) == 76
+
+def test_percentile_is_nearest_rank():
+    samples = [5.0, 1.0, 3.0, 2.0, 4.0]
+    assert percentile(samples, 0.5) == 3.0
+    assert percentile(samples, 0.9) == 5.0
+    assert percentile([7.0], 0.99) == 7.0
+
+def test_extractor_against_fake_openai(monkeypatch):
+    server, base_url, stats = serve_fake_openai(rate_limit=2)
+    monkeypatch.setenv("OPENAI_API_KEY", "benchmark")
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    try:
+        extractor = Extractor(cache=MemoryCache(),
+                              dispatcher=Dispatcher(requests_per_minute=1e6, tokens_per_minute=1e9, base_delay=0.05))
+        content = {f"https://example.com/{i}": f"Topic {i}\n" + "Configure the feature settings. " * 200
+                   for i in range(3)}
+        modules = extractor.extract_chunked(content, max_chunk_tokens=2000)
+    finally:
+        server.shutdown()
+    assert {module["module"] for module in modules} == {"Topic 0", "Topic 1", "Topic 2"}
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == extractor.last_run["chunks"]
+    assert snapshot["rate_limited"] > 0
+    # Every 429 reached the dispatcher rather than the SDK's own retries
+    assert extractor.dispatcher.stats()["throttled"] == snapshot["rate_limited"]
+    assert snapshot["prompt_tokens"] > 0
+    # Token counts come from the usage field of every response
+    assert extractor.usage == {"prompt": snapshot["prompt_tokens"], "completion": snapshot["completion_tokens"]}
+    assert {"prompt", "llm", "normalize"} <= set(extractor.timings.summary())
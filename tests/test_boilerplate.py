@@ -0,0 +1,29 @@
+from src.boilerplate import BoilerplateFilter
+
+CHROME = ["Home > Help Center", "We use cookies to improve your experience.", "Was this helpful?"]
+
+def page(topic):
+    return "\n".join([CHROME[0], f"How to {topic}", f"Details about {topic} and its settings.", CHROME[1], CHROME[2]])
+
+def test_repeated_lines_are_stripped():
+    boilerplate = BoilerplateFilter(max_fraction=0.5, min_pages=3)
+    topics = ["reset a password", "export data", "invite a teammate", "close an account"]
+    for topic in topics:
+        boilerplate.add(page(topic))
+    assert boilerplate.clean(page("export data")) == "How to export data\nDetails about export data and its settings."
+    text, lines_removed, bytes_removed = boilerplate.strip(page("export data"))
+    assert lines_removed == 3 and bytes_removed == sum(len(line) + 1 for line in CHROME)
+    # Cleaning is repeatable: the same page always reports the same removal
+    assert boilerplate.strip(page("export data")) == (text, lines_removed, bytes_removed)
+
+def test_nothing_is_stripped_before_min_pages():
+    boilerplate = BoilerplateFilter(max_fraction=0.5, min_pages=5)
+    boilerplate.add(page("export data"))
+    boilerplate.add(page("import data"))
+    assert boilerplate.clean(page("export data")) == page("export data")
+
+def test_matching_ignores_case_and_spacing():
+    boilerplate = BoilerplateFilter(max_fraction=0.5, min_pages=2)
+    boilerplate.add("Was this helpful?\nAlpha")
+    boilerplate.add("was  this helpful?\nBeta")
+    assert boilerplate.clean("WAS THIS HELPFUL?\nGamma") == "Gamma"
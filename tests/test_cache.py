@@ -0,0 +1,39 @@
+import time
+from src.cache import MemoryCache, SQLiteCache
+
+def test_sqlite_cache_roundtrip_and_stats(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get("k") is None
+    cache.set("k", [{"module": "Billing"}])
+    assert cache.get("k") == [{"module": "Billing"}]
+
+    # A second instance on the same file sees the entry and the shared counters
+    other = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    assert other.get("k") == [{"module": "Billing"}]
+    stats = other.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_sqlite_cache_ttl(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=0)
+    cache.set("k", 1)
+    time.sleep(0.01)
+    assert cache.get("k") is None
+
+def test_memory_cache_byte_budget():
+    cache = MemoryCache(max_entries=None, max_bytes=10)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    assert cache.get("a") is None
+    assert cache.get("b") == "yyyy"
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+from src.checkpoint import CrawlCheckpoint
+from src.crawler import Crawler
+
+class Crash(BaseException):
+    pass
+
+def crash_after(pages):
+    stored = []
+
+    def on_page(url, text):
+        stored.append(url)
+        if len(stored) == pages:
+            raise Crash()
+    return on_page
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_resumed_crawl_matches_uninterrupted_crawl(tmp_path, mode):
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=60, fanout=4))
+    path = str(tmp_path / "checkpoints.sqlite")
+
+    def run(crawler):
+        if mode == "sync":
+            crawler.crawl()
+        else:
+            asyncio.run(crawler.crawl_async())
+
+    try:
+        full = Crawler([base_url], max_depth=3, max_concurrency=4)
+        run(full)
+
+        interrupted = Crawler([base_url], max_depth=3, max_concurrency=4, on_page=crash_after(20),
+                              checkpoint=CrawlCheckpoint("run", path=path), checkpoint_pages=5)
+        with pytest.raises(Crash):
+            run(interrupted)
+
+        fetched = []
+        resumed = Crawler([base_url], max_depth=3, max_concurrency=4, on_page=lambda url, text: fetched.append(url),
+                          checkpoint=CrawlCheckpoint("run", path=path))
+        run(resumed)
+    finally:
+        server.shutdown()
+
+    assert resumed.content == full.content
+    assert resumed.visited == full.visited
+    # At least 20 pages were stored before the crash; only pages in flight
+    # at that point (at most one per worker) are fetched a second time
+    assert len(fetched) <= len(full.content) - 20 + 4
+
+def test_checkpoint_keeps_params_and_outlines(tmp_path):
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=10, fanout=4))
+    path = str(tmp_path / "checkpoints.sqlite")
+    try:
+        crawler = Crawler([base_url], max_depth=2, checkpoint=CrawlCheckpoint("run", {"urls": [base_url]}, path=path))
+        crawler.crawl()
+    finally:
+        server.shutdown()
+
+    checkpoint = CrawlCheckpoint("run", path=path)
+    assert checkpoint.load_params() == {"urls": [base_url]}
+    restored = Crawler([base_url], max_depth=2, checkpoint=checkpoint)
+    # A finished run resumes with nothing left to fetch
+    restored.crawl()
+    assert restored.content == crawler.content
+    assert restored.outlines == crawler.outlines
+    assert not CrawlCheckpoint("other", path=path).exists()
+
+def test_async_saves_are_incremental_and_off_the_loop(tmp_path):
+    from benchmarks.fixture_site import generate_site, serve_site
+    writes = []
+
+    class RecordingCheckpoint(CrawlCheckpoint):
+        def write(self, changes):
+            writes.append((threading.current_thread(), len(changes.pages), len(changes.done)))
+            super().write(changes)
+
+    server, base_url = serve_site(generate_site(num_pages=60, fanout=4))
+    try:
+        checkpoint = RecordingCheckpoint("run", path=str(tmp_path / "checkpoints.sqlite"))
+        crawler = Crawler([base_url], max_depth=3, max_concurrency=4, checkpoint=checkpoint, checkpoint_pages=5)
+        asyncio.run(crawler.crawl_async())
+    finally:
+        server.shutdown()
+
+    assert len(writes) > 5
+    assert all(thread is not threading.main_thread() for thread, _, _ in writes)
+    # Every page is written once, and nothing is left over after the last save
+    assert sum(pages for _, pages, _ in writes) == len(crawler.content)
+    assert sum(done for _, _, done in writes) == len(crawler.visited)
+    leftover = checkpoint.changes(crawler)
+    assert not (leftover.queued or leftover.done or leftover.visited or leftover.pages)
@@ -1,14 +1,109 @@
+import asyncio
 import pytest
 from src.crawler import Crawler
 
 def test_is_valid_url():
-    crawler = Crawler("https://example.com")
+    crawler = Crawler(["https://example.com"])
     assert crawler.is_valid_url("https://example.com/page1") == True
     assert crawler.is_valid_url("https://google.com") == False
     assert crawler.is_valid_url("https://example.com/sub/page") == True
 
 def test_crawler_init():
-    crawler = Crawler("https://example.com", max_depth=3)
-    assert crawler.base_url == "https://example.com"
+    crawler = Crawler(["https://example.com"], max_depth=3)
+    assert crawler.start_urls == ["https://example.com"]
     assert crawler.max_depth == 3
     assert len(crawler.visited) == 0
+
+def test_crawl_async_matches_sync():
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=40, fanout=4))
+    try:
+        sync_crawler = Crawler([base_url], max_depth=2)
+        sync_crawler.crawl()
+        async_crawler = Crawler([base_url], max_depth=2, max_concurrency=8)
+        asyncio.run(async_crawler.crawl_async())
+    finally:
+        server.shutdown()
+    assert async_crawler.visited == sync_crawler.visited
+    assert async_crawler.content == sync_crawler.content
+
+def test_crawl_async_with_parse_pool():
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=40, fanout=4))
+    try:
+        inline = Crawler([base_url], max_depth=2, max_concurrency=8)
+        asyncio.run(inline.crawl_async())
+        pooled = Crawler([base_url], max_depth=2, max_concurrency=8, parse_workers=2)
+        asyncio.run(pooled.crawl_async())
+    finally:
+        server.shutdown()
+    assert pooled.visited == inline.visited
+    assert pooled.content == inline.content
+
+def test_crawls_share_a_parse_executor():
+    from benchmarks.fixture_site import generate_site, serve_site
+    from src.parsing import create_parse_executor
+    executor = create_parse_executor(2)
+    assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    server, base_url = serve_site(generate_site(num_pages=20, fanout=4))
+    try:
+        crawls = [Crawler([base_url], max_depth=2, parse_workers=2, parse_executor=executor) for _ in range(2)]
+        for crawler in crawls:
+            asyncio.run(crawler.crawl_async())
+        # Each crawl ran on its own loop; the executor outlives both
+        assert executor.submit(len, "abc").result(timeout=30) == 3
+    finally:
+        server.shutdown()
+        executor.shutdown()
+    assert crawls[0].content == crawls[1].content and len(crawls[0].content) == 20
+
+def test_crawl_respects_max_pages():
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=40, fanout=4))
+    try:
+        crawler = Crawler([base_url], max_depth=3, max_pages=10)
+        asyncio.run(crawler.crawl_async())
+    finally:
+        server.shutdown()
+    assert crawler.frontier.pages_started == 10
+    assert len(crawler.content) == 10
+
+def test_sitemap_discovery_queues_pages_without_following_links(tmp_path):
+    from benchmarks.fixture_site import generate_site, serve_site
+    from src.http_cache import HttpCache
+    server, base_url = serve_site(generate_site(num_pages=40, fanout=4, sitemap=True))
+    try:
+        crawler = Crawler([base_url], max_depth=1, use_sitemaps=True,
+                          http_cache=HttpCache(str(tmp_path / "http.sqlite")))
+        asyncio.run(crawler.crawl_async())
+        assert crawler.sitemap_urls == 39
+        assert len(crawler.content) == 40
+
+        # Every sitemap lastmod predates the cached copies, so nothing is refetched
+        recrawl = Crawler([base_url], max_depth=1, use_sitemaps=True, http_cache=crawler.http_cache)
+        hits_before = crawler.http_cache.hits
+        asyncio.run(recrawl.crawl_async())
+        assert recrawl.content == crawler.content
+        assert crawler.http_cache.hits - hits_before == 40
+    finally:
+        server.shutdown()
+
+def test_near_duplicate_keeps_smallest_url():
+    from src.parsing import Outline
+    text = " ".join(f"Step {i}: choose how invoices are delivered to your finance team." for i in range(30))
+    crawler = Crawler(["https://example.com"])
+    crawler._store_page("https://example.com/billing?print=1", ("Print\n" + text, [], Outline()))
+    crawler._store_page("https://example.com/billing", (text, [], Outline()))
+    assert list(crawler.content) == list(crawler.outlines) == ["https://example.com/billing"]
+
+def test_get_content_reports_boilerplate_per_call():
+    from src.parsing import Outline
+    crawler = Crawler(["https://example.com"])
+    for i in range(6):
+        text = f"We use cookies to improve your experience.\nArticle {i}: " + f"unique topic {i} words " * 10
+        crawler._store_page(f"https://example.com/{i}", (text, [], Outline()))
+    first = crawler.get_content()
+    removed = crawler.boilerplate_removed
+    assert removed["lines_removed"] == 6
+    assert crawler.get_content() == first
+    assert crawler.boilerplate_removed == removed
@@ -0,0 +1,42 @@
+from src.dedup import NearDuplicateFilter, estimate_similarity, minhash
+
+ARTICLE = " ".join(
+    f"Step {i}: open the billing settings page and choose how invoices are delivered to your finance team."
+    for i in range(30)
+)
+
+def test_minhash_similarity_tracks_overlap():
+    assert estimate_similarity(minhash(ARTICLE), minhash(ARTICLE)) == 1.0
+    edited = ARTICLE + " One extra closing sentence about refunds."
+    assert estimate_similarity(minhash(ARTICLE), minhash(edited)) > 0.85
+    other = " ".join(f"Item {i} describes keyboard shortcuts for the video editor timeline." for i in range(30))
+    assert estimate_similarity(minhash(ARTICLE), minhash(other)) < 0.3
+
+def test_filter_drops_near_duplicates_and_reports_savings():
+    dedup = NearDuplicateFilter()
+    assert dedup.check("https://example.com/billing", ARTICLE) is None
+    print_view = "Print this article\n" + ARTICLE
+    assert dedup.check("https://example.com/billing?print=1", print_view) == (
+        "https://example.com/billing", "https://example.com/billing?print=1")
+    assert dedup.check("https://example.com/shortcuts", "Keyboard shortcuts for the editor timeline. " * 20) is None
+    stats = dedup.stats()
+    assert stats["pages_dropped"] == 1
+    assert stats["bytes_removed"] == len(print_view)
+    assert stats["tokens_removed"] > 0
+
+def test_filter_keeps_the_smallest_url_whatever_the_order():
+    copies = {"https://example.com/fr/billing": "Imprimer\n" + ARTICLE, "https://example.com/billing": ARTICLE,
+              "https://example.com/billing?print=1": "Print this article\n" + ARTICLE}
+    for urls in (list(copies), list(reversed(copies))):
+        dedup = NearDuplicateFilter()
+        kept = set()
+        for url in urls:
+            result = dedup.check(url, copies[url])
+            if result is None:
+                kept.add(url)
+            else:
+                kept.add(result[0])
+                kept.discard(result[1])
+        assert kept == {"https://example.com/billing"}
+        assert dedup.pages_dropped == 2
+        assert dedup.bytes_removed == sum(len(copies[url]) for url in copies) - len(ARTICLE)
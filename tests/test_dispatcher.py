@@ -0,0 +1,77 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from src.dispatcher import BATCH, INTERACTIVE, Dispatcher, TokenBucket, retry_after
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None, code=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.code = code
+        self.response = SimpleNamespace(headers=headers or {})
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(600)  # 10 per second
+    now = time.monotonic()
+    assert bucket.wait_time(600, now) == 0
+    bucket.consume(600)
+    assert bucket.wait_time(20, now) == pytest.approx(2.0, abs=0.01)
+    # Requests larger than the bucket only wait for it to be full
+    assert bucket.wait_time(10000, now) == pytest.approx(60.0, abs=0.01)
+
+def test_retry_after_headers():
+    assert retry_after(FakeAPIError(429, {"retry-after": "2"})) == 2.0
+    assert retry_after(FakeAPIError(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(FakeAPIError(429)) is None
+
+def test_rate_limited_call_is_retried_after_retry_after():
+    dispatcher = Dispatcher(base_delay=10)
+    attempts = []
+
+    def request():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise FakeAPIError(429, {"retry-after": "0.05"})
+        return "ok"
+
+    assert dispatcher.call(request, tokens=100) == "ok"
+    assert attempts[2] - attempts[0] >= 0.1
+    assert dispatcher.stats()["retries"] == 2
+    assert dispatcher.stats()["throttled"] == 2
+
+def test_non_retryable_errors_are_raised_immediately():
+    dispatcher = Dispatcher()
+    for error in (FakeAPIError(400), FakeAPIError(429, code="insufficient_quota")):
+        calls = []
+
+        def request():
+            calls.append(1)
+            raise error
+
+        with pytest.raises(FakeAPIError):
+            dispatcher.call(request, tokens=100)
+        assert len(calls) == 1
+
+def test_interactive_calls_are_served_before_batch_calls():
+    dispatcher = Dispatcher(max_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    blocker = threading.Thread(target=dispatcher.call, args=(release.wait, 1))
+    blocker.start()
+    while dispatcher.stats()["active"] == 0:
+        time.sleep(0.001)
+
+    threads = []
+    for name, priority in [("batch-1", BATCH), ("batch-2", BATCH), ("interactive", INTERACTIVE)]:
+        thread = threading.Thread(target=dispatcher.call, args=(lambda name=name: order.append(name), 1, priority))
+        thread.start()
+        threads.append(thread)
+        while dispatcher.stats()["waiting"] < len(threads):
+            time.sleep(0.001)
+
+    release.set()
+    for thread in [blocker] + threads:
+        thread.join(timeout=5)
+    assert order == ["interactive", "batch-1", "batch-2"]
@@ -0,0 +1,92 @@
+import json
+from types import SimpleNamespace
+from src.cache import MemoryCache
+from src.dispatcher import Dispatcher
+from src.extractor import Extractor, chunk_content, merge_modules, estimate_tokens
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.last_prompt = kwargs["messages"][-1]["content"]
+        content = json.dumps({"modules": [{"module": f"Module {self.calls}", "Description": "",
+                                           "Submodules": {}, "confidence_score": 0.5}]})
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def make_extractor():
+    # Unthrottled, so the tests are not paced by the model's real rate limits
+    extractor = Extractor(cache=MemoryCache(), dispatcher=Dispatcher(requests_per_minute=1e6, tokens_per_minute=1e9))
+    completions = FakeCompletions()
+    extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return extractor, completions
+
+def test_chunk_content_respects_page_boundaries_and_budget():
+    pages = {f"https://example.com/{i}": f"Page {i}\n" + "word " * 200 for i in range(10)}
+    chunks = chunk_content(pages, max_chunk_tokens=600)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 600 for chunk in chunks)
+    # Every page ends up in exactly one chunk, none are dropped
+    assert sum(chunk.count("Page ") for chunk in chunks) == 10
+
+def test_chunk_content_splits_oversized_page():
+    pages = {"https://example.com/big": "\n".join(f"line {i} " * 10 for i in range(500))}
+    chunks = chunk_content(pages, max_chunk_tokens=500)
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == pages["https://example.com/big"]
+
+def test_merge_modules_dedupes_modules_and_submodules():
+    merged = merge_modules([
+        [{"module": "Account Settings", "Description": "Short.",
+          "Submodules": {"Change Username": "Update handle."}, "confidence_score": 0.7}],
+        [{"module": "account settings", "Description": "A longer description.",
+          "Submodules": {"change username": "Explains how to update your handle.", "Privacy": "Who sees what."},
+          "confidence_score": 0.9}],
+        [{"module": "Billing", "Description": "Invoices.", "Submodules": {}, "confidence_score": 0.8}],
+    ])
+    assert [m["module"] for m in merged] == ["Account Settings", "Billing"]
+    account = merged[0]
+    assert account["Description"] == "A longer description."
+    assert account["confidence_score"] == 0.9
+    assert account["Submodules"] == {
+        "Change Username": "Explains how to update your handle.",
+        "Privacy": "Who sees what.",
+    }
+
+def test_chunk_boundaries_are_stable_when_a_page_changes():
+    pages = {f"https://example.com/docs/{i}": f"Topic {i}\n" + "detail " * 150 for i in range(60)}
+    before = chunk_content(pages, max_chunk_tokens=2000)
+    pages["https://example.com/docs/17"] = "Topic 17 was rewritten\n" + "detail " * 150
+    after = chunk_content(pages, max_chunk_tokens=2000)
+    assert len(before) == len(after)
+    assert sum(1 for old, new in zip(before, after) if old != new) == 1
+
+def test_extract_chunked_only_reanalyses_changed_chunks():
+    pages = {f"https://example.com/docs/{i}": f"Topic {i}\n" + "detail " * 150 for i in range(60)}
+    extractor, completions = make_extractor()
+    extractor.extract_chunked(pages, max_chunk_tokens=2000)
+    first_calls = completions.calls
+    assert first_calls == extractor.last_run["chunks"] > 1
+
+    pages["https://example.com/docs/17"] += "\nNew paragraph"
+    extractor.extract_chunked(pages, max_chunk_tokens=2000)
+    assert completions.calls == first_calls + 1
+    assert extractor.last_run["chunks_reused"] == extractor.last_run["chunks"] - 1
+
+def test_extract_chunked_sends_chunks_whole():
+    # About 5 characters per token, so a 6000-token chunk is well over MAX_PROMPT_CHARS
+    text = "Topic\n" + "Configure notification settings per channel. " * 700
+    assert len(text) > 25000
+    extractor, completions = make_extractor()
+    extractor.extract_chunked({"https://example.com/": text}, max_chunk_tokens=20000)
+    assert completions.calls == 1
+    assert text in completions.last_prompt
+
+def test_extract_chunked_packs_content_into_token_budget():
+    extractor, _ = make_extractor()
+    pages = {f"https://example.com/{i}": f"Topic {i}\n" + f"detail{i} " * 400 for i in range(10)}
+    extractor.extract_chunked(pages, max_chunk_tokens=600, token_budget=1500)
+    assert extractor.last_run["tokens_used"] <= 1500
+    assert extractor.last_run["tokens_dropped"] > 0
@@ -0,0 +1,59 @@
+from src.frontier import Frontier, VisitedSet, canonicalize_url, doc_score
+
+def test_canonicalize_url_collapses_variants():
+    canonical = canonicalize_url("https://example.com/docs/billing")
+    assert canonicalize_url("HTTPS://www.Example.com:443/docs/billing/") == canonical
+    assert canonicalize_url("https://example.com/docs/billing?utm_source=x&utm_medium=y") == canonical
+    assert canonicalize_url("https://example.com/en-us/docs/billing#pricing") == canonical
+    assert canonicalize_url("https://example.com/docs//./billing/index.html") == canonical
+
+def test_canonicalize_url_only_collapses_real_locales():
+    canonical = canonicalize_url("https://example.com/install")
+    for locale in ("fr", "pt_BR", "zh-hans", "es-419"):
+        assert canonicalize_url(f"https://example.com/{locale}/install") == canonical
+    # Two-letter sections that are not language codes are different pages
+    keys = {canonicalize_url(f"https://example.com/{section}/install") for section in ("js", "py", "go", "ai")}
+    assert len(keys) == 4 and canonical not in keys
+    assert canonicalize_url("https://example.com/ai/x") != canonicalize_url("https://example.com/ml/x")
+    assert canonicalize_url("https://example.com/id-auth/x") != canonicalize_url("https://example.com/x")
+
+def test_canonicalize_url_keeps_meaningful_query_and_ports():
+    assert canonicalize_url("https://example.com/search?b=2&a=1") == "https://example.com/search?a=1&b=2"
+    assert canonicalize_url("http://example.com:8080/") == "http://example.com:8080/"
+
+def test_doc_score_prefers_documentation():
+    assert doc_score("https://example.com/help/articles/reset-password") > doc_score("https://example.com/login")
+
+def test_frontier_dedupes_and_orders_by_depth_then_score():
+    frontier = Frontier()
+    assert frontier.add("https://example.com/", 0)
+    assert not frontier.add("https://example.com/?utm_campaign=spring", 0)
+    assert frontier.add("https://example.com/careers", 1)
+    assert frontier.add("https://example.com/docs/guide", 1)
+    assert not frontier.add("https://example.com/logo.png", 1)
+    assert [frontier.pop() for _ in range(3)] == [
+        ("https://example.com/", 0),
+        ("https://example.com/docs/guide", 1),
+        ("https://example.com/careers", 1),
+    ]
+    assert frontier.pop() is None
+
+def test_frontier_page_and_byte_budgets():
+    frontier = Frontier(max_pages=2)
+    for i in range(5):
+        frontier.add(f"https://example.com/docs/{i}", 1)
+    assert frontier.pop() and frontier.pop()
+    assert frontier.pop() is None
+
+    frontier = Frontier(max_bytes=100)
+    frontier.add("https://example.com/a", 0)
+    frontier.add("https://example.com/b", 0)
+    frontier.pop()
+    frontier.record_bytes(150)
+    assert frontier.pop() is None
+
+def test_visited_set():
+    visited = VisitedSet()
+    assert visited.add("https://example.com/")
+    assert not visited.add("https://example.com/")
+    assert "https://example.com/" in visited and len(visited) == 1
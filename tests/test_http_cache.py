@@ -0,0 +1,47 @@
+from src.http_cache import HttpCache, cache_key
+
+def test_cache_key_ignores_case_and_fragment():
+    assert cache_key("HTTPS://Example.com/Docs#intro") == "https://example.com/Docs"
+    assert cache_key("https://example.com") == "https://example.com/"
+
+def test_conditional_get_roundtrip(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    assert cache.get("https://example.com/a") is None
+
+    body = cache.resolve("https://example.com/a", 200, {'ETag': '"v1"'}, "<html>v1</html>", None)
+    assert body == "<html>v1</html>"
+
+    cached = cache.get("https://example.com/a")
+    assert cache.conditional_headers(cached) == {'If-None-Match': '"v1"'}
+    assert cache.resolve("https://example.com/a", 304, {}, None, cached) == "<html>v1</html>"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_responses_without_validators_are_not_stored(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    cache.resolve("https://example.com/a", 200, {}, "<html></html>", None)
+    assert cache.get("https://example.com/a") is None
+
+def test_async_crawl_uses_the_cache_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+    from benchmarks.fixture_site import generate_site, serve_site
+    from src.crawler import Crawler
+    threads = set()
+
+    class RecordingCache(HttpCache):
+        def get(self, url):
+            threads.add(threading.current_thread())
+            return super().get(url)
+
+    cache = RecordingCache(str(tmp_path / "http.sqlite"))
+    server, base_url = serve_site(generate_site(num_pages=30, fanout=4))
+    try:
+        for _ in range(2):
+            asyncio.run(Crawler([base_url], max_depth=3, http_cache=cache).crawl_async())
+    finally:
+        server.shutdown()
+    assert threading.main_thread() not in threads
+    # Connections are reused per thread rather than opened per page
+    assert len(cache._connections) <= len(threads) + 1 < 60
+    assert cache.hits == 30
+    cache.close()
@@ -0,0 +1,45 @@
+import threading
+import pytest
+from src.jobs import JobManager, QueueFullError, SUCCEEDED, FAILED, CANCELLED
+
+def test_job_runs_in_background_and_reports_result():
+    manager = JobManager(max_workers=2)
+    job = manager.submit(lambda job: {"answer": 42}, {})
+    assert job.future.result(timeout=5) == {"answer": 42}
+    assert manager.get(job.id).status == SUCCEEDED
+    assert manager.get(job.id).to_dict()["result"] == {"answer": 42}
+
+def test_failed_job_records_error():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError("boom")
+
+    job = manager.submit(work, {})
+    with pytest.raises(ValueError):
+        job.future.result(timeout=5)
+    assert job.status == FAILED and job.error == "boom"
+
+def test_queue_limit_and_cancellation():
+    manager = JobManager(max_workers=1, max_pending=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return "done"
+
+    running = manager.submit(blocking, {})
+    started.wait(5)
+    queued = manager.submit(blocking, {})
+    with pytest.raises(QueueFullError):
+        manager.submit(blocking, {})
+
+    # A queued job is cancelled immediately, a running one at its next check
+    assert manager.cancel(queued.id).status == CANCELLED
+    manager.cancel(running.id)
+    release.set()
+    running.future.result(timeout=5)
+    assert running.status == CANCELLED
@@ -0,0 +1,37 @@
+import asyncio
+from src.crawler import Crawler
+from src.metrics import Timings, format_timings, render_metrics, span
+
+def test_timings_summary():
+    timings = Timings()
+    timings.add("fetch", 0.010)
+    timings.add("fetch", 0.030)
+    timings.add("parse", 0.002)
+    with span("llm", timings):
+        pass
+    summary = timings.summary()
+    assert list(summary) == ["fetch", "parse", "llm"]
+    assert summary["fetch"] == {"count": 2, "total_ms": 40.0, "mean_ms": 20.0, "max_ms": 30.0}
+    assert "fetch" in format_timings(summary)
+
+def test_crawl_records_stage_timings_and_metrics():
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=20, fanout=4, duplicate_ratio=0.2))
+    try:
+        crawler = Crawler([base_url], max_depth=2)
+        asyncio.run(crawler.crawl_async())
+        crawler.get_content()
+    finally:
+        server.shutdown()
+    summary = crawler.timings.summary()
+    assert set(summary) == {"crawl", "fetch", "parse", "clean", "links"}
+    assert summary["crawl"]["count"] == 1
+    assert summary["fetch"]["count"] == summary["parse"]["count"] == 20
+
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    text = body.decode()
+    assert 'pulse_http_responses_total{status="200"}' in text
+    assert 'pulse_pages_total{outcome="stored"}' in text
+    assert 'pulse_pages_total{outcome="duplicate"}' in text
+    assert 'pulse_stage_seconds_count{stage="parse"}' in text
@@ -0,0 +1,50 @@
+from src.packing import pack_content, resolve_token_budget, split_sections, token_budget, token_counter
+from src.tokens import estimate_tokens
+
+FILLER = "Click the button below to continue reading this page and learn more. " * 8
+
+def make_pages():
+    pages = {}
+    for i in range(6):
+        pages[f"https://example.com/{i}"] = (
+            f"Webhook Retries {i}\n"
+            f"Signature verification uses hmac secret rotation{i} with replay window tolerance{i}.\n"
+            "Related Articles\n" + FILLER
+        )
+    return pages
+
+def test_split_sections_starts_at_headings():
+    text = "Intro\nFirst body line.\nSecond body line.\nSetup\nInstall it.\nUsage\nRun it."
+    assert split_sections(text) == ["Intro\nFirst body line.\nSecond body line.", "Setup\nInstall it.",
+                                    "Usage\nRun it."]
+
+def test_pack_content_fits_budget_and_reports_dropped_tokens():
+    pages = make_pages()
+    total = sum(estimate_tokens(section) for text in pages.values() for section in split_sections(text))
+    result = pack_content(pages, budget=total // 3)
+    assert result.tokens_used <= total // 3
+    assert result.tokens_used + result.tokens_dropped == total
+    assert result.sections_dropped > 0
+
+def test_pack_content_prefers_informative_sections():
+    result = pack_content(make_pages(), budget=200)
+    packed = "\n".join(result.content_map.values())
+    assert "hmac secret rotation" in packed
+    assert "Click the button below" not in packed
+
+def test_pack_content_keeps_original_order():
+    text = "Alpha\nunique alpha words here.\nBeta\nunique beta words here.\nGamma\nunique gamma words here."
+    result = pack_content({"https://example.com": text}, budget=10000)
+    assert result.content_map["https://example.com"] == text
+    assert result.tokens_dropped == 0
+
+def test_token_counter_and_budget_defaults():
+    count = token_counter("unknown-model")
+    assert count("some documentation text") > 0
+    assert token_budget("gpt-4o") > token_budget("gpt-3.5-turbo")
+
+def test_packing_is_opt_in():
+    assert resolve_token_budget(None, "gpt-4o") is None
+    assert resolve_token_budget(0, "gpt-4o") is None
+    assert resolve_token_budget(5000, "gpt-4o") == 5000
+    assert resolve_token_budget("auto", "gpt-4o") == token_budget("gpt-4o")
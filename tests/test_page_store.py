@@ -0,0 +1,99 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from src import page_store
+from src.crawler import Crawler
+from src.extractor import chunk_content, iter_chunks
+from src.page_store import DiskPageStore
+
+def test_store_round_trips_pages_in_insertion_order(tmp_path):
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    pages = {f"https://example.com/{i}": f"Page {i} " + "text " * i for i in range(50)}
+    for url, text in pages.items():
+        store[url] = text
+    assert list(store) == list(pages)
+    assert store == pages
+    assert store.stats()["pages"] == 50
+
+def test_store_reads_pages_written_after_mapping(tmp_path):
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    store["a"] = "first"
+    assert store["a"] == "first"
+    store["b"] = "second"
+    store["a"] = "replaced"
+    assert store["b"] == "second"
+    assert store["a"] == "replaced"
+    del store["b"]
+    assert "b" not in store and len(store) == 1
+
+def test_store_reads_from_many_threads(tmp_path):
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    pages = {f"https://example.com/{i}": f"Page {i}\n" + f"Section {i} of the guide. " * (50 + i) for i in range(300)}
+    store.update(pages)
+
+    def read_all(_):
+        return all(store[url] == text for url, text in pages.items())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(read_all, range(8)))
+
+def test_store_compresses_repetitive_text(tmp_path):
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    for i in range(20):
+        store[f"page{i}"] = "Configure your account settings and notifications.\n" * 200
+    stats = store.stats()
+    assert stats["disk_bytes"] * 10 < stats["raw_bytes"]
+
+def test_store_falls_back_to_zlib(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_store, "zstandard", None)
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    store["a"] = "é" * 1000
+    assert store.codec == page_store.CODEC_ZLIB
+    assert store["a"] == "é" * 1000
+
+def test_store_removes_segment_on_close(tmp_path):
+    path = tmp_path / "pages.seg"
+    store = DiskPageStore(str(path))
+    store["a"] = "text"
+    cleaned = store.empty_like()
+    store.close()
+    cleaned.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_store_is_a_context_manager(tmp_path):
+    with DiskPageStore(directory=str(tmp_path)) as store:
+        store["a"] = "text"
+        assert store["a"] == "text"
+    assert list(tmp_path.iterdir()) == []
+
+def test_sweep_removes_only_orphaned_segments(tmp_path):
+    live = DiskPageStore(directory=str(tmp_path))
+    orphan = tmp_path / "pages-orphan.seg"
+    orphan.write_bytes(page_store.MAGIC)
+    kept = tmp_path / "cache.seg"
+    kept.write_bytes(b"")
+    assert page_store.sweep_orphaned_segments(str(tmp_path)) == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(["cache.seg", os.path.basename(live.path)])
+    live.close()
+
+def test_chunks_stream_from_store(tmp_path):
+    pages = {f"https://example.com/{i}": f"Section {i}\n" + "Some documentation text here. " * 50 for i in range(30)}
+    store = DiskPageStore(str(tmp_path / "pages.seg"))
+    store.update(pages)
+    assert list(iter_chunks(store, max_chunk_tokens=1000)) == chunk_content(pages, max_chunk_tokens=1000)
+
+def test_crawler_stores_pages_on_disk(tmp_path):
+    from benchmarks.fixture_site import generate_site, serve_site
+    server, base_url = serve_site(generate_site(num_pages=30, fanout=4))
+    try:
+        in_memory = Crawler([base_url], max_depth=3)
+        asyncio.run(in_memory.crawl_async())
+        on_disk = Crawler([base_url], max_depth=3, page_store=DiskPageStore(str(tmp_path / "pages.seg")))
+        asyncio.run(on_disk.crawl_async())
+    finally:
+        server.shutdown()
+    assert on_disk.content == in_memory.content
+    cleaned = on_disk.get_content()
+    assert isinstance(cleaned, DiskPageStore)
+    assert cleaned == in_memory.get_content()
+    on_disk.close()
+    assert list(tmp_path.iterdir()) == []
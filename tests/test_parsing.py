@@ -0,0 +1,60 @@
+import pytest
+from src.parsing import available_parsers, get_parser
+
+PAGE = """<html><head><title>Docs</title><script>var x = 1;</script></head>
+<body>
+<header><a href="/home">Home</a></header>
+<nav><a href="/nav-link">Nav</a></nav>
+<aside class="sidebar"><a href="/sidebar#top">Sidebar</a></aside>
+<div class="page content wide">
+  <h1>Getting Started</h1>
+  <p>Install the CLI and log in.<br>Then create a project.</p>
+  <aside>Related: <a href="related.html">Related article</a></aside>
+  <ul><li>First step<li>Second step</ul>
+  <a href="https://other.example.com/x">External</a>
+</div>
+<footer><a href="/terms">Terms</a></footer>
+</body></html>"""
+
+@pytest.mark.parametrize("name", available_parsers())
+def test_backends_agree_on_text_and_links(name):
+    text, links, _ = get_parser(name).parse("https://example.com/docs/start", PAGE)
+    assert text == "\n".join([
+        "Getting Started",
+        "Install the CLI and log in.",
+        "Then create a project.",
+        "First step",
+        "Second step",
+        "External",
+    ])
+    assert links == [
+        "https://example.com/sidebar",
+        "https://other.example.com/x",
+    ]
+
+@pytest.mark.parametrize("name", available_parsers())
+def test_main_element_preferred_over_body(name):
+    html = "<body><p>Outside</p><main><p>Inside</p></main></body>"
+    text, links, _ = get_parser(name).parse("https://example.com/", html, collect_links=False)
+    assert text == "Inside"
+    assert links == []
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_parser("nope")
+
+@pytest.mark.parametrize("name", [name for name in available_parsers() if name != "soup"])
+def test_single_pass_backends_keep_text_nodes_whole(name):
+    text, _, _ = get_parser(name).parse("https://example.com/", "<main><p>Fish &amp; chips</p></main>")
+    assert text == "Fish & chips"
+
+@pytest.mark.parametrize("name", available_parsers())
+def test_backends_agree_on_outline(name):
+    html = """<body>
+    <nav aria-label="Breadcrumb"><ol><li><a href="/">Home</a> &gt;</li><li><a href="/billing">Billing</a></li>
+    <li>Invoices</li></ol></nav>
+    <main><h1>Invoices</h1><p>Intro.</p><h2>Download an <code>invoice</code></h2><p>Body.</p>
+    <aside><h2>Related</h2></aside><h3>PDF format</h3></main></body>"""
+    _, _, outline = get_parser(name).parse("https://example.com/billing/invoices", html)
+    assert outline.breadcrumbs == ["Home", "Billing", "Invoices"]
+    assert outline.headings == [(1, "Invoices"), (2, "Download an invoice"), (3, "PDF format")]
@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from src.jobs import JobCancelled
+from src.singleflight import SingleFlight
+
+def run_concurrently(flight, key, work, count, check=None):
+    results = []
+    start = threading.Barrier(count)
+
+    def call():
+        start.wait()
+        try:
+            results.append(flight.do(key, work, check, poll_interval=0.01))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = run_concurrently(flight, "key", work, 5)
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 4
+    assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+
+def test_errors_are_shared_unless_retryable():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    results = run_concurrently(flight, "key", fail, 3)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.executed == 1
+
+    flight = SingleFlight(retry_on=(JobCancelled,))
+    attempts = []
+
+    def cancelled_once():
+        attempts.append(1)
+        time.sleep(0.1)
+        if len(attempts) == 1:
+            raise JobCancelled()
+        return "done"
+
+    results = run_concurrently(flight, "key", cancelled_once, 3)
+    assert sum(isinstance(result, JobCancelled) for result in results) == 1
+    assert sorted(result for result in results if isinstance(result, tuple)) == [("done", False), ("done", True)]
+
+def test_check_stops_waiting():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", release.wait))
+    leader.start()
+    while not flight.stats()["in_flight"]:
+        time.sleep(0.001)
+
+    def check():
+        raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        flight.do("key", lambda: None, check)
+    release.set()
+    leader.join(timeout=5)
+
+def test_events_reach_every_caller_with_replay():
+    flight = SingleFlight()
+    published, release = threading.Event(), threading.Event()
+    received = {"leader": [], "follower": []}
+
+    def work():
+        flight.publish("key", 1)
+        flight.publish("key", "progress", replay=False)
+        published.set()
+        release.wait(5)
+        flight.publish("key", 2)
+        return "done"
+
+    leader = threading.Thread(target=flight.do, args=("key", work), kwargs={"on_event": received["leader"].append})
+    leader.start()
+    published.wait(5)
+    follower = threading.Thread(target=flight.do, args=("key", lambda: None),
+                                kwargs={"on_event": received["follower"].append, "poll_interval": 0.01})
+    follower.start()
+    while flight.stats()["in_flight"] and not any(len(c.subscribers) == 2 for c in flight._calls.values()):
+        time.sleep(0.001)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+    assert received["leader"] == [1, "progress", 2]
+    # The follower joined late: replayed events, then live ones
+    assert received["follower"] == [1, 2]
@@ -0,0 +1,39 @@
+import gzip
+from src.sitemap import SitemapParser, parse_lastmod, parse_robots_sitemaps
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/docs/a</loc><lastmod>2024-03-01T10:00:00Z</lastmod></url>
+  <url><loc> https://example.com/docs/b </loc></url>
+</urlset>"""
+
+def feed_in_chunks(data, size=7):
+    parser = SitemapParser()
+    entries = []
+    for i in range(0, len(data), size):
+        entries.extend(parser.feed(data[i:i + size]))
+    entries.extend(parser.close())
+    return entries
+
+def test_robots_sitemap_lines():
+    robots = "User-agent: *\nDisallow: /admin\nSitemap: https://example.com/sitemap.xml\nsitemap:https://example.com/news.xml\n"
+    assert parse_robots_sitemaps(robots) == ["https://example.com/sitemap.xml", "https://example.com/news.xml"]
+
+def test_streamed_urlset():
+    entries = feed_in_chunks(URLSET)
+    assert entries == [
+        ("url", "https://example.com/docs/a", parse_lastmod("2024-03-01T10:00:00+00:00")),
+        ("url", "https://example.com/docs/b", None),
+    ]
+
+def test_gzipped_sitemap_index():
+    index = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <sitemap><loc>https://example.com/sitemap-1.xml.gz</loc><lastmod>2024-01-01</lastmod></sitemap>
+    </sitemapindex>"""
+    entries = feed_in_chunks(gzip.compress(index))
+    assert entries == [("sitemap", "https://example.com/sitemap-1.xml.gz", parse_lastmod("2024-01-01"))]
+
+def test_parse_lastmod():
+    assert parse_lastmod("2024-01-01") == parse_lastmod("2024-01-01T00:00:00+00:00")
+    assert parse_lastmod("not a date") is None
+    assert parse_lastmod(None) is None
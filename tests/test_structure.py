@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+from src.cache import MemoryCache
+from src.dispatcher import Dispatcher
+from src.extractor import Extractor
+from src.parsing import Outline
+from src.structure import build_hierarchy, describe, humanize
+
+BASE = "https://example.com/help/"
+
+def make_site():
+    content = {
+        BASE: "Help Center\nFind answers about billing and your account settings here.",
+        BASE + "billing": "Billing\nManage how you pay for your subscription and download invoices.\n"
+                          "Payment methods\nAdd a card or bank account to pay for your plan.",
+        BASE + "billing/refunds": "Refunds\nRequest a refund for a charge within thirty days of payment.",
+        BASE + "account/password.html": "Reset your password\nUse the reset link we email you to choose a new password.",
+        BASE + "articles/123": "Two-factor login\nProtect your login with a code from an authenticator app.",
+    }
+    outlines = {
+        BASE: Outline([], [(1, "Help Center")]),
+        BASE + "billing": Outline(["Home", "Billing"], [(1, "Billing"), (2, "Payment methods")]),
+        BASE + "billing/refunds": Outline([], [(1, "Refunds")]),
+        BASE + "account/password.html": Outline([], [(1, "Reset your password")]),
+        BASE + "articles/123": Outline(["Home", "Security", "Two-factor login"], [(1, "Two-factor login")]),
+    }
+    return content, outlines
+
+def test_build_hierarchy_from_breadcrumbs_headings_and_paths():
+    content, outlines = make_site()
+    modules = {module["module"]: module for module in build_hierarchy(content, outlines, ["/help/"])}
+    assert set(modules) == {"Billing", "Account", "Security"}
+
+    billing = modules["Billing"]
+    assert billing["Description"] == "Manage how you pay for your subscription and download invoices."
+    assert billing["Submodules"] == {
+        "Payment methods": "Add a card or bank account to pay for your plan.",
+        "Refunds": "Request a refund for a charge within thirty days of payment.",
+    }
+    assert set(modules["Account"]["Submodules"]) == {"Reset your password"}
+    assert modules["Security"]["confidence_score"] == 0.9
+    assert all(set(module) == {"module", "Description", "Submodules", "confidence_score"}
+               for module in modules.values())
+
+def test_describe_and_humanize():
+    assert humanize("getting-started.html") == "Getting Started"
+    text = "Title\nShort line\n" + "A long sentence that describes the page well. " * 10
+    assert describe(text).endswith("well.")
+    assert len(describe(text)) <= 300
+    assert describe(text, after="Missing heading") == ""
+
+def test_describe_modules_keeps_names_and_caches():
+    extractor = Extractor(cache=MemoryCache(), dispatcher=Dispatcher(requests_per_minute=1e6, tokens_per_minute=1e9))
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        content = json.dumps({"modules": [{"module": "billing", "Description": "Paying for plans.",
+                                           "Submodules": {"Refunds": "Getting money back."},
+                                           "confidence_score": 0.6}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    extractor.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    modules = [{"module": "Billing", "Description": "", "Submodules": {"Refunds": "", "Invoices": "Old."},
+                "confidence_score": 0.9}]
+    described = extractor.describe_modules(modules)
+    assert described == [{"module": "Billing", "Description": "Paying for plans.",
+                          "Submodules": {"Refunds": "Getting money back.", "Invoices": "Old."},
+                          "confidence_score": 0.6}]
+    assert extractor.describe_modules(modules) == described
+    assert len(calls) == 1
@@ -0,0 +1,59 @@
+import graphviz
+from src import visualizer
+from src.visualizer import collapsed_modules, create_graph, graph_key, graph_source, page_count, render_svg
+
+def make_modules(count, submodules):
+    return [{"module": f"Module {i}", "Description": "",
+             "Submodules": {f"Feature {i}.{j}": "Short." for j in range(submodules)},
+             "confidence_score": 0.9} for i in range(count)]
+
+def node_lines(graph):
+    return [line for line in graph.body if '[label=' in line]
+
+def test_small_graph_is_drawn_in_full():
+    graph = create_graph(make_modules(3, 4))
+    assert len(node_lines(graph)) == 3 + 12
+    assert "splines=ortho" in graph.source
+
+def test_large_graph_is_paged_and_collapsed():
+    modules = make_modules(100, 20)
+    assert page_count(modules) == 4
+    graph = create_graph(modules, page=1)
+    source = graph.source
+    # 25 modules, 8 submodules and a "+12 more" node each, and a pointer to later pages
+    assert len(node_lines(graph)) == 25 * 10 + 1
+    assert "Module 25" in source and "Module 24" not in source and "Module 50" not in source
+    assert "+12 more" in source and "+50 more modules" in source
+    assert "splines=line" in source
+
+def test_expanded_module_shows_every_submodule():
+    modules = make_modules(2, 20)
+    assert collapsed_modules(modules) == ["Module 0", "Module 1"]
+    source = create_graph(modules, expanded=["Module 1"]).source
+    assert "Feature 1.19" in source
+    assert "Feature 0.19" not in source
+
+def test_renders_are_cached_by_content(monkeypatch):
+    calls = []
+
+    def pipe(self, format):
+        calls.append(self.source)
+        return b"<svg/>"
+    monkeypatch.setattr(graphviz.Source, "pipe", pipe)
+    monkeypatch.setattr(visualizer, "_renders", type(visualizer._renders)())
+
+    modules = make_modules(5, 3)
+    assert render_svg(modules) == "<svg/>"
+    assert render_svg(make_modules(5, 3)) == "<svg/>"
+    assert len(calls) == 1
+    render_svg(modules, expanded=["Module 0"])
+    assert len(calls) == 2
+    assert graph_key(modules, expanded=["a", "b"]) == graph_key(modules, expanded={"b", "a"})
+    assert graph_source(modules) == calls[0]
+
+def test_render_without_graphviz_executables(monkeypatch):
+    def pipe(self, format):
+        raise graphviz.ExecutableNotFound(["dot"])
+    monkeypatch.setattr(graphviz.Source, "pipe", pipe)
+    monkeypatch.setattr(visualizer, "_renders", type(visualizer._renders)())
+    assert render_svg(make_modules(2, 2)) is None